@@ -0,0 +1,288 @@
+"""Local GitHub REST API stand-in for client tests.
+
+Serves a small in-memory subset of the REST API over HTTP/1.1 keep-alive on
+127.0.0.1 and records every request and every accepted connection.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class GitHubStub:
+    """In-memory GitHub with PRs, files, comments and commit statuses.
+
+    Also answers the GraphQL PR context query used by get_pr_context().
+    """
+
+    def __init__(self, repo: str = "owner/repo"):
+        self.repo = repo
+        self.prs: dict[int, dict] = {}
+        self.files: dict[int, list[str]] = {}
+        self.comments: dict[int, list[dict]] = {}
+        self.statuses: list[dict] = []
+        self.reactions: list[dict] = []
+        self.requests: list[tuple[str, str]] = []
+        self.connections = 0
+        self.not_modified = 0
+        # Rate limiting: X-RateLimit-* headers on every response, and the
+        # next ``throttle_next`` requests are answered with 429
+        self.rate_limit = 5000
+        self.rate_remaining = 5000
+        self.throttle_next = 0
+        # Per-request latency, and the most requests seen in flight at once
+        self.latency = 0.0
+        self.inflight = 0
+        self.max_inflight = 0
+        # Like GitHub, the files endpoint silently stops at this many files
+        self.max_files = 3000
+        self._next_id = 1000
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "GitHubStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_pr(self, number: int, files: list[str] | None = None, **fields) -> None:
+        self.prs[number] = {
+            "number": number,
+            "title": fields.get("title", f"PR {number}"),
+            "head": {"sha": fields.get("head_sha", "a" * 40), "ref": fields.get("head_ref", "feature")},
+            "base": {"ref": fields.get("base_ref", "main"), "sha": fields.get("base_sha", "0" * 40)},
+        }
+        self.files[number] = list(files or [])
+        self.comments.setdefault(number, [])
+
+    def add_comment(self, number: int, body: str) -> dict:
+        with self._lock:
+            self._next_id += 1
+            comment = {"id": self._next_id, "body": body}
+        self.comments.setdefault(number, []).append(comment)
+        return comment
+
+    def _find_comment(self, comment_id: int) -> dict | None:
+        for comments in self.comments.values():
+            for comment in comments:
+                if comment["id"] == comment_id:
+                    return comment
+        return None
+
+    # --- HTTP plumbing -------------------------------------------------
+
+    def _handler(self):
+        stub = self
+        repo = re.escape(self.repo)
+        routes = [
+            ("GET", rf"^/repos/{repo}/pulls/(\d+)$", "get_pr"),
+            ("GET", rf"^/repos/{repo}/pulls/(\d+)/files$", "list_files"),
+            ("GET", rf"^/repos/{repo}/issues/(\d+)/comments$", "list_comments"),
+            ("POST", rf"^/repos/{repo}/issues/(\d+)/comments$", "create_comment"),
+            ("GET", rf"^/repos/{repo}/issues/comments/(\d+)$", "get_comment"),
+            ("PATCH", rf"^/repos/{repo}/issues/comments/(\d+)$", "update_comment"),
+            ("DELETE", rf"^/repos/{repo}/issues/comments/(\d+)$", "delete_comment"),
+            ("POST", rf"^/repos/{repo}/issues/comments/(\d+)/reactions$", "add_reaction"),
+            ("POST", rf"^/repos/{repo}/statuses/(\w+)$", "create_status"),
+            ("POST", r"^/(graphql)$", "graphql"),
+        ]
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method):
+                with stub._lock:
+                    stub.inflight += 1
+                    stub.max_inflight = max(stub.max_inflight, stub.inflight)
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    self._route(method)
+                finally:
+                    with stub._lock:
+                        stub.inflight -= 1
+
+            def _route(self, method):
+                parts = urlsplit(self.path)
+                stub.requests.append((method, parts.path))
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                with stub._lock:
+                    throttled = stub.throttle_next > 0
+                    if throttled:
+                        stub.throttle_next -= 1
+                if throttled:
+                    return self._send(
+                        429,
+                        {"message": "You have exceeded a secondary rate limit."},
+                        {"Retry-After": "0"},
+                    )
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                for route_method, pattern, name in routes:
+                    match = re.match(pattern, parts.path)
+                    if route_method == method and match:
+                        status, payload, headers = getattr(stub, f"_{name}")(
+                            match.group(1), query, body, self
+                        )
+                        return self._send(status, payload, headers, etag=method == "GET")
+                self._send(404, {"message": "Not Found"})
+
+            def _send(self, status, payload, headers=None, etag=False):
+                data = json.dumps(payload).encode() if payload is not None else b""
+                headers = dict(headers or {})
+                if etag and status == 200:
+                    headers["ETag"] = f'"{hashlib.sha1(data).hexdigest()}"'
+                    if self.headers.get("If-None-Match") == headers["ETag"]:
+                        with stub._lock:
+                            stub.not_modified += 1
+                        self.send_response(304)
+                        for key, value in {**stub._rate_headers(304), **headers}.items():
+                            self.send_header(key, value)
+                        self.end_headers()
+                        return
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in {**stub._rate_headers(status), **headers}.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+        return Handler
+
+    def _rate_headers(self, status: int) -> dict[str, str]:
+        with self._lock:
+            # Like GitHub, 304s and 429s do not consume the budget
+            if status not in (304, 429) and self.rate_remaining > 0:
+                self.rate_remaining -= 1
+            remaining = self.rate_remaining
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(time.time()) + 3600),
+        }
+
+    def _page(self, items: list, query: dict, path: str):
+        per_page = int(query.get("per_page", 30))
+        page = int(query.get("page", 1))
+        chunk = items[(page - 1) * per_page : page * per_page]
+        headers = {}
+        if page * per_page < len(items):
+            headers["Link"] = f'<{self.url}{path}?per_page={per_page}&page={page + 1}>; rel="next"'
+        return chunk, headers
+
+    # --- Endpoints -----------------------------------------------------
+
+    def _get_pr(self, number, query, body, handler):
+        pr = self.prs.get(int(number))
+        return (200, pr, None) if pr else (404, {"message": "Not Found"}, None)
+
+    def _list_files(self, number, query, body, handler):
+        files = [{"filename": f} for f in self.files.get(int(number), [])[: self.max_files]]
+        chunk, headers = self._page(files, query, urlsplit(handler.path).path)
+        return 200, chunk, headers
+
+    def _list_comments(self, number, query, body, handler):
+        comments = self.comments.get(int(number), [])
+        chunk, headers = self._page(comments, query, urlsplit(handler.path).path)
+        return 200, chunk, headers
+
+    def _create_comment(self, number, query, body, handler):
+        return 201, self.add_comment(int(number), body["body"]), None
+
+    def _get_comment(self, comment_id, query, body, handler):
+        comment = self._find_comment(int(comment_id))
+        return (200, comment, None) if comment else (404, {"message": "Not Found"}, None)
+
+    def _update_comment(self, comment_id, query, body, handler):
+        comment = self._find_comment(int(comment_id))
+        if not comment:
+            return 404, {"message": "Not Found"}, None
+        comment["body"] = body["body"]
+        return 200, comment, None
+
+    def _delete_comment(self, comment_id, query, body, handler):
+        comment = self._find_comment(int(comment_id))
+        if not comment:
+            return 404, {"message": "Not Found"}, None
+        for comments in self.comments.values():
+            if comment in comments:
+                comments.remove(comment)
+        return 204, None, None
+
+    def _add_reaction(self, comment_id, query, body, handler):
+        self.reactions.append({"comment_id": int(comment_id), **body})
+        return 201, {"content": body["content"]}, None
+
+    def _graphql(self, _, query, body, handler):
+        """Answer the PR context query (the query text itself is not parsed)."""
+        variables = body["variables"]
+        pr = self.prs.get(variables["number"])
+        if not pr or f"{variables['owner']}/{variables['name']}" != self.repo:
+            return 200, {"data": {"repository": {"pullRequest": None}}}, None
+
+        def connection(items, cursor):
+            start = int(cursor or 0)
+            end = start + 100
+            return {
+                "nodes": items[start:end],
+                "pageInfo": {"hasNextPage": end < len(items), "endCursor": str(end)},
+            }
+
+        data = {
+            "number": pr["number"],
+            "title": pr["title"],
+            "headRefOid": pr["head"]["sha"],
+            "headRefName": pr["head"]["ref"],
+            "baseRefName": pr["base"]["ref"],
+            "baseRefOid": pr["base"]["sha"],
+        }
+        if variables["withFiles"]:
+            files = [{"path": f} for f in self.files.get(pr["number"], [])[: self.max_files]]
+            data["files"] = connection(files, variables["filesCursor"])
+        if variables["withComments"]:
+            comments = [
+                {"databaseId": c["id"], "body": c["body"]}
+                for c in self.comments.get(pr["number"], [])
+            ]
+            data["comments"] = connection(comments, variables["commentsCursor"])
+        return 200, {"data": {"repository": {"pullRequest": data}}}, None
+
+    def _create_status(self, sha, query, body, handler):
+        self.statuses.append({"sha": sha, **body})
+        return 201, {"state": body["state"]}, None
@@ -0,0 +1,79 @@
+import threading
+import unittest
+import unittest.mock
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.core.comment_updater import CommentUpdater
+
+
+class FakeGitHub:
+    def __init__(self, fail=0):
+        self.bodies = []
+        self.fail = fail
+        self.patched = threading.Event()
+
+    def update_comment(self, comment_id, body):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("boom")
+        self.bodies.append(body)
+        self.patched.set()
+
+
+class TestCommentUpdater(unittest.TestCase):
+    def test_updates_within_interval_are_coalesced(self):
+        gh = FakeGitHub()
+        updater = CommentUpdater(gh, 1, interval=60)
+        for i in range(50):
+            updater.update(f"step {i}")
+        updater.close()
+
+        # First update goes out immediately, the rest collapse into the final write
+        self.assertEqual(gh.bodies, ["step 0", "step 49"])
+        self.assertEqual(updater.stats(), {"patches": 2, "skipped": 0, "coalesced": 48})
+
+    def test_trailing_flush_after_interval(self):
+        gh = FakeGitHub()
+        updater = CommentUpdater(gh, 1, interval=0.05)
+        updater.update("a")
+        gh.patched.clear()
+        updater.update("b")
+        updater.update("c")
+
+        self.assertTrue(gh.patched.wait(2))
+        self.assertEqual(gh.bodies, ["a", "c"])
+        updater.close()
+        self.assertEqual(gh.bodies, ["a", "c"])  # nothing new to write
+
+    def test_unchanged_body_skipped(self):
+        gh = FakeGitHub()
+        updater = CommentUpdater(gh, 1, interval=0, initial_body="running")
+        updater.update("running")
+        updater.update("done")
+        updater.update("done")
+        self.assertEqual(gh.bodies, ["done"])
+        self.assertEqual(updater.skipped, 2)
+
+    def test_final_state_written_despite_failures(self):
+        gh = FakeGitHub(fail=2)
+        updater = CommentUpdater(gh, 1, interval=0)
+        updater.update("progress")  # fails quietly, stays pending
+        with unittest.mock.patch("time.sleep"):
+            updater.close("final")
+        self.assertEqual(gh.bodies, ["final"])
+
+    def test_context_manager_flushes_pending(self):
+        gh = FakeGitHub()
+        with CommentUpdater(gh, 1, interval=60) as updater:
+            updater.update("a")
+            updater.update("b")
+        self.assertEqual(gh.bodies, ["a", "b"])
+        with self.assertRaises(RuntimeError):
+            updater.update("c")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci import config
+from ci.config import LAYERS, Layer
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+
+class TestLayerGraph(unittest.TestCase):
+    def test_waves(self):
+        waves = [[l.name for l in wave] for wave in config.get_layer_waves()]
+        self.assertEqual(
+            waves, [["bootstrap"], ["platform"], ["data-staging", "data-prod"]]
+        )
+
+    def test_layers_by_order_is_topological(self):
+        names = [l.name for l in config.get_layers_by_order()]
+        self.assertEqual(names, ["bootstrap", "platform", "data-staging", "data-prod"])
+
+    def test_waves_ignore_dependencies_outside_selection(self):
+        selected = [LAYERS["data-prod"], LAYERS["data-staging"]]
+        waves = [[l.name for l in wave] for wave in config.get_layer_waves(selected)]
+        self.assertEqual(waves, [["data-staging", "data-prod"]])
+
+    def test_waves_keep_order_through_unselected_layers(self):
+        # data-staging depends on bootstrap via platform, which is not selected
+        selected = [LAYERS["data-staging"], LAYERS["bootstrap"]]
+        waves = [[l.name for l in wave] for wave in config.get_layer_waves(selected)]
+        self.assertEqual(waves, [["bootstrap"], ["data-staging"]])
+
+    def test_derive_dependencies_from_terragrunt(self):
+        self.assertEqual(
+            config.derive_dependencies(LAYERS["data-staging"], REPO_ROOT), ("platform",)
+        )
+        self.assertEqual(config.derive_dependencies(LAYERS["bootstrap"], REPO_ROOT), ())
+
+    def test_downstream(self):
+        self.assertEqual(
+            config.get_downstream("bootstrap"), {"platform", "data-staging", "data-prod"}
+        )
+        self.assertEqual(config.get_downstream("data-prod"), set())
+
+    def test_cycle_detected(self):
+        layers = {
+            "a": Layer(name="a", path="a", engine="terraform", depends_on=("b",)),
+            "b": Layer(name="b", path="b", engine="terraform", depends_on=("a",)),
+        }
+        with patch.dict(config.LAYERS, layers, clear=True):
+            with self.assertRaises(ValueError):
+                config.get_layer_waves()
+
+
+class TestDetectLayers(unittest.TestCase):
+    def _names(self, paths):
+        return [l.name for l in config.detect_layers_from_paths(paths)]
+
+    def test_component_matching(self):
+        self.assertEqual(self._names(["platform/01.vault.tf"]), ["platform"])
+        self.assertEqual(self._names(["platformx/main.tf"]), [])
+        self.assertEqual(self._names(["./envs/prod/data/1.postgres.tf"]), ["data-prod"])
+
+    def test_cross_layer_triggers(self):
+        self.assertEqual(
+            self._names(["envs/data-shared/2.redis.tf"]), ["data-staging", "data-prod"]
+        )
+        self.assertEqual(
+            self._names(["terragrunt.hcl"]),
+            ["bootstrap", "platform", "data-staging", "data-prod"],
+        )
+        # Only the root file triggers everything, not nested terragrunt.hcl
+        self.assertEqual(self._names(["bootstrap/terragrunt.hcl"]), ["bootstrap"])
+
+    def test_index_built_once(self):
+        config.reset_path_index()
+        self.addCleanup(config.reset_path_index)
+        with patch.object(config, "build_path_index", wraps=config.build_path_index) as build:
+            self._names(["platform/01.vault.tf"])
+            self._names(["bootstrap/1.k3s.tf"])
+        self.assertEqual(build.call_count, 1)
+
+        extra = Layer(name="extra", path="extra", engine="terraform")
+        with patch.dict(config.LAYERS, {"extra": extra}):
+            self.assertEqual(self._names(["extra/main.tf"]), [])
+            config.reset_path_index()
+            self.assertEqual(self._names(["extra/main.tf"]), ["extra"])
+
+    def test_deployment_order_and_many_paths(self):
+        paths = [f"docs/file{i}.md" for i in range(5000)]
+        paths += ["envs/staging/data/locals.tf", "bootstrap/1.k3s.tf"]
+        self.assertEqual(self._names(paths), ["bootstrap", "data-staging"])
+
+
+class TestHelpers(unittest.TestCase):
+    def test_env_numbers_fall_back_on_bad_values(self):
+        with patch.dict(os.environ, {"CI_TEST_NUM": "7"}):
+            self.assertEqual(config.env_int("CI_TEST_NUM", 3), 7)
+            self.assertEqual(config.env_float("CI_TEST_NUM", 0.5), 7.0)
+        with patch.dict(os.environ, {"CI_TEST_NUM": "lots"}):
+            self.assertEqual(config.env_int("CI_TEST_NUM", 3), 3)
+            self.assertEqual(config.env_float("CI_TEST_NUM", 0.5), 0.5)
+        self.assertEqual(config.env_int("CI_TEST_UNSET", 3), 3)
+
+    def test_job_temp_dir_is_owner_only(self):
+        with tempfile.TemporaryDirectory() as tmp, patch.dict(os.environ, {"RUNNER_TEMP": tmp}):
+            path = config.get_job_temp_dir("plans", "a")
+            self.assertEqual(path, os.path.join(tmp, "infra-ci", "plans", "a"))
+            self.assertEqual(os.stat(os.path.join(tmp, "infra-ci")).st_mode & 0o777, 0o700)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o700)
+
+    def test_write_json_replaces_atomically(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "data.json")
+            config.write_json(path, {"a": 1})
+            config.write_json(path, {"a": 2}, indent=2)
+            with open(path) as f:
+                self.assertEqual(json.load(f), {"a": 2})
+            self.assertEqual(os.listdir(tmp), ["data.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.format_plan import format_plan, format_plan_lines
+from ci.plan_report import PlanReport, CREATE, UPDATE, DELETE, REPLACE, summarize_lines
+
+PLAN_JSON = {
+    "format_version": "1.2",
+    "resource_changes": [
+        {"address": 'module.db["a"].helm_release.pg', "change": {"actions": ["create"]}},
+        {"address": "vault_policy.app[0]", "change": {"actions": ["update"]}},
+        {"address": "kubernetes_secret.old", "change": {"actions": ["delete"]}},
+        {"address": "random_password.pw", "change": {"actions": ["delete", "create"]}},
+        {"address": "data.vault_generic_secret.x", "change": {"actions": ["read"]}},
+        {"address": "helm_release.unchanged", "change": {"actions": ["no-op"]}},
+    ],
+}
+
+PLAN_TEXT = """
+  # module.db["a"].helm_release.pg will be created
+  + resource "helm_release" "pg" {
+  # vault_policy.app[0] will be updated in-place
+  ~ resource "vault_policy" "app" {
+  # random_password.pw must be replaced
+-/+ resource "random_password" "pw" {
+
+Plan: 2 to add, 1 to change, 1 to destroy.
+"""
+
+
+class TestPlanReport(unittest.TestCase):
+    def test_from_json_counts_like_terraform(self):
+        report = PlanReport.from_json(PLAN_JSON)
+        self.assertEqual((report.add, report.change, report.destroy), (2, 1, 2))
+        self.assertEqual(report.addresses(CREATE), ['module.db["a"].helm_release.pg'])
+        self.assertEqual(report.addresses(UPDATE), ["vault_policy.app[0]"])
+        self.assertEqual(report.addresses(DELETE), ["kubernetes_secret.old"])
+        self.assertEqual(report.addresses(REPLACE), ["random_password.pw"])
+
+    def test_from_text_handles_indexed_addresses(self):
+        report = PlanReport.from_text(PLAN_TEXT)
+        self.assertEqual((report.add, report.change, report.destroy), (2, 1, 1))
+        self.assertEqual(report.addresses(CREATE), ['module.db["a"].helm_release.pg'])
+        self.assertEqual(report.addresses(UPDATE), ["vault_policy.app[0]"])
+
+    def test_from_text_unparseable(self):
+        self.assertIsNone(PlanReport.from_text("Error: something broke"))
+
+
+class TestStreamingSummary(unittest.TestCase):
+    def _huge_plan(self, n):
+        for i in range(n):
+            yield f'  # module.x["k{i}"].null_resource.r will be created\n'
+            yield '  + resource "null_resource" "r" {}\n'
+        yield f"Plan: {n} to add, 0 to change, 0 to destroy.\n"
+
+    def test_bounded_addresses(self):
+        report = summarize_lines(self._huge_plan(5000), max_addresses=100)
+        self.assertEqual(report.add, 5000)
+        self.assertEqual(len(report.changes), 100)
+        self.assertEqual(report.omitted, 4900)
+        self.assertIn("...and 4900 more changes", format_plan(report))
+
+    def test_format_plan_lines_detects_json(self):
+        lines = ["\n"] + json.dumps(PLAN_JSON, indent=2).splitlines(keepends=True)
+        self.assertIn("| 🟢 **Add** | 2 |", format_plan_lines(lines))
+
+    def test_format_plan_lines_text(self):
+        out = format_plan_lines(PLAN_TEXT.splitlines(keepends=True))
+        self.assertIn("- `+/-` random_password.pw", out)
+
+
+class TestFormatPlan(unittest.TestCase):
+    def test_renders_json_plan(self):
+        out = format_plan(json.dumps(PLAN_JSON))
+        self.assertIn("| 🟢 **Add** | 2 |", out)
+        self.assertIn('- `+` module.db["a"].helm_release.pg', out)
+        self.assertIn("- `+/-` random_password.pw", out)
+        self.assertIn("- `-` kubernetes_secret.old", out)
+
+    def test_renders_report_object(self):
+        out = format_plan(PlanReport.from_json(PLAN_JSON))
+        self.assertIn("| 🔴 **Destroy** | 2 |", out)
+
+    def test_no_changes(self):
+        out = format_plan("No changes. Your infrastructure matches the configuration.")
+        self.assertEqual(out, "✅ **No changes.** Infrastructure is up-to-date.")
+        self.assertEqual(format_plan(PlanReport()), out)
+
+    def test_unparseable(self):
+        self.assertIn("Could not parse", format_plan("garbage"))
+
+
+if __name__ == "__main__":
+    unittest.main()
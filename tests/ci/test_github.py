@@ -0,0 +1,472 @@
+import http.client
+import subprocess
+import tempfile
+import time
+import unittest
+from unittest import mock
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+sys.path.append(os.path.dirname(__file__))
+
+from ci.core import github
+from ci.core.github import GitHubClient, split_shards
+from ci.core.http_cache import ResponseCache
+from ci.core.ratelimit import RateLimiter, RateLimitExceeded
+from ci.core.rest import HttpTransport
+from github_stub import GitHubStub
+
+
+class GitHubStubTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stub = GitHubStub().start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            "GITHUB_API_URL": self.stub.url,
+            "GITHUB_REPOSITORY": self.stub.repo,
+            "GITHUB_TOKEN": "test-token",
+            "CI_CACHE_DIR": self.tmp.name,
+        })
+        self.env.start()
+        self.gh = GitHubClient(backend="http")
+
+    def tearDown(self):
+        self.env.stop()
+        self.stub.stop()
+        self.tmp.cleanup()
+
+
+class TestHttpBackend(GitHubStubTestCase):
+    def test_get_pr(self):
+        self.stub.add_pr(7, head_sha="b" * 40, head_ref="feat", title="Add thing")
+        pr = self.gh.get_pr(7)
+        self.assertEqual((pr.number, pr.head_sha, pr.head_ref, pr.base_ref, pr.title),
+                         (7, "b" * 40, "feat", "main", "Add thing"))
+
+    def test_changed_files_paginated(self):
+        files = [f"platform/f{i}.tf" for i in range(250)]
+        self.stub.add_pr(1, files=files)
+        self.assertEqual(self.gh.get_changed_files(1), files)
+
+    def test_comment_roundtrip(self):
+        self.stub.add_pr(1)
+        comment_id = self.gh.create_comment(1, "hello <!-- marker:x -->")
+        self.gh.update_comment(comment_id, "updated <!-- marker:x -->")
+        found = self.gh.find_comment_by_marker(1, "<!-- marker:x -->")
+        self.assertEqual(found["id"], comment_id)
+        self.assertEqual(found["body"], "updated <!-- marker:x -->")
+
+    def test_get_comment_none_only_when_missing(self):
+        self.stub.add_pr(1)
+        self.assertIsNone(self.gh.get_comment(12345))
+
+        self.stub.throttle_next = 100
+        self.gh.limiter.max_retries = 0
+        self.gh.limiter.sleep = lambda _: None
+        with self.assertRaises(RateLimitExceeded):
+            self.gh.get_comment(12345)
+
+    def test_gh_backend_get_comment_not_found(self):
+        gh = GitHubClient(backend="gh")
+        missing = subprocess.CompletedProcess([], 1, stdout="", stderr="gh: Not Found (HTTP 404)")
+        failed = subprocess.CompletedProcess([], 1, stdout="", stderr="gh: Server Error (HTTP 502)")
+        with patch.object(github.subprocess, "run", return_value=missing):
+            self.assertIsNone(gh.get_comment(1))
+        with patch.object(github.subprocess, "run", return_value=failed), self.assertRaises(RuntimeError):
+            gh.get_comment(1)
+
+    def test_commit_status_and_reaction(self):
+        self.stub.add_pr(1)
+        comment_id = self.gh.create_comment(1, "x")
+        self.gh.add_reaction(comment_id, "rocket")
+        self.gh.create_commit_status("abc", "success", context="plan", description="ok")
+        self.assertEqual(self.stub.reactions, [{"comment_id": comment_id, "content": "rocket"}])
+        self.assertEqual(
+            self.stub.statuses,
+            [{"sha": "abc", "state": "success", "context": "plan", "description": "ok"}],
+        )
+
+    def test_connection_reused_across_calls(self):
+        self.stub.add_pr(1, files=["a"])
+        for _ in range(5):
+            self.gh.get_pr(1)
+            self.gh.get_changed_files(1)
+        self.assertEqual(self.stub.connections, 1)
+        self.assertEqual(self.gh._http.connections_opened, 1)
+
+    def test_result_comment_keeps_error_of_long_log(self):
+        self.stub.add_pr(1)
+        comment_id, _ = self.gh.create_running_comment(1, "Plan")
+        log = "\n".join(["x" * 100] * 2000 + ["Error: boom"])
+        with patch.dict(os.environ, {"CI_ARTIFACT_DIR": self.tmp.name, "GITHUB_RUN_ID": "42"}):
+            self.gh.update_result_comment(comment_id, 1, "Plan", log, success=False)
+
+        body = self.stub.comments[1][0]["body"]
+        self.assertLess(len(body), 65536)
+        self.assertIn("Error: boom", body.split("=== Log ===")[0])
+        self.assertIn("/owner/repo/actions/runs/42", body)
+
+
+class TestHttpTransportRetry(unittest.TestCase):
+    """A dropped keep-alive connection is only retried when resending is safe."""
+
+    class Conn:
+        def __init__(self, fail_on=None):
+            # "request": dropped while writing; "response": dropped after
+            self.fail_on = fail_on
+            self.sent = []
+
+        def request(self, method, target, body=None, headers=None):
+            if self.fail_on == "request":
+                raise BrokenPipeError()
+            self.sent.append(method)
+
+        def getresponse(self):
+            if self.fail_on == "response":
+                raise http.client.RemoteDisconnected("closed")
+            return mock.Mock(status=200, will_close=True, getheaders=lambda: [], read=lambda: b"{}")
+
+        def close(self):
+            pass
+
+    def send(self, method, fail_on):
+        transport = HttpTransport("http://127.0.0.1:1")
+        stale, fresh = self.Conn(fail_on), self.Conn()
+        with patch.object(transport, "_checkout", return_value=stale), \
+                patch.object(transport, "_new_connection", return_value=fresh):
+            transport.request(method, "/x", body=None if method == "GET" else {})
+        return stale.sent, fresh.sent
+
+    def test_idempotent_request_resent_after_disconnect(self):
+        self.assertEqual(self.send("GET", "response"), (["GET"], ["GET"]))
+        self.assertEqual(self.send("PUT", "response"), (["PUT"], ["PUT"]))
+
+    def test_written_post_not_resent(self):
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.send("POST", "response")
+
+    def test_unwritten_post_resent(self):
+        self.assertEqual(self.send("POST", "request"), ([], ["POST"]))
+
+
+class TestMarkerIndex(GitHubStubTestCase):
+    MARKER = "<!-- infra-dashboard:abc1234 -->"
+
+    def test_created_comment_found_without_listing(self):
+        self.stub.add_pr(1)
+        for i in range(150):
+            self.stub.add_comment(1, f"noise {i}")
+        comment_id = self.gh.create_comment(1, f"{self.MARKER}\n## Dashboard")
+
+        # A fresh client (next CI step) uses the persisted index
+        gh = GitHubClient(backend="http")
+        self.stub.requests.clear()
+        found = gh.find_comment_by_marker(1, self.MARKER)
+
+        self.assertEqual(found["id"], comment_id)
+        self.assertEqual(self.stub.requests, [("GET", f"/repos/{self.stub.repo}/issues/comments/{comment_id}")])
+
+    def test_stale_entry_falls_back_to_scan(self):
+        self.stub.add_pr(1)
+        comment_id = self.gh.create_comment(1, self.MARKER)
+        self.stub.comments[1].clear()
+        other = self.stub.add_comment(1, f"recreated {self.MARKER}")
+
+        self.assertEqual(self.gh.find_comment_by_marker(1, self.MARKER)["id"], other["id"])
+        self.assertEqual(self.gh.markers.get(1, self.MARKER), other["id"])
+        self.assertNotEqual(comment_id, other["id"])
+
+    def test_scan_result_is_indexed(self):
+        self.stub.add_pr(1)
+        existing = self.stub.add_comment(1, self.MARKER)
+        self.gh.find_comment_by_marker(1, self.MARKER)
+        self.assertEqual(self.gh.markers.get(1, self.MARKER), existing["id"])
+
+
+class TestEtagCache(GitHubStubTestCase):
+    def test_unchanged_reads_revalidate(self):
+        self.stub.add_pr(1, files=[f"f{i}" for i in range(150)])
+
+        first = (self.gh.get_pr(1), self.gh.get_changed_files(1))
+        # Next CI step: new client, same on-disk cache
+        gh = GitHubClient(backend="http")
+        second = (gh.get_pr(1), gh.get_changed_files(1))
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.stub.not_modified, 3)  # PR + 2 file pages
+        self.assertEqual(gh.cache_stats["hits"], 3)
+        self.assertEqual(gh.cache_stats["misses"], 0)
+
+    def test_changed_payload_is_refetched(self):
+        self.stub.add_pr(1)
+        self.stub.add_comment(1, "a")
+        self.gh.find_comment_by_marker(1, "<!-- m -->")
+        self.stub.add_comment(1, "<!-- m -->")
+
+        self.assertIsNotNone(self.gh.find_comment_by_marker(1, "<!-- m -->"))
+        self.assertEqual(self.gh.cache_stats["hits"], 0)
+        self.assertEqual(self.gh.cache_stats["misses"], 2)
+
+
+class TestResponseCachePruning(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _store(self, cache, url, age, size=10):
+        cache.store(url, {"etag": '"x"'}, b"x" * size)
+        path = cache._file(url)
+        os.utime(path, (time.time() - age, time.time() - age))
+        return path
+
+    def test_old_and_excess_entries_removed(self):
+        cache = ResponseCache(self.tmp.name, namespace="old-token", max_age=3600)
+        stale = self._store(cache, "/stale", age=7200)
+        fresh = self._store(cache, "/fresh", age=60)
+        older = self._store(cache, "/older", age=120, size=1000)
+
+        self.assertEqual(cache.prune(max_age=3600, max_bytes=500), 2)
+        self.assertEqual(os.listdir(self.tmp.name), [os.path.basename(fresh)])
+        self.assertFalse(os.path.exists(stale) or os.path.exists(older))
+
+    def test_pruned_once_per_process_on_open(self):
+        cache = ResponseCache(self.tmp.name, max_age=3600)
+        self._store(cache, "/stale", age=7200)
+        ResponseCache._pruned.discard(self.tmp.name)
+        ResponseCache(self.tmp.name, max_age=3600)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+        self._store(cache, "/stale", age=7200)
+        ResponseCache(self.tmp.name, max_age=3600)
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+
+    def test_lookup_keeps_entry_alive(self):
+        cache = ResponseCache(self.tmp.name)
+        self._store(cache, "/used", age=7200)
+        self.assertIsNotNone(cache.lookup("/used"))
+        self.assertEqual(cache.prune(max_age=3600, max_bytes=10_000), 0)
+
+
+class TestRateLimit(GitHubStubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sleeps = []
+        self.gh.limiter.sleep = self.sleeps.append
+
+    def test_budget_tracked_from_headers(self):
+        self.stub.add_pr(1)
+        self.assertIsNone(self.gh.remaining_budget)
+        self.gh.get_pr(1)
+        self.assertEqual(self.gh.limiter.remaining, 4999)
+        self.assertEqual(self.gh.remaining_budget, 4999 - self.gh.limiter.reserve)
+
+    def test_throttled_request_is_retried(self):
+        self.stub.add_pr(1)
+        self.stub.throttle_next = 2
+
+        self.assertEqual(self.gh.get_pr(1).number, 1)
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(self.gh.limiter.stats()["retries"], 2)
+        # Secondary limit: later writes are spaced out
+        self.assertEqual(self.gh.limiter.write_interval, 1.0)
+
+    def test_gives_up_after_max_retries(self):
+        self.stub.add_pr(1)
+        self.stub.throttle_next = 100
+        self.gh.limiter.max_retries = 2
+
+        with self.assertRaises(RateLimitExceeded):
+            self.gh.get_pr(1)
+        self.assertEqual(len(self.stub.requests), 3)
+
+    def test_paces_when_budget_low(self):
+        now = 1000.0
+        limiter = RateLimiter(
+            state_path=os.path.join(self.tmp.name, "rl.json"),
+            reserve=10,
+            sleep=self.sleeps.append,
+            clock=lambda: now,
+        )
+        limiter.update({"x-ratelimit-limit": "1000", "x-ratelimit-remaining": "110", "x-ratelimit-reset": "1100"})
+        limiter.before_request("GET")
+        self.assertEqual(self.sleeps, [1.0])  # 100s to reset / 100 requests left
+
+        limiter.update({"x-ratelimit-limit": "1000", "x-ratelimit-remaining": "5", "x-ratelimit-reset": "1100"})
+        limiter.before_request("GET")
+        self.assertEqual(self.sleeps[-1], 100.0)  # at reserve: wait for reset
+
+    def test_gh_backend_classifies_writes(self):
+        gh = GitHubClient(backend="gh")
+        methods = []
+        done = subprocess.CompletedProcess([], 0, stdout="{}", stderr="")
+        with patch.object(gh.limiter, "before_request", side_effect=methods.append), \
+                patch.object(github.subprocess, "run", return_value=done):
+            gh._api("PATCH", "repos/o/r/issues/comments/1", body={"body": "x"})
+            gh._run_gh(["api", "repos/o/r/issues/1/comments", "-f", "body=x"])
+            gh._run_gh(["api", "--method=delete", "repos/o/r/issues/comments/1"])
+            gh._run_gh(["api", "repos/o/r/pulls/1"])
+        self.assertEqual(methods, ["PATCH", "POST", "DELETE", "GET"])
+
+    def test_budget_shared_between_processes(self):
+        state = os.path.join(self.tmp.name, "rl.json")
+        RateLimiter(state_path=state).update(
+            {"x-ratelimit-limit": "5000", "x-ratelimit-remaining": "300", "x-ratelimit-reset": "9999999999"}
+        )
+        with patch.dict(os.environ, {"CI_RATE_JOBS": "5"}):
+            other = RateLimiter(state_path=state, reserve=50)
+        self.assertEqual(other.remaining_budget, 50)
+
+
+class TestPRContext(GitHubStubTestCase):
+    def test_single_round_trip(self):
+        self.stub.add_pr(5, files=["envs/prod/a.tf", "README.md"], head_sha="c" * 40, title="T")
+        self.stub.add_comment(5, "plain")
+        dash = self.stub.add_comment(5, "<!-- infra-dashboard:abc -->\nstatus")
+
+        ctx = self.gh.get_pr_context(5)
+
+        self.assertEqual(self.stub.requests, [("POST", "/graphql")])
+        self.assertEqual(ctx.pr.head_sha, "c" * 40)
+        self.assertEqual(ctx.pr.title, "T")
+        self.assertEqual(ctx.files, ["envs/prod/a.tf", "README.md"])
+        self.assertEqual(ctx.find_comment("<!-- infra-dashboard:abc -->")["id"], dash["id"])
+        self.assertEqual(list(ctx.comments), ["<!-- infra-dashboard:abc -->"])
+        # Shared: a second handler asking again costs nothing
+        self.assertIs(self.gh.get_pr_context(5), ctx)
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_paginates_files_and_comments_independently(self):
+        self.stub.add_pr(5, files=[f"f{i}" for i in range(250)])
+        for i in range(120):
+            self.stub.add_comment(5, f"<!-- m{i} -->")
+
+        ctx = self.gh.get_pr_context(5)
+
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(ctx.files, [f"f{i}" for i in range(250)])
+        self.assertEqual(len(ctx.comments), 120)
+        # Markers are indexed for later find_comment_by_marker calls
+        self.assertIsNotNone(self.gh.markers.get(5, "<!-- m119 -->"))
+
+    def test_matches_rest_results(self):
+        self.stub.add_pr(5, files=["a", "b"])
+        ctx = self.gh.get_pr_context(5)
+        self.assertEqual(ctx.pr, self.gh.get_pr(5))
+        self.assertEqual(ctx.files, self.gh.get_changed_files(5))
+
+    def test_missing_pr(self):
+        with self.assertRaises(RuntimeError):
+            self.gh.get_pr_context(99)
+
+    def test_graphql_url_for_enterprise(self):
+        with patch.dict(os.environ, {"GITHUB_API_URL": "https://ghe.example.com/api/v3"}):
+            gh = GitHubClient(backend="gh")
+        self.assertEqual(gh.graphql_url, "https://ghe.example.com/api/graphql")
+
+
+class TestPaginationStreaming(GitHubStubTestCase):
+    def test_marker_search_stops_at_first_match(self):
+        self.stub.add_pr(1)
+        self.stub.add_comment(1, "<!-- m -->")
+        for i in range(450):
+            self.stub.add_comment(1, f"c{i}")
+
+        self.assertIsNotNone(self.gh.find_comment_by_marker(1, "<!-- m -->"))
+        # Only the first of five pages was fetched
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_iterators_are_lazy(self):
+        self.stub.add_pr(1, files=[f"f{i}" for i in range(250)])
+        files = self.gh.iter_changed_files(1)
+        self.assertEqual(self.stub.requests, [])
+        self.assertEqual([next(files) for _ in range(101)][-1], "f100")
+        self.assertEqual(len(self.stub.requests), 2)
+        files.close()
+
+    def test_large_pr_falls_back_to_git_diff(self):
+        repo = os.path.join(self.tmp.name, "repo")
+        os.makedirs(repo)
+
+        def git(*args):
+            return subprocess.run(
+                ["git", "-C", repo, "-c", "user.name=t", "-c", "user.email=t@t", *args],
+                check=True, capture_output=True, text=True,
+            ).stdout.strip()
+
+        git("init", "-q")
+        git("commit", "-q", "--allow-empty", "-m", "base")
+        base = git("rev-parse", "HEAD")
+        names = [f"f{i:02d}" for i in range(12)]
+        for name in names:
+            open(os.path.join(repo, name), "w").close()
+        git("add", ".")
+        git("commit", "-q", "-m", "head")
+        head = git("rev-parse", "HEAD")
+
+        self.stub.max_files = 5
+        self.stub.add_pr(1, files=names, base_sha=base, head_sha=head)
+        with patch.object(github, "MAX_PR_FILES", 5), patch.dict(os.environ, {"GITHUB_WORKSPACE": repo}):
+            self.assertEqual(sorted(self.gh.get_changed_files(1)), names)
+
+    def test_large_pr_without_checkout_fails_loudly(self):
+        self.stub.max_files = 5
+        self.stub.add_pr(1, files=[f"f{i}" for i in range(8)])
+        with patch.object(github, "MAX_PR_FILES", 5), patch.dict(os.environ, {"GITHUB_WORKSPACE": self.tmp.name}):
+            with self.assertRaises(RuntimeError):
+                self.gh.get_changed_files(1)
+
+
+class TestShardedComments(GitHubStubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stub.add_pr(1)
+        self.stub.add_comment(1, "someone else")
+
+    def bodies(self):
+        return [c["body"] for c in self.stub.comments[1][1:]]
+
+    def test_rerun_updates_in_place_and_deletes_stale(self):
+        first = self.gh.post_sharded_comments(
+            1, "plan", [("bootstrap", "a"), ("platform", "b"), ("data-prod", "c")]
+        )
+        self.assertEqual(len(first), 3)
+        self.assertIn("<!-- infra-shard:plan:2 -->\n### data-prod", self.bodies()[2])
+
+        second = self.gh.post_sharded_comments(1, "plan", [("bootstrap", "a"), ("platform", "b2")])
+
+        self.assertEqual(second, first[:2])
+        self.assertEqual(len(self.stub.comments[1]), 3)
+        self.assertIn("b2", self.bodies()[1])
+        # Unchanged shard is not re-sent
+        patches = [r for r in self.stub.requests if r[0] == "PATCH"]
+        self.assertEqual(len(patches), 1)
+        self.assertIsNone(self.gh.markers.get(1, "<!-- infra-shard:plan:2 -->"))
+
+    def test_keys_are_independent(self):
+        self.gh.post_sharded_comments(1, "plan", [("a", "x")])
+        self.gh.post_sharded_comments(1, "apply", [("a", "y")])
+        self.gh.post_sharded_comments(1, "plan", [("a", "z")])
+        self.assertEqual(len(self.bodies()), 2)
+
+    def test_large_section_split_with_fences(self):
+        body = "```diff\n" + "\n".join(f"+ line {i}" for i in range(300)) + "\n```"
+        shards = split_shards([("platform", body)], limit=1000)
+
+        self.assertGreater(len(shards), 2)
+        self.assertEqual(shards[0][0], f"platform (1/{len(shards)})")
+        for _, chunk in shards:
+            self.assertLessEqual(len(chunk), 1000)
+            self.assertTrue(chunk.startswith("```diff"))
+            self.assertTrue(chunk.endswith("```"))
+        rejoined = [l for _, c in shards for l in c.splitlines() if not l.startswith("```")]
+        self.assertEqual(rejoined, [f"+ line {i}" for i in range(300)])
+
+    def test_invalid_key(self):
+        with self.assertRaises(ValueError):
+            self.gh.post_sharded_comments(1, "bad key", [("a", "b")])
+
+
+if __name__ == "__main__":
+    unittest.main()
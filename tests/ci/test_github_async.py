@@ -0,0 +1,70 @@
+import asyncio
+import time
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+sys.path.append(os.path.dirname(__file__))
+
+from ci.core.github_async import AsyncGitHubClient
+from ci.core.ratelimit import RateLimitExceeded
+from test_github import GitHubStubTestCase
+
+
+class TestAsyncGitHubClient(GitHubStubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.agh = AsyncGitHubClient(client=self.gh, concurrency=4)
+
+    def test_statuses_dispatched_concurrently(self):
+        self.stub.latency = 0.1
+        statuses = [{"state": "success", "context": f"plan/layer-{i}"} for i in range(8)]
+
+        start = time.monotonic()
+        errors = asyncio.run(self.agh.create_commit_statuses("a" * 40, statuses))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(errors, [None] * 8)
+        self.assertEqual(
+            sorted(s["context"] for s in self.stub.statuses),
+            sorted(s["context"] for s in statuses),
+        )
+        self.assertEqual(self.stub.max_inflight, 4)
+        self.assertLess(elapsed, 0.6)  # serial would be >= 0.8s
+        # Shared session: pooled connections, not one per request
+        self.assertLessEqual(self.stub.connections, 4)
+
+    def test_errors_reported_per_status(self):
+        self.gh.limiter.max_retries = 0
+        self.stub.throttle_next = 1
+        statuses = [{"state": "success", "context": f"c{i}"} for i in range(3)]
+
+        results = asyncio.run(self.agh.create_commit_statuses("a" * 40, statuses))
+
+        errors = [r for r in results if r is not None]
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], RateLimitExceeded)
+        self.assertEqual(len(self.stub.statuses), 2)
+
+    def test_same_methods_as_sync_client(self):
+        self.stub.add_pr(3, files=["a.tf"])
+
+        async def flow():
+            comment_id = await self.agh.create_comment(3, "<!-- m --> hi")
+            await self.agh.update_comment(comment_id, "<!-- m --> done")
+            pr, files, comment = await asyncio.gather(
+                self.agh.get_pr(3),
+                self.agh.get_changed_files(3),
+                self.agh.find_comment_by_marker(3, "<!-- m -->"),
+            )
+            return pr, files, comment
+
+        pr, files, comment = asyncio.run(flow())
+        self.assertEqual(pr, self.gh.get_pr(3))
+        self.assertEqual(files, ["a.tf"])
+        self.assertEqual(comment["body"], "<!-- m --> done")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import io
+import os
+import tempfile
+import types
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.core.history import DriftHistory, ScanRecord
+from ci.plan_report import PlanReport, ResourceChange
+
+
+def drift(*addresses):
+    return PlanReport.from_changes([ResourceChange(a, "update") for a in addresses])
+
+
+class TestDriftHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "drift.sqlite")
+        self.history = DriftHistory(self.path)
+
+    def tearDown(self):
+        self.history.close()
+        self.tmp.cleanup()
+
+    def run_scan(self, ts, layer="platform", report=None, plan_seconds=10.0, mode="full", status=None):
+        status = status or ("drift" if report and report.has_changes else "no_drift")
+        self.history.record(
+            [ScanRecord(layer, status, mode, report, plan_seconds=plan_seconds, ts=ts)],
+            run_id=f"run-{ts}",
+        )
+
+    def test_records_persist(self):
+        self.run_scan(1, report=drift("a.b", "c.d"))
+        self.history.close()
+        self.history = DriftHistory(self.path)
+
+        [row] = self.history.scans()
+        self.assertEqual((row["layer"], row["status"], row["change_count"]), ("platform", "drift", 2))
+        self.assertEqual(row["run_id"], "run-1")
+
+    def test_flapping_resources(self):
+        # a.b drifts, gets fixed, drifts again; c.d drifts once and stays drifted
+        self.run_scan(1, report=drift("a.b"))
+        self.run_scan(2)
+        self.run_scan(3, report=drift("a.b", "c.d"))
+        self.run_scan(4, report=drift("c.d"))
+        # Neither skipped/failed nor targeted scans count as "clean"
+        self.run_scan(5, status="skipped")
+        self.run_scan(6, mode="targeted")
+        self.run_scan(7, report=drift("c.d"))
+
+        [flap] = self.history.flapping()
+        self.assertEqual((flap.address, flap.flips, flap.drifted_scans, flap.scans), ("a.b", 3, 2, 5))
+
+    def test_plan_time_regressions(self):
+        for ts in range(10):
+            self.run_scan(ts, layer="platform", plan_seconds=10.0)
+            self.run_scan(ts, layer="data-prod", plan_seconds=20.0)
+        for ts in range(10, 15):
+            self.run_scan(ts, layer="platform", plan_seconds=25.0)
+            self.run_scan(ts, layer="data-prod", plan_seconds=22.0)
+            # Refresh-only scans are much cheaper and not compared with full ones
+            self.run_scan(ts, layer="data-prod", plan_seconds=1.0, mode="refresh-only")
+
+        [reg] = self.history.regressions()
+        self.assertEqual((reg.layer, reg.baseline_seconds, reg.recent_seconds), ("platform", 10.0, 25.0))
+
+
+class TestDriftReportCommand(unittest.TestCase):
+    def test_report_renders_from_history(self):
+        with tempfile.TemporaryDirectory() as tmp, patch.dict(os.environ, {"CI_HISTORY_DB": os.path.join(tmp, "h.sqlite")}):
+            from ci.commands import drift_report
+
+            out = io.StringIO()
+            with redirect_stdout(out):
+                drift_report.run(types.SimpleNamespace())
+            self.assertIn("No verify runs recorded yet.", out.getvalue())
+
+            with DriftHistory() as history:
+                now = __import__("time").time()
+                for i, report in enumerate([drift("x.y"), None, drift("x.y")]):
+                    history.record([ScanRecord("bootstrap", "drift" if report else "no_drift", report=report, plan_seconds=5, ts=now - 10 + i)])
+
+            out = io.StringIO()
+            with redirect_stdout(out):
+                self.assertEqual(drift_report.run(types.SimpleNamespace(days=7)), 0)
+            self.assertIn("| bootstrap | 3 | 2 | 0 | 5.0 |", out.getvalue())
+            self.assertIn("| bootstrap | `x.y` | 2 | 2/3 |", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.config import Layer
+from ci.core.journal import RunJournal
+from ci.core.scanner import LayerScan, ScanStatus
+from ci.core.terraform import ExecutionResult
+
+
+def layer(name):
+    return Layer(name=name, path=name, engine="terraform")
+
+
+class TestRunJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "journal")
+        self.plans = os.path.join(self.tmp.name, "job", "plans")
+        self.journal = RunJournal(self.root, self.plans)
+        self.journal.start("full", sha="abc")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def scan(self, name, status):
+        plan_file = os.path.join(self.tmp.name, f"{name}.out")
+        with open(plan_file, "w") as f:
+            f.write(f"plan for {name}")
+        init = ExecutionResult(True, 0, "", "", cached=True)
+        plan = ExecutionResult(True, 2, "", "", plan_file=plan_file)
+        self.journal.record_scan(LayerScan(layer(name), status, init, plan))
+
+    def reload(self):
+        journal = RunJournal(self.root, self.plans)
+        self.assertIsNotNone(journal.load())
+        return journal
+
+    def test_checkpoints_survive_restart(self):
+        self.scan("a", ScanStatus.DRIFT)
+        self.scan("b", ScanStatus.NO_DRIFT)
+        self.journal.record_apply("a", "running")
+
+        journal = self.reload()
+        self.assertEqual((journal.state.sha, journal.state.mode), ("abc", "full"))
+        a, b = journal.entry("a"), journal.entry("b")
+        self.assertEqual((a.init, a.scan, a.apply), ("cached", "drift", "running"))
+        with open(a.plan_file) as f:
+            self.assertEqual(f.read(), "plan for a")
+        self.assertIsNone(b.plan_file)
+        # Plans (plaintext inputs) stay job-scoped, out of the persistent journal dir
+        self.assertEqual(os.path.dirname(a.plan_file), self.plans)
+        self.assertEqual(os.listdir(self.root), ["journal.json"])
+        self.assertEqual(os.stat(a.plan_file).st_mode & 0o777, 0o600)
+
+    def test_resume_decisions(self):
+        self.scan("clean", ScanStatus.NO_DRIFT)
+        self.scan("applied", ScanStatus.DRIFT)
+        self.scan("pending", ScanStatus.DRIFT)
+        self.scan("failed", ScanStatus.DRIFT)
+        self.scan("broken", ScanStatus.ERROR)
+        self.journal.record_apply("applied", "success")
+        self.journal.record_apply("failed", "failed")
+
+        journal = self.reload()
+        needs_scan = {name for name in journal.state.layers if journal.entry(name).needs_scan}
+        pending = {name for name in journal.state.layers if journal.entry(name).pending_apply}
+        self.assertEqual(needs_scan, {"failed", "broken"})
+        self.assertEqual(pending, {"pending", "failed"})
+        self.assertTrue(journal.entry("never-seen").needs_scan)
+
+    def test_finish_is_complete_only_when_nothing_left(self):
+        self.scan("a", ScanStatus.DRIFT)
+        self.journal.finish(success=True)
+        self.assertFalse(self.reload().state.complete)
+
+        self.journal.record_apply("a", "success")
+        self.journal.finish(success=True)
+        self.assertTrue(self.reload().state.complete)
+
+    def test_start_discards_previous_plans(self):
+        self.scan("a", ScanStatus.DRIFT)
+        plan_file = self.journal.entry("a").plan_file
+        self.journal.start("full", sha="def")
+        self.assertFalse(os.path.exists(plan_file))
+        self.assertEqual(self.reload().state.layers, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
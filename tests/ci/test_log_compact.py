@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.log_compact import LogCompactor, compact_log
+
+BOXED_ERROR = """\
+╷
+│ Error: creating S3 Bucket (logs): BucketAlreadyExists
+│ 
+│   with aws_s3_bucket.logs,
+│   on main.tf line 12, in resource "aws_s3_bucket" "logs":
+│   12: resource "aws_s3_bucket" "logs" {
+│ 
+╵"""
+
+PLAIN_ERROR = """\
+Error: Invalid reference
+
+  on main.tf line 3:
+   3:   x = foo
+
+A reference to a resource type must be followed by at least one attribute.
+
+Releasing state lock."""
+
+
+class TestLogCompactor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def compact(self, lines, **kwargs):
+        return compact_log(lines, artifact_dir=self.tmp.name, **kwargs)
+
+    def test_short_log_unchanged(self):
+        log = self.compact(["Initializing...", "Plan: 1 to add, 0 to change, 0 to destroy."])
+        self.assertEqual(log.text, "Initializing...\nPlan: 1 to add, 0 to change, 0 to destroy.")
+        self.assertFalse(log.truncated)
+        self.assertIsNone(log.artifact)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_refresh_lines_collapsed(self):
+        lines = ["start"] + [
+            f"aws_s3_bucket.b{i}: Refreshing state... [id=b{i}]" for i in range(500)
+        ] + ["data.aws_iam_policy.p: Reading...", "data.aws_iam_policy.p: Read complete after 0s [id=1]", "end"]
+        log = self.compact(lines)
+        self.assertEqual(log.text, "start\n... (502 resources refreshed)\nend")
+
+    def test_error_survives_long_log(self):
+        lines = [f"line {i} " + "x" * 80 for i in range(5000)] + BOXED_ERROR.splitlines()
+        log = self.compact(lines, limit=10000)
+
+        self.assertLessEqual(len(log.text), 10000)
+        self.assertTrue(log.text.startswith("=== Errors and warnings ===\nError: creating S3 Bucket"))
+        self.assertIn("line 0 ", log.text)
+        self.assertTrue(log.text.endswith("╵"))
+        self.assertTrue(log.truncated)
+        # Full raw log kept as an artifact
+        with open(log.artifact) as f:
+            self.assertEqual(sum(1 for _ in f), 5000 + len(BOXED_ERROR.splitlines()))
+        self.assertIn(f"full log: {os.path.basename(log.artifact)}", log.text)
+
+    def test_spool_removed_without_artifact_dir(self):
+        lines = [f"line {i} " + "x" * 80 for i in range(2000)]
+        with patch.dict(os.environ, {"RUNNER_TEMP": self.tmp.name}):
+            os.environ.pop("CI_ARTIFACT_DIR", None)
+            log = compact_log(lines, limit=5000)
+        self.assertTrue(log.truncated)
+        self.assertIsNone(log.artifact)
+        self.assertNotIn("full log", log.text)
+        self.assertEqual(os.listdir(os.path.join(self.tmp.name, "infra-ci", "logs")), [])
+
+    def test_plain_diagnostics(self):
+        compactor = LogCompactor(artifact_dir=self.tmp.name)
+        for line in PLAIN_ERROR.splitlines() + ["Warning: Deprecated attribute", "", "detail"]:
+            compactor.feed(line)
+        log = compactor.result()
+        self.assertEqual(log.diagnostics[0], "\n".join(PLAIN_ERROR.splitlines()[:-2]))
+        self.assertEqual(log.diagnostics[1], "Warning: Deprecated attribute\n\ndetail")
+
+    def test_head_and_tail_do_not_overlap(self):
+        lines = [f"{i:04d}" + "y" * 95 for i in range(200)]
+        log = self.compact(lines, limit=5000, head_lines=10, tail_lines=30)
+        body = log.text.splitlines()
+        self.assertEqual(body[:10], lines[:10])
+        self.assertEqual(body[-30:], lines[-30:])
+        self.assertEqual(log.omitted_lines, 160)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.config import Layer
+from ci.core.metrics import MetricsRecorder, ProcessMetrics, phase_name
+from ci.core.terraform import TerraformRunner
+
+LAYER = Layer(name="test", path=".", engine="terraform")
+
+# Burns CPU, holds ~64 MiB in a grandchild, writes 3000 bytes of stdout
+SCRIPT = (
+    "import subprocess, sys, time\n"
+    "child = 'x = bytearray(64 * 1024 * 1024); x[::4096] = b\"y\" * len(x[::4096]); time.sleep(0.6)'\n"
+    "subprocess.run([sys.executable, '-c', 'import time\\n' + child])\n"
+    "n = 0\n"
+    "for i in range(2_000_000): n += i\n"
+    "sys.stdout.write('z' * 3000)\n"
+    "sys.stderr.write('e' * 10)\n"
+)
+
+
+class Collector:
+    """Local OTLP/HTTP collector stand-in: records POSTed trace payloads."""
+
+    def __init__(self):
+        self.payloads = []
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                collector.payloads.append((self.path, self.headers["Content-Type"], json.loads(body)))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def spans(self):
+        return [
+            span
+            for _, _, payload in self.payloads
+            for resource in payload["resourceSpans"]
+            for scope in resource["scopeSpans"]
+            for span in scope["spans"]
+        ]
+
+
+class TestRunMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ["CI_LOG_DIR"] = self.tmp.name
+
+    def tearDown(self):
+        os.environ.pop("CI_LOG_DIR", None)
+        self.tmp.cleanup()
+
+    def _run(self, stream):
+        recorder = MetricsRecorder(path=os.path.join(self.tmp.name, "metrics.jsonl"))
+        runner = TerraformRunner(LAYER, repo_root=self.tmp.name, stream=stream)
+        with patch("ci.core.terraform.get_recorder", return_value=recorder), \
+                patch("sys.stdout", new_callable=lambda: open(os.devnull, "w")):
+            result = runner._run([sys.executable, "-c", SCRIPT])
+        with open(recorder.path) as f:
+            return result, [json.loads(line) for line in f]
+
+    def _check(self, result, records):
+        m = result.metrics
+        self.assertGreater(m.wall_seconds, 0.5)
+        self.assertEqual(result.duration, m.wall_seconds)
+        self.assertGreater(m.cpu_seconds, 0.05)
+        # The grandchild's 64 MiB is part of the tree's peak
+        self.assertGreater(m.peak_rss_bytes, 64 * 1024 * 1024)
+        self.assertEqual((m.stdout_bytes, m.stderr_bytes), (3000, 10))
+        [record] = records
+        self.assertEqual((record["layer"], record["exit_code"]), ("test", 0))
+        self.assertEqual(record["peak_rss_bytes"], m.peak_rss_bytes)
+
+    def test_captured_run(self):
+        self._check(*self._run(stream=False))
+
+    def test_streamed_run(self):
+        self._check(*self._run(stream=True))
+
+
+class TestOtlpExport(unittest.TestCase):
+    def setUp(self):
+        self.collector = Collector()
+
+    def tearDown(self):
+        self.collector.close()
+
+    def test_spans_batched_to_collector(self):
+        recorder = MetricsRecorder(otlp_endpoint=self.collector.url + "/", batch_size=2)
+        metrics = ProcessMetrics(wall_seconds=1.5, cpu_user_seconds=0.25, peak_rss_bytes=1024)
+        recorder.record("platform", ["terragrunt", "init", "-no-color"], 0, metrics, started_at=100.0)
+        self.assertEqual(self.collector.payloads, [])  # buffered until the batch fills
+        recorder.record("platform", ["terragrunt", "plan", "-refresh-only"], 1, metrics, started_at=102.0)
+        recorder.record("data-prod", ["terragrunt", "apply"], 0, metrics, started_at=104.0)
+        recorder.flush()
+
+        self.assertEqual(len(self.collector.payloads), 2)
+        path, content_type, payload = self.collector.payloads[0]
+        self.assertEqual((path, content_type), ("/v1/traces", "application/json"))
+        resource = payload["resourceSpans"][0]["resource"]["attributes"]
+        self.assertIn({"key": "service.name", "value": {"stringValue": "infra-ci"}}, resource)
+
+        init, refresh, apply = self.collector.spans()
+        self.assertEqual([init["name"], refresh["name"], apply["name"]],
+                         ["init platform", "refresh platform", "apply data-prod"])
+        self.assertEqual({s["traceId"] for s in (init, refresh, apply)}, {recorder.trace_id})
+        self.assertEqual((init["startTimeUnixNano"], init["endTimeUnixNano"]),
+                         ("100000000000", "101500000000"))
+        self.assertEqual((init["status"]["code"], refresh["status"]["code"]), (1, 2))
+        attrs = {a["key"]: a["value"] for a in init["attributes"]}
+        self.assertEqual(attrs["process.memory.peak_rss_bytes"], {"intValue": "1024"})
+        self.assertEqual(attrs["process.cpu.user_seconds"], {"doubleValue": 0.25})
+
+    def test_export_failure_does_not_raise(self):
+        recorder = MetricsRecorder(otlp_endpoint="http://127.0.0.1:9", batch_size=1)
+        with patch("builtins.print") as printed:
+            recorder.record("a", ["terraform", "plan"], 0, ProcessMetrics(), started_at=0)
+            recorder.record("a", ["terraform", "plan"], 0, ProcessMetrics(), started_at=0)
+        printed.assert_called_once()
+
+    def test_phase_names(self):
+        self.assertEqual(phase_name(["terraform", "plan", "-no-color"]), "plan")
+        self.assertEqual(phase_name(["terraform", "plan", "-refresh-only"]), "refresh")
+        self.assertEqual(phase_name(["terragrunt", "state", "pull"]), "state")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import threading
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.config import get_layers_by_order
+from ci.core.scanner import scan_layers, ScanStatus
+from ci.core.terraform import ExecutionResult, PlanResult
+
+
+def _ok():
+    return ExecutionResult(success=True, exit_code=0, stdout="", stderr="")
+
+
+class TestScanner(unittest.TestCase):
+    @patch("ci.core.scanner.TerraformRunner")
+    def test_layers_scanned_concurrently(self, mock_runner):
+        layers = get_layers_by_order()
+        # Every layer must be inside plan() at the same time to pass the barrier
+        barrier = threading.Barrier(len(layers), timeout=5)
+
+        def plan(detailed_exitcode=True, refresh=None):
+            barrier.wait()
+            return ExecutionResult(True, 0, "", "", plan_result=PlanResult.NO_CHANGES)
+
+        mock_runner.return_value.init.side_effect = lambda: _ok()
+        mock_runner.return_value.plan.side_effect = plan
+
+        scans = scan_layers(layers, max_workers=len(layers), on_progress=lambda l, m: None)
+
+        self.assertEqual([s.layer for s in scans], layers)
+        self.assertTrue(all(s.status == ScanStatus.NO_DRIFT for s in scans))
+
+    @patch("ci.core.scanner.TerraformRunner")
+    def test_statuses_keep_input_order(self, mock_runner):
+        layers = get_layers_by_order()
+        outcomes = {
+            "bootstrap": PlanResult.NO_CHANGES,
+            "platform": PlanResult.HAS_CHANGES,
+            "data-staging": PlanResult.ERROR,
+        }
+
+        def make_runner(layer):
+            runner = unittest.mock.MagicMock()
+            if layer.name == "data-prod":
+                runner.init.return_value = ExecutionResult(False, 1, "", "boom")
+            else:
+                runner.init.return_value = _ok()
+                runner.plan.return_value = ExecutionResult(
+                    True, 0, "", "", plan_result=outcomes[layer.name]
+                )
+            return runner
+
+        mock_runner.side_effect = make_runner
+
+        scans = scan_layers(layers, max_workers=2, on_progress=lambda l, m: None)
+
+        self.assertEqual(
+            [s.status for s in scans],
+            [ScanStatus.NO_DRIFT, ScanStatus.DRIFT, ScanStatus.ERROR, ScanStatus.INIT_FAILED],
+        )
+        self.assertEqual([s.failed for s in scans], [False, False, True, True])
+
+    @patch("ci.core.scanner.TerraformRunner")
+    def test_scan_modes(self, mock_runner):
+        layer = get_layers_by_order()[0]
+        runner = mock_runner.return_value
+        runner.init.return_value = _ok()
+        drift = ExecutionResult(True, 2, "", "", plan_result=PlanResult.HAS_CHANGES)
+        runner.refresh_only.return_value = drift
+        runner.plan.return_value = drift
+        quiet = dict(on_progress=lambda l, m: None)
+
+        [scan] = scan_layers([layer], mode="refresh-only", **quiet)
+        self.assertEqual(scan.status, ScanStatus.DRIFT)
+        runner.plan.assert_not_called()
+
+        runner.last_applied.return_value = ["aws_s3_bucket.a", "aws_s3_bucket.b"]
+        scan_layers([layer], mode="targeted", **quiet)
+        runner.plan.assert_called_with(
+            detailed_exitcode=True, targets=["aws_s3_bucket.a", "aws_s3_bucket.b"], refresh=True
+        )
+
+        # Nothing to target: fall back to a full plan
+        runner.last_applied.return_value = []
+        scan_layers([layer], mode="targeted", **quiet)
+        # Drift scans refresh even if the layer profile skips refresh
+        runner.plan.assert_called_with(detailed_exitcode=True, refresh=True)
+
+        with self.assertRaises(ValueError):
+            scan_layers([layer], mode="partial", **quiet)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import threading
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.config import LAYERS, get_layers_by_order
+from ci.core.scheduler import run_waves, LayerOutcome
+
+
+def _quiet(layer, message):
+    pass
+
+
+class TestScheduler(unittest.TestCase):
+    def test_independent_layers_run_in_parallel(self):
+        layers = [LAYERS["data-staging"], LAYERS["data-prod"]]
+        barrier = threading.Barrier(2, timeout=5)
+
+        def action(layer):
+            barrier.wait()
+            return True
+
+        outcomes = run_waves(layers, action, on_progress=_quiet)
+        self.assertEqual(set(outcomes.values()), {LayerOutcome.SUCCESS})
+
+    def test_failure_skips_downstream(self):
+        calls = []
+
+        def action(layer):
+            calls.append(layer.name)
+            return layer.name != "platform"
+
+        outcomes = run_waves(get_layers_by_order(), action, on_progress=_quiet)
+
+        self.assertEqual(calls, ["bootstrap", "platform"])
+        self.assertEqual(outcomes["platform"], LayerOutcome.FAILED)
+        self.assertEqual(outcomes["data-staging"], LayerOutcome.SKIPPED)
+        self.assertEqual(outcomes["data-prod"], LayerOutcome.SKIPPED)
+
+    def test_failure_blocks_through_unselected_layer(self):
+        calls = []
+
+        def action(layer):
+            calls.append(layer.name)
+            return False
+
+        layers = [LAYERS["bootstrap"], LAYERS["data-staging"]]
+        outcomes = run_waves(layers, action, on_progress=_quiet)
+
+        self.assertEqual(calls, ["bootstrap"])
+        self.assertEqual(outcomes["data-staging"], LayerOutcome.SKIPPED)
+
+    def test_prior_failure_blocks_transitively(self):
+        layers = [LAYERS["data-staging"]]
+        outcomes = run_waves(layers, lambda l: True, failed=["bootstrap"], on_progress=_quiet)
+        self.assertEqual(outcomes, {"data-staging": LayerOutcome.SKIPPED})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import io
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.config import Layer, get_job_temp_dir
+from ci.core.session import find_repo_root, get_session, reset_sessions, tf_var_env
+from ci.core.terraform import TerraformRunner
+
+LAYER = Layer(name="data", path="envs/staging/data", engine="terragrunt")
+
+# Fake terragrunt: logs each call; "render-json" writes a config with the
+# layer's inputs (and hooks when FAKE_HOOKS is set); "init" writes the generated file
+FAKE_TERRAGRUNT = """\
+import json, os, sys
+with open(os.environ["FAKE_LOG"], "a") as f:
+    f.write("terragrunt " + " ".join(sys.argv[1:]) + "\\n")
+if sys.argv[1] == "render-json":
+    config = {
+        "inputs": {"region": os.environ.get("REGION", ""), "replicas": 3, "tags": {"a": "b"}},
+        "generate": {"backend": {"path": "backend.tf"}},
+        "terraform": {"source": None, "before_hook": {"x": {}} if os.environ.get("FAKE_HOOKS") else {}},
+    }
+    with open(sys.argv[sys.argv.index("--terragrunt-json-out") + 1], "w") as f:
+        json.dump(config, f)
+elif sys.argv[1] == "init":
+    open("backend.tf", "w").close()
+"""
+
+# Fake terraform: logs each call with the TF_VAR_* it received
+FAKE_TERRAFORM = """\
+import os, sys
+tf_vars = sorted(k + "=" + v for k, v in os.environ.items() if k.startswith("TF_VAR_"))
+with open(os.environ["FAKE_LOG"], "a") as f:
+    f.write("terraform " + " ".join(sys.argv[1:]) + " | " + " ".join(tf_vars) + "\\n")
+"""
+
+
+class TestRepoRoot(unittest.TestCase):
+    def tearDown(self):
+        reset_sessions()
+
+    def test_git_root_resolved_once(self):
+        reset_sessions()
+        with patch.dict(os.environ, {"GITHUB_WORKSPACE": ""}), \
+                patch("ci.core.session.subprocess.run") as run:
+            run.return_value.returncode = 0
+            run.return_value.stdout = "/repo\n"
+            self.assertEqual(find_repo_root(), "/repo")
+            self.assertEqual(find_repo_root(), "/repo")
+        self.assertEqual(run.call_count, 1)
+
+    def test_workspace_wins(self):
+        with patch.dict(os.environ, {"GITHUB_WORKSPACE": "/ws"}):
+            self.assertEqual(find_repo_root(), "/ws")
+
+
+class TestRunnerSession(unittest.TestCase):
+    def setUp(self):
+        reset_sessions()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmp.name, "repo")
+        self.work = os.path.join(self.repo, LAYER.path)
+        os.makedirs(self.work)
+        with open(os.path.join(self.repo, "terragrunt.hcl"), "w") as f:
+            f.write('inputs = { region = get_env("REGION", "") }\n')
+        with open(os.path.join(self.work, "terragrunt.hcl"), "w") as f:
+            f.write('include "root" { path = find_in_parent_folders() }\n')
+
+        bin_dir = os.path.join(self.tmp.name, "bin")
+        os.makedirs(bin_dir)
+        for name, script in (("terragrunt", FAKE_TERRAGRUNT), ("terraform", FAKE_TERRAFORM)):
+            path = os.path.join(bin_dir, name)
+            with open(path, "w") as f:
+                f.write(f"#!{sys.executable}\n{script}")
+            os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+        self.log = os.path.join(self.tmp.name, "calls.log")
+        self.env = patch.dict(os.environ, {
+            "PATH": bin_dir + os.pathsep + os.environ["PATH"],
+            "FAKE_LOG": self.log,
+            "REGION": "eu",
+            "RUNNER_TEMP": os.path.join(self.tmp.name, "runner-temp"),
+            "CI_CACHE_DIR": os.path.join(self.tmp.name, "cache"),
+        })
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        reset_sessions()
+        self.tmp.cleanup()
+
+    def runner(self):
+        return TerraformRunner(LAYER, repo_root=self.repo, stream=False)
+
+    def calls(self):
+        with open(self.log) as f:
+            return [line.strip() for line in f]
+
+    def run_commands(self, runner):
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(runner.init().success)
+            runner.validate()
+            runner.validate()
+
+    def test_shared_per_layer(self):
+        make_env = unittest.mock.Mock(return_value={})
+        first = get_session(LAYER, self.repo, make_env)
+        self.assertIs(get_session(LAYER, self.repo, make_env), first)
+        self.assertIs(self.runner().session, first)
+        make_env.assert_called_once()
+
+    def test_terraform_runs_directly_after_init(self):
+        self.run_commands(self.runner())
+        tf_vars = 'TF_VAR_region=eu TF_VAR_replicas=3 TF_VAR_tags={"a": "b"}'
+        self.assertEqual(self.calls(), [
+            "terragrunt init -no-color",
+            "terragrunt render-json --terragrunt-json-out " + self.calls()[1].split()[-1],
+            f"terraform validate -no-color | {tf_vars}",
+            f"terraform validate -no-color | {tf_vars}",
+        ])
+
+    def test_rendered_config_reused_across_processes(self):
+        self.run_commands(self.runner())
+        reset_sessions()  # a later CI step: new process, same job
+        self.run_commands(self.runner())
+        renders = [c for c in self.calls() if c.startswith("terragrunt render-json")]
+        self.assertEqual(len(renders), 1)
+
+        # A different value of an env var the HCL reads needs a new render
+        reset_sessions()
+        with patch.dict(os.environ, {"REGION": "us"}):
+            self.run_commands(self.runner())
+        self.assertEqual(len([c for c in self.calls() if c.startswith("terragrunt render-json")]), 2)
+        self.assertTrue(self.calls()[-1].endswith("TF_VAR_region=us TF_VAR_replicas=3 TF_VAR_tags={\"a\": \"b\"}"))
+
+    def test_runtime_only_config_keeps_terragrunt(self):
+        with patch.dict(os.environ, {"FAKE_HOOKS": "1"}):
+            self.run_commands(self.runner())
+        self.assertEqual(self.calls()[-1], "terragrunt validate -no-color")
+
+    def test_direct_mode_can_be_disabled(self):
+        with patch.dict(os.environ, {"CI_TERRAGRUNT_DIRECT": "false"}):
+            self.run_commands(self.runner())
+        self.assertEqual(self.calls(), ["terragrunt init -no-color"] + ["terragrunt validate -no-color"] * 2)
+
+    def test_caller_tf_vars_win(self):
+        self.assertEqual(tf_var_env({"a": "x", "b": [1]}), {"TF_VAR_a": "x", "TF_VAR_b": "[1]"})
+        with patch.dict(os.environ, {"TF_VAR_region": "override"}):
+            self.run_commands(self.runner())
+        self.assertIn("TF_VAR_region=override", self.calls()[-1])
+
+    def test_rendered_config_not_world_readable(self):
+        self.run_commands(self.runner())
+        directory = get_job_temp_dir("sessions")
+        [name] = os.listdir(directory)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.join(directory, name)).st_mode), 0o600)
+        self.assertEqual(stat.S_IMODE(os.stat(directory).st_mode), 0o700)
+
+
+if __name__ == "__main__":
+    unittest.main()
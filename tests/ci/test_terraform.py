@@ -0,0 +1,353 @@
+import io
+import sys
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.config import ExecutionProfile, Layer
+from ci.core.history import DriftHistory
+from ci.core.metrics import ProcessMetrics
+from ci.core.plan_cache import PlanCache
+from ci.core.session import reset_sessions
+from ci.core.terraform import ExecutionResult, PlanResult, TerraformRunner
+
+LAYER = Layer(name="test", path=".", engine="terraform")
+
+# Prints 500 numbered lines to stdout and one to stderr, then exits 3
+SCRIPT = (
+    "import sys\n"
+    "for i in range(500): print(f'line {i}')\n"
+    "print('oops', file=sys.stderr)\n"
+    "sys.exit(3)\n"
+)
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ["CI_LOG_DIR"] = self.tmp.name
+
+    def tearDown(self):
+        os.environ.pop("CI_LOG_DIR", None)
+        self.tmp.cleanup()
+
+    def test_stream_tees_to_console_and_spool(self):
+        runner = TerraformRunner(LAYER, repo_root=self.tmp.name, stream=True)
+        runner.tail_lines = 10
+        console = io.StringIO()
+        with redirect_stdout(console):
+            result = runner._run([sys.executable, "-c", SCRIPT])
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.exit_code, 3)
+        # Live echo, prefixed with the layer name
+        self.assertIn("  [test] line 499\n", console.getvalue())
+        # Only the ring buffer tail is held in memory
+        self.assertEqual(result.stdout.splitlines(), [f"line {i}" for i in range(490, 500)])
+        self.assertEqual(result.stderr, "oops\n")
+        # The spool file holds everything
+        lines = list(result.log.iter_lines())
+        self.assertEqual(len(lines), 501)
+        self.assertTrue(result.log.path.startswith(self.tmp.name))
+
+    def test_capture_mode_keeps_full_output(self):
+        runner = TerraformRunner(LAYER, repo_root=self.tmp.name, stream=False)
+        with redirect_stdout(io.StringIO()):
+            result = runner._run([sys.executable, "-c", SCRIPT])
+        self.assertIsNone(result.log)
+        self.assertEqual(len(result.stdout.splitlines()), 500)
+
+
+class TestInitFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ["CI_CACHE_DIR"] = os.path.join(self.tmp.name, "cache")
+        with open(os.path.join(self.tmp.name, ".terraform.lock.hcl"), "w") as f:
+            f.write('provider "registry.terraform.io/hashicorp/aws" {}\n')
+        self.runner = TerraformRunner(LAYER, repo_root=self.tmp.name)
+
+    def tearDown(self):
+        os.environ.pop("CI_CACHE_DIR", None)
+        self.tmp.cleanup()
+
+    @patch.object(TerraformRunner, "_run")
+    def test_init_skipped_until_lockfile_changes(self, mock_run):
+        mock_run.return_value = ExecutionResult(True, 0, "", "")
+
+        self.assertFalse(self.runner.init().cached)
+        self.assertTrue(self.runner.init().cached)
+        self.assertEqual(mock_run.call_count, 1)
+
+        with open(os.path.join(self.tmp.name, ".terraform.lock.hcl"), "a") as f:
+            f.write('provider "registry.terraform.io/hashicorp/helm" {}\n')
+        self.assertFalse(self.runner.init().cached)
+        self.assertEqual(mock_run.call_count, 2)
+
+        self.assertFalse(self.runner.init(force=True).cached)
+
+    @patch.object(TerraformRunner, "_run")
+    def test_failed_init_is_not_recorded(self, mock_run):
+        mock_run.return_value = ExecutionResult(False, 1, "", "boom")
+        self.runner.init()
+        self.runner.init()
+        self.assertEqual(mock_run.call_count, 2)
+
+
+class TestPlanCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ["CI_CACHE_DIR"] = os.path.join(self.tmp.name, "cache")
+        self.work = os.path.join(self.tmp.name, "layer")
+        os.makedirs(self.work)
+        with open(os.path.join(self.work, "main.tf"), "w") as f:
+            f.write('resource "null_resource" "a" {}\n')
+        self.layer = Layer(name="cache-test", path="layer", engine="terraform")
+        self.runner = TerraformRunner(self.layer, repo_root=self.tmp.name)
+        self.serial = 1
+
+    def tearDown(self):
+        os.environ.pop("CI_CACHE_DIR", None)
+        self.tmp.cleanup()
+
+    def _plan(self):
+        with patch.object(TerraformRunner, "state_pull", return_value={"serial": self.serial, "lineage": "l"}):
+            return self.runner.plan(out=None, use_cache=True)
+
+    @patch.object(TerraformRunner, "_run")
+    def test_replans_only_on_real_change(self, mock_run):
+        mock_run.return_value = ExecutionResult(
+            True, 2, "Plan: 1 to add, 0 to change, 0 to destroy.\n", "",
+            plan_result=PlanResult.HAS_CHANGES,
+        )
+
+        first = self._plan()
+        second = self._plan()
+        self.assertFalse(first.cached)
+        self.assertTrue(second.cached)
+        self.assertEqual(second.plan_result, PlanResult.HAS_CHANGES)
+        self.assertEqual(mock_run.call_count, 1)
+
+        self.serial = 2  # state serial bump
+        self.assertFalse(self._plan().cached)
+
+        with open(os.path.join(self.work, "main.tf"), "a") as f:
+            f.write('resource "null_resource" "b" {}\n')
+        self.assertFalse(self._plan().cached)
+        self.assertTrue(self._plan().cached)
+        self.assertEqual(mock_run.call_count, 3)
+
+    @patch.object(TerraformRunner, "_run")
+    def test_failed_plans_not_cached(self, mock_run):
+        mock_run.return_value = ExecutionResult(False, 1, "", "boom", plan_result=PlanResult.ERROR)
+        self._plan()
+        self._plan()
+        self.assertEqual(mock_run.call_count, 2)
+
+    @patch.object(TerraformRunner, "_run")
+    def test_get_env_inputs_are_part_of_the_key(self, mock_run):
+        mock_run.return_value = ExecutionResult(True, 0, "No changes.\n", "", plan_result=PlanResult.NO_CHANGES)
+        with open(os.path.join(self.tmp.name, "terragrunt.hcl"), "w") as f:
+            f.write('inputs = { base_domain = get_env("BASE_DOMAIN", "") }\n')
+        self.addCleanup(reset_sessions)
+
+        with patch.dict(os.environ, {"BASE_DOMAIN": "a.example"}):
+            reset_sessions()
+            self.runner = TerraformRunner(self.layer, repo_root=self.tmp.name)
+            self.assertFalse(self._plan().cached)
+            self.assertTrue(self._plan().cached)
+        with patch.dict(os.environ, {"BASE_DOMAIN": "b.example"}):
+            reset_sessions()
+            self.runner = TerraformRunner(self.layer, repo_root=self.tmp.name)
+            self.assertFalse(self._plan().cached)
+        self.assertEqual(mock_run.call_count, 2)
+
+    def test_plan_files_stay_job_scoped(self):
+        plan_file = os.path.join(self.work, "tfplan")
+        with open(plan_file, "wb") as f:
+            f.write(b"plan with secrets")
+        result = ExecutionResult(True, 2, "", "", plan_result=PlanResult.HAS_CHANGES)
+        result.plan_file = plan_file
+        cache_dir = os.environ["CI_CACHE_DIR"]
+
+        with patch.dict(os.environ, {"RUNNER_TEMP": os.path.join(self.tmp.name, "job1")}):
+            PlanCache("cache-test").put("k", result)
+            os.remove(plan_file)
+            self.assertTrue(PlanCache("cache-test").get("k", plan_file).plan_file)
+            with open(plan_file, "rb") as f:
+                self.assertEqual(f.read(), b"plan with secrets")
+        persisted = [name for _, _, files in os.walk(cache_dir) for name in files]
+        self.assertNotIn("tfplan", persisted)
+        self.assertFalse(any(name.endswith(".tfplan") for name in persisted))
+
+        # A later job has the result but not the plan: only plan-less lookups hit
+        with patch.dict(os.environ, {"RUNNER_TEMP": os.path.join(self.tmp.name, "job2")}):
+            self.assertIsNone(PlanCache("cache-test").get("k", plan_file))
+            self.assertTrue(PlanCache("cache-test").get("k").cached)
+
+
+REFRESH_ONLY_OUTPUT = """\
+Note: Objects have changed outside of Terraform
+
+Terraform detected the following changes made outside of Terraform since the
+last "terraform apply" which may have affected this plan:
+
+  # aws_s3_bucket.logs has changed
+  ~ resource "aws_s3_bucket" "logs" {
+    }
+
+  # aws_instance.web has been deleted
+  - resource "aws_instance" "web" {
+    }
+
+This is a refresh-only plan, so Terraform will not take any actions to undo
+these.
+"""
+
+APPLY_OUTPUT = """\
+aws_s3_bucket.logs: Modifying... [id=logs]
+aws_s3_bucket.logs: Modifications complete after 1s [id=logs]
+aws_instance.web["a b"]: Creation complete after 30s [id=i-1]
+aws_instance.old: Destruction complete after 2s
+
+Apply complete! Resources: 1 added, 1 changed, 1 destroyed.
+"""
+
+
+class TestDriftModes(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ["CI_CACHE_DIR"] = self.tmp.name
+        self.runner = TerraformRunner(LAYER, repo_root=self.tmp.name, stream=False)
+
+    def tearDown(self):
+        os.environ.pop("CI_CACHE_DIR", None)
+        self.tmp.cleanup()
+
+    def _fake_run(self, stdout, exit_code):
+        def run(cmd, detailed_exitcode=False, on_line=None, **kwargs):
+            self.cmd = cmd
+            for line in stdout.splitlines(keepends=True):
+                on_line(line)
+            return ExecutionResult(
+                True, exit_code, stdout, "",
+                plan_result=PlanResult.HAS_CHANGES if detailed_exitcode and exit_code == 2 else None,
+            )
+        return run
+
+    def test_refresh_only_reports_drift(self):
+        with patch.object(self.runner, "_run", self._fake_run(REFRESH_ONLY_OUTPUT, 2)):
+            result = self.runner.refresh_only(out=None)
+
+        self.assertEqual(self.cmd[1:4], ["plan", "-refresh-only", "-no-color"])
+        self.assertEqual(result.plan_result, PlanResult.HAS_CHANGES)
+        self.assertEqual(result.report.addresses("update"), ["aws_s3_bucket.logs"])
+        self.assertEqual(result.report.addresses("delete"), ["aws_instance.web"])
+
+    def test_targeted_plan(self):
+        with patch.object(self.runner, "_run", self._fake_run("No changes.\n", 0)):
+            self.runner.plan(out=None, targets=["a.b", 'c.d["k"]'])
+        self.assertEqual(self.cmd[-2:], ["-target=a.b", '-target=c.d["k"]'])
+
+    def test_saved_plan_is_job_scoped(self):
+        with patch.dict(os.environ, {"RUNNER_TEMP": self.tmp.name}), \
+                patch.object(self.runner, "_run", self._fake_run(REFRESH_ONLY_OUTPUT, 2)), \
+                patch.object(self.runner, "show_json") as show_json:
+            result = self.runner.refresh_only()
+
+        expected = os.path.join(self.tmp.name, "infra-ci", "plans", "test", "tfplan")
+        self.assertIn(f"-out={expected}", self.cmd)
+        self.assertEqual(result.plan_file, expected)
+        # show -json only for callers that ask for it
+        show_json.assert_not_called()
+        self.assertEqual(result.report.addresses("delete"), ["aws_instance.web"])
+
+    def test_apply_records_changed_addresses(self):
+        self.assertEqual(self.runner.last_applied(), [])
+        with patch.object(self.runner, "_run", self._fake_run(APPLY_OUTPUT, 0)):
+            self.runner.apply()
+        self.assertEqual(self.runner.last_applied(), ["aws_s3_bucket.logs", 'aws_instance.web["a b"]'])
+
+        # A no-op apply keeps the previous targets
+        with patch.object(self.runner, "_run", self._fake_run("Apply complete! Resources: 0 added\n", 0)):
+            self.runner.apply()
+        self.assertEqual(len(self.runner.last_applied()), 2)
+
+    def test_apply_saved_plan(self):
+        with patch.object(self.runner, "_run", self._fake_run(APPLY_OUTPUT, 0)):
+            self.runner.apply(plan_file="/cache/runs/verify/plans/test.tfplan")
+        self.assertEqual(self.cmd[1:], ["apply", "-no-color", "/cache/runs/verify/plans/test.tfplan"])
+
+
+class TestExecutionProfile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ["CI_CACHE_DIR"] = self.tmp.name
+        os.environ["CI_HISTORY_DB"] = os.path.join(self.tmp.name, "history.sqlite")
+        self.calls = []
+
+    def tearDown(self):
+        os.environ.pop("CI_CACHE_DIR", None)
+        os.environ.pop("CI_HISTORY_DB", None)
+        self.tmp.cleanup()
+
+    def runner(self, **profile):
+        layer = Layer(name="data", path=".", engine="terragrunt", profile=ExecutionProfile(**profile))
+        return TerraformRunner(layer, repo_root=self.tmp.name, stream=False)
+
+    def fake_run(self, cmd, detailed_exitcode=False, on_line=None, **kwargs):
+        self.calls.append(cmd)
+        for i in range(30):
+            on_line(f"helm_release.r{i}: Refreshing state... [id=r{i}]\n")
+        return ExecutionResult(True, 0, "", "", plan_result=PlanResult.NO_CHANGES,
+                               metrics=ProcessMetrics(wall_seconds=3.0))
+
+    def test_profile_flags(self):
+        runner = self.runner(parallelism=20, lock_timeout="5m", refresh=False)
+        with patch.object(runner, "_run", self.fake_run):
+            runner.plan(out=None)
+            runner.plan(out=None, refresh=True)
+            runner.refresh_only(out=None)
+            runner.apply()
+            runner.apply(plan_file="tfplan")
+
+        plan, forced, refresh_only, apply, saved = self.calls
+        self.assertEqual(plan[-3:], ["-refresh=false", "-parallelism=20", "-lock-timeout=5m"])
+        self.assertNotIn("-refresh=false", forced)
+        self.assertNotIn("-refresh=false", refresh_only)
+        self.assertIn("-parallelism=20", refresh_only)
+        self.assertEqual(apply[2:], ["-no-color", "-parallelism=20", "-lock-timeout=5m", "-auto-approve", "-refresh=false"])
+        # A saved plan already fixes refresh behaviour
+        self.assertEqual(saved[-1], "tfplan")
+        self.assertNotIn("-refresh=false", saved)
+
+    def test_profile_env(self):
+        runner = self.runner(env={"TF_LOG": "WARN"})
+        with patch("ci.core.terraform.subprocess.Popen", side_effect=OSError("no binary")) as popen, \
+                redirect_stdout(io.StringIO()):
+            runner._run(["terragrunt", "plan"])
+        self.assertEqual(popen.call_args.kwargs["env"]["TF_LOG"], "WARN")
+
+    def test_auto_parallelism_records_timings(self):
+        runner = self.runner(parallelism="auto")
+        with patch.object(runner, "_run", self.fake_run):
+            runner.plan(out=None)
+            runner.plan(out=None)
+            runner.plan(out=None, targets=["a.b"])
+            runner.refresh_only(out=None)
+        self.assertIn("-parallelism=10", self.calls[0])
+
+        with DriftHistory() as history:
+            timings = history.timings("data")
+            self.assertEqual(len(history.timings("data", phase="plan-targeted")), 1)
+            self.assertEqual(len(history.timings("data", phase="refresh")), 1)
+        self.assertEqual([(t.parallelism, t.resources, t.wall_seconds) for t in timings], [(10, 30, 3.0)] * 2)
+        # The next runner tries more concurrency
+        self.assertEqual(self.runner(parallelism="auto").parallelism, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
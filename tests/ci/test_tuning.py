@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.config import ExecutionProfile, Layer
+from ci.core.history import DriftHistory, PlanTiming
+from ci.core.tuning import DEFAULT_PARALLELISM, MAX_PARALLELISM, choose_parallelism, resolve_parallelism
+
+RESOURCES = 60
+
+
+def simulate(latency, runs=16):
+    """Tune against a fake provider; ``latency(p)`` is seconds per call at parallelism p."""
+    samples, chosen = [], []
+    for _ in range(runs):
+        p = choose_parallelism(samples)
+        chosen.append(p)
+        wall = latency(p) * RESOURCES / min(p, RESOURCES)
+        samples.insert(0, PlanTiming(p, RESOURCES, wall))
+    return chosen
+
+
+class TestChooseParallelism(unittest.TestCase):
+    def test_starts_at_terraform_default(self):
+        self.assertEqual(choose_parallelism([]), DEFAULT_PARALLELISM)
+
+    def test_scales_up_while_latency_bound(self):
+        # Calls take 1s regardless of concurrency: more in flight is always faster
+        chosen = simulate(lambda p: 1.0)
+        self.assertEqual(chosen[:6], [10, 10, 20, 20, 32, 32])
+        self.assertEqual(chosen[-1], MAX_PARALLELISM)
+
+    def test_backs_off_under_contention(self):
+        # The API server saturates: per-call latency grows faster than concurrency
+        chosen = simulate(lambda p: 0.5 * (p / 4) ** 1.5 if p > 4 else 0.5)
+        # Probes upwards once, then halves until the fastest setting is bracketed
+        self.assertEqual(chosen[:8], [10, 10, 20, 20, 5, 5, 2, 2])
+        self.assertEqual(chosen[-1], 5)
+
+    def test_settles_on_plateau(self):
+        # Past 20 calls in flight nothing improves (provider-side rate limit)
+        chosen = simulate(lambda p: max(1.0, p / 20))
+        self.assertEqual(chosen[-1], 20)
+
+    def test_capped_by_resource_count(self):
+        samples = [PlanTiming(10, 12, 2.0), PlanTiming(10, 12, 2.0)]
+        self.assertEqual(choose_parallelism(samples), 12)
+
+    def test_one_slow_run_does_not_move_setting(self):
+        samples = [PlanTiming(20, RESOURCES, 9.0), PlanTiming(10, RESOURCES, 6.0), PlanTiming(10, RESOURCES, 6.0)]
+        self.assertEqual(choose_parallelism(samples), 20)
+
+
+class TestResolveParallelism(unittest.TestCase):
+    def test_fixed_and_default_profiles(self):
+        self.assertIsNone(resolve_parallelism(Layer("a", "a", "terraform")))
+        layer = Layer("a", "a", "terraform", profile=ExecutionProfile(parallelism=4))
+        self.assertEqual(resolve_parallelism(layer), 4)
+
+    def test_auto_reads_history(self):
+        layer = Layer("data", "data", "terragrunt", profile=ExecutionProfile(parallelism="auto"))
+        with tempfile.TemporaryDirectory() as tmp, DriftHistory(os.path.join(tmp, "h.sqlite")) as history:
+            self.assertEqual(resolve_parallelism(layer, history), DEFAULT_PARALLELISM)
+            for ts in (1, 2):
+                history.record_timing("data", "plan", 10, RESOURCES, 6.0, ts=ts)
+            history.record_timing("other", "plan", 4, RESOURCES, 6.0, ts=3)
+            # Refresh-only and targeted plans don't count towards full-plan tuning
+            history.record_timing("data", "refresh", 20, RESOURCES, 1.0, ts=4)
+            history.record_timing("data", "plan-targeted", 20, 5, 1.0, ts=5)
+            self.assertEqual(resolve_parallelism(layer, history), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+from unittest.mock import patch
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../tools")))
+
+from ci.commands import verify
+from ci.core.journal import RunJournal
+from ci.core.scanner import LayerScan, ScanStatus
+from ci.core.snapshot import PreCheck
+from ci.core.terraform import ExecutionResult, LogHandle, PlanResult
+
+DRIFT, CLEAN, ERROR = ScanStatus.DRIFT, ScanStatus.NO_DRIFT, ScanStatus.ERROR
+
+
+class VerifyTestCase(unittest.TestCase):
+    """verify.run with scans and applies replaced by fakes (no terraform)."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        env = patch.dict(os.environ, {
+            "CI_CACHE_DIR": os.path.join(self.tmp.name, "cache"),
+            "CI_HISTORY_DB": os.path.join(self.tmp.name, "history.db"),
+            "RUNNER_TEMP": os.path.join(self.tmp.name, "runner"),
+            "GITHUB_SHA": "abc123",
+        })
+        env.start()
+        self.addCleanup(env.stop)
+
+        # Scan status per layer (default: clean) and layers whose apply fails
+        self.statuses: dict[str, ScanStatus] = {}
+        self.failing_applies: set[str] = set()
+        # Layers the snapshot pre-check reports as unchanged
+        self.unchanged: set[str] = set()
+        self.scanned: list[list[str]] = []
+        # (layer, content of the plan file applied or None) in apply order
+        self.applies: list[tuple[str, str | None]] = []
+
+        for target, fake in (
+            ("scan_layers", self.fake_scan_layers),
+            ("_precheck", self.fake_precheck),
+            ("TerraformRunner", self.fake_runner),
+        ):
+            patcher = patch.object(verify, target, side_effect=fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_precheck(self, layers, store, jobs):
+        return {
+            layer.name: PreCheck(layer, None, None, "" if layer.name in self.unchanged else "no previous clean verify")
+            for layer in layers
+        }
+
+    def fake_scan_layers(self, layers, max_workers=None, mode="full", on_scan=None):
+        self.scanned.append([layer.name for layer in layers])
+        scans = []
+        for layer in layers:
+            status = self.statuses.get(layer.name, CLEAN)
+            plan_file = os.path.join(self.tmp.name, f"{layer.name}.tfplan")
+            with open(plan_file, "w") as f:
+                f.write(f"plan {len(self.scanned)} for {layer.name}")
+            init = ExecutionResult(True, 0, "", "", cached=True)
+            plan_result = {CLEAN: PlanResult.NO_CHANGES, DRIFT: PlanResult.HAS_CHANGES}.get(status, PlanResult.ERROR)
+            plan = ExecutionResult(
+                status != ERROR, plan_result.value, "", "", plan_result=plan_result, plan_file=plan_file
+            )
+            scan = LayerScan(layer, status, init, plan)
+            on_scan(scan)
+            scans.append(scan)
+        return scans
+
+    def fake_runner(self, layer, stream=None):
+        test = self
+
+        class Runner:
+            def apply(self, auto_approve=False, plan_file=None, refresh=None):
+                content = None
+                if plan_file:
+                    with open(plan_file) as f:
+                        content = f.read()
+                test.applies.append((layer.name, content))
+                ok = layer.name not in test.failing_applies
+                log = os.path.join(test.tmp.name, f"{layer.name}-apply.log")
+                with open(log, "w") as f:
+                    f.write("unredacted apply output")
+                return ExecutionResult(ok, 0 if ok else 1, "", "", log=LogHandle(log))
+
+        return Runner()
+
+    def verify(self, **kwargs):
+        args = SimpleNamespace(apply=True, pr=None, jobs=None, full=False, mode="full", resume=False)
+        for key, value in kwargs.items():
+            setattr(args, key, value)
+        with redirect_stdout(io.StringIO()):
+            return verify.run(args)
+
+    def journal(self) -> RunJournal:
+        journal = RunJournal()
+        journal.load()
+        return journal
+
+
+class TestVerify(VerifyTestCase):
+    def test_saved_plans_applied(self):
+        self.statuses = {"data-staging": DRIFT, "data-prod": DRIFT}
+
+        self.assertEqual(self.verify(), 0)
+        self.assertEqual(self.scanned, [["bootstrap", "platform", "data-staging", "data-prod"]])
+        self.assertEqual(sorted(self.applies), [
+            ("data-prod", "plan 1 for data-prod"),
+            ("data-staging", "plan 1 for data-staging"),
+        ])
+        self.assertTrue(self.journal().state.complete)
+        # Streamed apply logs are removed once the outcome is recorded
+        self.assertFalse([name for name in os.listdir(self.tmp.name) if name.endswith("-apply.log")])
+
+    def test_no_apply_without_flag(self):
+        self.statuses = {"platform": DRIFT}
+        self.assertEqual(self.verify(apply=False), 0)
+        self.assertEqual(self.applies, [])
+        self.assertFalse(self.journal().state.complete)
+
+    def test_scan_failure_skips_downstream(self):
+        self.statuses = {"platform": ERROR, "bootstrap": DRIFT, "data-prod": DRIFT}
+
+        self.assertEqual(self.verify(), 1)
+        self.assertEqual([name for name, _ in self.applies], ["bootstrap"])
+        self.assertEqual(self.journal().entry("data-prod").apply, "skipped")
+
+    def test_apply_failure_skips_downstream(self):
+        self.statuses = {"platform": DRIFT, "data-staging": DRIFT}
+        self.failing_applies = {"platform"}
+
+        self.assertEqual(self.verify(), 1)
+        self.assertEqual(self.applies, [("platform", "plan 1 for platform")])
+        journal = self.journal()
+        self.assertEqual(journal.entry("platform").apply, "failed")
+        self.assertEqual(journal.entry("data-staging").apply, "skipped")
+        self.assertFalse(journal.state.complete)
+
+    def test_resume_replans_only_failed_and_skipped(self):
+        self.statuses = {"bootstrap": DRIFT, "platform": DRIFT, "data-staging": DRIFT}
+        self.failing_applies = {"platform"}
+        self.assertEqual(self.verify(), 1)
+
+        self.failing_applies = set()
+        self.applies = []
+        self.assertEqual(self.verify(resume=True), 0)
+        # bootstrap (applied) and data-prod (clean) carry over
+        self.assertEqual(self.scanned[-1], ["platform", "data-staging"])
+        self.assertEqual([name for name, _ in self.applies], ["platform", "data-staging"])
+        self.assertEqual(self.applies[0], ("platform", "plan 2 for platform"))
+        self.assertTrue(self.journal().state.complete)
+
+    def test_plan_dropped_after_upstream_apply(self):
+        self.statuses = {"platform": DRIFT, "data-staging": DRIFT}
+
+        self.assertEqual(self.verify(), 0)
+        # data-staging was planned against platform's outputs before platform applied
+        self.assertEqual(self.applies, [("platform", "plan 1 for platform"), ("data-staging", None)])
+
+    def test_resumed_plan_dropped_after_earlier_upstream_apply(self):
+        # A run that died after applying platform, before data-staging
+        journal = RunJournal()
+        journal.start("full")
+        self.statuses = {"platform": DRIFT, "data-staging": DRIFT}
+        self.fake_scan_layers(verify.get_layers_by_order(), on_scan=journal.record_scan)
+        journal.record_apply("platform", "success")
+
+        self.assertEqual(self.verify(resume=True), 0)
+        self.assertEqual(self.scanned[-1], [])
+        self.assertEqual(self.applies, [("data-staging", None)])
+
+    def test_summary_marks_layers_not_planned_or_blocked(self):
+        self.unchanged = {"bootstrap"}
+        self.statuses = {"platform": DRIFT, "data-staging": DRIFT}
+        self.failing_applies = {"platform"}
+
+        with patch.object(verify, "GitHubClient") as client:
+            self.assertEqual(self.verify(pr=7), 1)
+        body = client.return_value.create_comment.call_args.args[1]
+        rows = {line.split(" | ")[0][2:]: line for line in body.splitlines() if line.startswith("| ")}
+        self.assertEqual(rows["bootstrap"], "| bootstrap | ⏭️ | - | ⏭️ skipped (unchanged) |")
+        self.assertEqual(rows["platform"], "| platform | ⚠️ | ❌ | ❌ |")
+        self.assertEqual(rows["data-staging"], "| data-staging | ⚠️ | ⛔ | ⛔ blocked |")
+        self.assertEqual(rows["data-prod"], "| data-prod | ✅ | - | ✅ |")
+
+    def test_summary_marks_carried_layers(self):
+        self.statuses = {"platform": DRIFT}
+        self.failing_applies = {"platform"}
+        self.verify()
+
+        self.failing_applies = set()
+        with patch.object(verify, "GitHubClient") as client:
+            self.assertEqual(self.verify(pr=7, resume=True), 0)
+        body = client.return_value.create_comment.call_args.args[1]
+        self.assertIn("| bootstrap | ⏭️ | - | ⏭️ carried over |", body)
+        self.assertIn("| platform | ⚠️ | ✅ | ✅ |", body)
+
+    def test_resume_ignores_other_commit(self):
+        self.statuses = {"platform": DRIFT}
+        self.failing_applies = {"platform"}
+        self.verify()
+
+        with patch.dict(os.environ, {"GITHUB_SHA": "def456"}):
+            self.verify(resume=True)
+        self.assertEqual(len(self.scanned[-1]), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,12 @@
 """Command handlers for CI pipeline."""
 
-from . import plan, apply, verify, parse, init, update, check_vault, bootstrap, run
+import importlib
 
-__all__ = ["plan", "apply", "verify", "bootstrap", "run", "parse", "init", "update", "check_vault"]
+__all__ = ["plan", "apply", "verify", "bootstrap", "run", "parse", "init", "update", "check_vault", "drift_report"]
+
+
+def __getattr__(name: str):
+    # Handlers are imported on first use, so one command does not load them all
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
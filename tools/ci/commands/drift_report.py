@@ -0,0 +1,79 @@
+"""drift-report command handler (trends from recorded verify runs)."""
+
+import statistics
+import time
+
+from ..core.history import DriftHistory
+
+DEFAULT_DAYS = 30
+
+
+def run(args) -> int:
+    """Print drift trends from the verify history; runs no plans.
+
+    Args:
+        args.days: Look-back window in days (default: 30)
+        args.min_flips: Drifted<->clean switches that count as flapping (default: 2)
+        args.threshold: Plan-time increase that counts as a regression (default: 0.5 = +50%)
+        args.recent: Recent scans compared against the baseline (default: 5)
+    """
+    days = getattr(args, "days", None) or DEFAULT_DAYS
+    since = time.time() - days * 86400
+
+    with DriftHistory() as history:
+        print(f"📈 Drift report (last {days} days, {history.path})")
+        print(_render(
+            history,
+            since,
+            min_flips=getattr(args, "min_flips", None) or 2,
+            threshold=getattr(args, "threshold", None) or 0.5,
+            recent=getattr(args, "recent", None) or 5,
+        ))
+    return 0
+
+
+def _render(history: DriftHistory, since: float, min_flips: int, threshold: float, recent: int) -> str:
+    """Build the markdown report."""
+    rows = history.scans(since=since)
+    if not rows:
+        return "\nNo verify runs recorded yet."
+
+    lines = [
+        "",
+        "### Layers",
+        "",
+        "| Layer | Scans | Drifted | Skipped | Median plan (s) |",
+        "|:---|---:|---:|---:|---:|",
+    ]
+    layers: dict[str, list] = {}
+    for row in rows:
+        layers.setdefault(row["layer"], []).append(row)
+    for layer, scans in layers.items():
+        drifted = sum(1 for r in scans if r["status"] == "drift")
+        skipped = sum(1 for r in scans if r["status"] == "skipped")
+        times = [r["plan_seconds"] for r in scans if r["plan_seconds"] is not None]
+        median = f"{statistics.median(times):.1f}" if times else "-"
+        lines.append(f"| {layer} | {len(scans)} | {drifted} | {skipped} | {median} |")
+
+    flapping = history.flapping(since=since, min_flips=min_flips)
+    lines += ["", "### Flapping resources", ""]
+    if flapping:
+        lines += ["| Layer | Address | Flips | Drifted scans |", "|:---|:---|---:|---:|"]
+        lines += [
+            f"| {f.layer} | `{f.address}` | {f.flips} | {f.drifted_scans}/{f.scans} |"
+            for f in flapping
+        ]
+    else:
+        lines.append("None ✅")
+
+    regressions = history.regressions(since=since, recent=recent, threshold=threshold)
+    lines += ["", "### Plan-time regressions", ""]
+    if regressions:
+        lines += ["| Layer | Baseline (s) | Recent (s) | Change |", "|:---|---:|---:|---:|"]
+        lines += [
+            f"| {r.layer} | {r.baseline_seconds:.1f} | {r.recent_seconds:.1f} | +{(r.ratio - 1) * 100:.0f}% |"
+            for r in regressions
+        ]
+    else:
+        lines.append("None ✅")
+    return "\n".join(lines)
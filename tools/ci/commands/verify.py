@@ -1,8 +1,17 @@
 """/verify command handler (post-merge drift scan)."""
 
-from ..config import get_layers_by_order
-from ..core.terraform import TerraformRunner, PlanResult
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config import get_dependency_graph, get_layers_by_order
+from ..core.terraform import TerraformRunner
+from ..core.scanner import SCAN_MODES, scan_layers, ScanStatus, print_progress
+from ..core.scheduler import run_waves, LayerOutcome
 from ..core.github import GitHubClient
+from ..core.history import DriftHistory, ScanRecord
+from ..core.journal import RunJournal, RunState, current_sha
+from ..core.snapshot import PreCheck, SnapshotStore, precheck_layer
+from ..core.state_reader import StateReader
 
 
 def run(args) -> int:
@@ -11,62 +20,140 @@ def run(args) -> int:
     Args:
         args.apply: If True, apply when drift detected
         args.pr: Optional merged PR number for result posting
+        args.jobs: Optional max concurrent layer scans (default: CI_SCAN_WORKERS or 4)
+        args.full: If True, plan every layer (skip the snapshot pre-check)
+        args.mode: full | refresh-only | targeted (default: full); see SCAN_MODES
+        args.resume: If True, continue the last incomplete run from its journal
     """
-    print("🔍 Starting drift verification...")
+    mode = getattr(args, "mode", None) or "full"
+    if mode not in SCAN_MODES:
+        print(f"❌ Unknown verify mode: {mode} (expected one of {', '.join(SCAN_MODES)})")
+        return 1
+
+    # Every step is checkpointed so an interrupted run can be resumed
+    journal = RunJournal()
+    resumed = _resume(journal) if getattr(args, "resume", False) else None
+    if resumed:
+        mode = resumed.mode
+        print(f"🔍 Resuming drift verification {resumed.run_id} ({mode})...")
+    else:
+        journal.start(mode)
+        print(f"🔍 Starting drift verification ({mode})...")
 
     layers = get_layers_by_order()
     drift_detected = []
     errors = []
 
-    # Phase 1: Parallel drift scan (conceptually - sequential in Python)
-    print("\n📋 Phase 1: Drift Scan")
-    for layer in layers:
-        print(f"  Scanning {layer.name}...", end=" ", flush=True)
+    # Layers the resumed run already scanned cleanly keep that result
+    carried = [layer for layer in layers if resumed and not journal.entry(layer.name).needs_scan]
+    candidates = [layer for layer in layers if layer not in carried]
+    for layer in carried:
+        print_progress(layer, "⏭️ Already scanned in resumed run")
+        if journal.entry(layer.name).pending_apply:
+            drift_detected.append(layer)
 
-        runner = TerraformRunner(layer)
+    # Phase 0: Skip layers whose state and code match the last clean verify
+    # (with --full every layer is planned; snapshots are still refreshed)
+    print("\n🔎 Phase 0: Snapshot Pre-check")
+    store = SnapshotStore()
+    prechecks = _precheck(candidates, store, getattr(args, "jobs", None))
+    to_scan = candidates
+    if not getattr(args, "full", False):
+        to_scan = [layer for layer in candidates if not prechecks[layer.name].unchanged]
+    skipped = [layer.name for layer in candidates if layer not in to_scan]
 
-        # Init
-        init_result = runner.init()
-        if not init_result.success:
-            print(f"❌ Init failed")
-            errors.append(layer.name)
-            continue
+    # Phase 1: Concurrent drift scan (init + plan are read-only per layer)
+    # Saved plans are kept for apply; refresh-only/targeted plans are partial
+    print("\n📋 Phase 1: Drift Scan")
+    scans = scan_layers(
+        to_scan,
+        max_workers=getattr(args, "jobs", None),
+        mode=mode,
+        on_scan=lambda scan: journal.record_scan(scan, keep_plan=mode == "full"),
+    )
+    for scan in scans:
+        if scan.status == ScanStatus.DRIFT:
+            drift_detected.append(scan.layer)
+        elif scan.failed:
+            errors.append(scan.layer.name)
 
-        # Plan
-        plan_result = runner.plan(detailed_exitcode=True)
-        if plan_result.plan_result == PlanResult.NO_CHANGES:
-            print("✅ No drift")
-        elif plan_result.plan_result == PlanResult.HAS_CHANGES:
-            print("⚠️ Drift detected")
-            drift_detected.append(layer)
-        else:
-            print("❌ Error")
-            errors.append(layer.name)
+        # Only a clean full plan proves code and state both match
+        snapshot = prechecks[scan.layer.name].snapshot()
+        if scan.status == ScanStatus.NO_DRIFT and snapshot and mode == "full":
+            store.put(scan.layer.name, snapshot)
+        elif scan.status != ScanStatus.NO_DRIFT:
+            store.drop(scan.layer.name)
 
-    # Phase 2: Sequential apply if requested
+    # Phase 2: Dependency-ordered apply (independent layers apply in parallel)
     applied = []
+    blocked = []
+    apply_seconds = {}
     if args.apply and drift_detected:
-        print("\n🚀 Phase 2: Sequential Apply")
-        for layer in drift_detected:
-            print(f"  Applying {layer.name}...", end=" ", flush=True)
+        print("\n🚀 Phase 2: Wave Apply")
+        graph = get_dependency_graph()
+        applied_now: set[str] = set()
+
+        def stale_because(layer) -> str | None:
+            """Upstream layer applied after this layer's saved plan was made, if any."""
+            for upstream in graph[layer.name]:
+                # Carried plans predate every apply of the resumed run too
+                if upstream in applied_now or (
+                    layer in carried and journal.entry(upstream).apply == "success"
+                ):
+                    return upstream
+            return None
 
-            runner = TerraformRunner(layer)
-            apply_result = runner.apply(auto_approve=True)
+        def apply_layer(layer) -> bool:
+            plan_file = journal.entry(layer.name).plan_file
+            if plan_file and not os.path.exists(plan_file):
+                plan_file = None
+            upstream = stale_because(layer) if plan_file else None
+            if upstream:
+                # The plan read the upstream outputs (remote state) before they changed
+                print_progress(layer, f"Applying (saved plan predates {upstream} apply)...")
+                plan_file = None
+            else:
+                print_progress(layer, "Applying saved plan..." if plan_file else "Applying...")
+            journal.record_apply(layer.name, "running")
+            # Full error details are printed by TerraformRunner._run()
+            result = TerraformRunner(layer, stream=True).apply(
+                auto_approve=True, plan_file=plan_file, refresh=True
+            )
+            journal.record_apply(layer.name, "success" if result.success else "failed")
+            if result.log:
+                result.log.cleanup()
+            if result.success:
+                applied_now.add(layer.name)
+            apply_seconds[layer.name] = result.duration
+            print_progress(layer, "✅ Done" if result.success else "❌ Failed")
+            return result.success
 
-            if apply_result.success:
-                print("✅ Done")
-                applied.append(layer.name)
+        outcomes = run_waves(drift_detected, apply_layer, failed=errors)
+        for name, outcome in outcomes.items():
+            if outcome == LayerOutcome.SUCCESS:
+                applied.append(name)
+            elif outcome == LayerOutcome.FAILED:
+                errors.append(name)
             else:
-                print("❌ Failed")
-                # Full error details already printed by TerraformRunner._run()
-                errors.append(layer.name)
-                break  # Stop on first error
+                blocked.append(name)
+                journal.record_apply(name, "skipped")
+
+    journal.finish(success=not errors)
+
+    _record_history(layers, scans, mode, applied, apply_seconds)
+    for scan in scans:
+        # Streamed plan output is not needed past this point
+        if scan.plan_result and scan.plan_result.log and not scan.plan_result.cached:
+            scan.plan_result.log.cleanup()
 
     # Post results to merged PR if specified
     if args.pr:
         try:
             gh = GitHubClient()
-            body = _build_summary(layers, drift_detected, applied, errors)
+            body = _build_summary(
+                layers, drift_detected, applied, errors,
+                skipped=skipped, carried=[layer.name for layer in carried], blocked=blocked,
+            )
             gh.create_comment(args.pr, body)
             print(f"\n📝 Posted summary to PR #{args.pr}")
         except Exception as e:
@@ -76,18 +163,96 @@ def run(args) -> int:
     print("\n" + "=" * 50)
     print("📊 Verification Summary")
     print("=" * 50)
-    print(f"  Layers scanned: {len(layers)}")
+    print(f"  Layers scanned: {len(to_scan)}")
+    if resumed:
+        print(f"  Carried over (resumed): {len(carried)}")
+    print(f"  Skipped (unchanged): {len(skipped)}")
     print(f"  Drift detected: {len(drift_detected)}")
     print(f"  Applied: {len(applied)}")
+    if blocked:
+        print(f"  Blocked (upstream failed): {len(blocked)}")
     print(f"  Errors: {len(errors)}")
 
     return 1 if errors else 0
 
 
+def _precheck(layers: list, store: SnapshotStore, jobs: int | None) -> dict:
+    """Run the snapshot pre-check for all layers concurrently."""
+    reader = StateReader()
+
+    def check(layer) -> PreCheck:
+        try:
+            result = precheck_layer(layer, store, reader)
+        except Exception as e:
+            result = PreCheck(layer, None, None, f"pre-check failed: {e}")
+        if result.unchanged:
+            print_progress(layer, "⏭️ Unchanged since last clean verify, skipping plan")
+        else:
+            print_progress(layer, f"Needs plan: {result.reason}")
+        return result
+
+    with ThreadPoolExecutor(max_workers=jobs or len(layers) or 1) as pool:
+        return {result.layer.name: result for result in pool.map(check, layers)}
+
+
+def _resume(journal: RunJournal) -> RunState | None:
+    """Load the previous run's journal if it can be resumed."""
+    state = journal.load()
+    if state is None:
+        print("ℹ️ No run journal found, starting a new run")
+    elif state.complete:
+        print(f"ℹ️ Run {state.run_id} already completed, starting a new run")
+    elif state.sha != current_sha():
+        # Saved plans belong to the code they were planned from
+        print(f"ℹ️ Run {state.run_id} was for commit {state.sha[:12] or '?'}, starting a new run")
+    else:
+        return state
+    return None
+
+
+def _record_history(layers: list, scans: list, mode: str, applied: list, apply_seconds: dict) -> None:
+    """Append this run to the drift history (see ``ci drift-report``)."""
+    by_name = {scan.layer.name: scan for scan in scans}
+    records = []
+    for layer in layers:
+        scan = by_name.get(layer.name)
+        if scan is None:
+            records.append(ScanRecord(layer.name, "skipped", mode))
+            continue
+        plan = scan.plan_result
+        records.append(ScanRecord(
+            layer=layer.name,
+            status=scan.status.value,
+            mode=mode,
+            report=plan.report if plan else None,
+            init_seconds=scan.init_result.duration if scan.init_result else None,
+            plan_seconds=plan.duration if plan and not plan.cached else None,
+            apply_seconds=apply_seconds.get(layer.name),
+            applied=layer.name in applied,
+        ))
+    try:
+        with DriftHistory() as history:
+            history.record(records)
+    except Exception as e:
+        print(f"\n⚠️ Failed to record drift history: {e}")
+
+
 def _build_summary(
-    layers: list, drift_detected: list, applied: list, errors: list
+    layers: list,
+    drift_detected: list,
+    applied: list,
+    errors: list,
+    skipped: list = (),
+    carried: list = (),
+    blocked: list = (),
 ) -> str:
-    """Build markdown summary for PR comment."""
+    """Build markdown summary for PR comment.
+
+    Only layers planned in this run can show ✅ for drift: ``skipped``
+    (pre-check, unchanged) and ``carried`` (``--resume``) layers are marked
+    ⏭️, and ``blocked`` layers (apply skipped because an upstream failed)
+    are marked ⛔. Drift that was not applied is never shown as ✅.
+    """
     lines = [
         "## 🔍 Post-Merge Verification",
         "",
@@ -99,10 +264,28 @@ def _build_summary(
         has_drift = layer in drift_detected
         was_applied = layer.name in applied
         has_error = layer.name in errors
+        not_planned = layer.name in skipped or layer.name in carried
 
-        drift_icon = "⚠️" if has_drift else "✅"
-        apply_icon = "✅" if was_applied else ("❌" if has_error else "-")
-        status = "❌" if has_error else "✅"
+        drift_icon = "⚠️" if has_drift else ("⏭️" if not_planned else "✅")
+        if was_applied:
+            apply_icon = "✅"
+        elif has_error:
+            apply_icon = "❌"
+        else:
+            apply_icon = "⛔" if layer.name in blocked else "-"
+
+        if has_error:
+            status = "❌"
+        elif layer.name in blocked:
+            status = "⛔ blocked"
+        elif has_drift and not was_applied:
+            status = "⚠️"
+        elif layer.name in skipped:
+            status = "⏭️ skipped (unchanged)"
+        elif layer.name in carried:
+            status = "⏭️ carried over"
+        else:
+            status = "✅"
 
         lines.append(
             f"| {layer.name} | {drift_icon} | {apply_icon} | {status} |"
@@ -110,6 +293,8 @@ def _build_summary(
 
     lines.extend(
         [
+            "",
+            "⏭️ not planned this run · ⛔ apply blocked by a failed upstream layer",
             "",
             "---",
             "🤖 Generated by CI Pipeline",
@@ -1,11 +1,34 @@
 """Layer definitions and configuration."""
 
-from dataclasses import dataclass
+import functools
+import json
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass, field
 from typing import Literal
 
 Engine = Literal["terraform", "terragrunt"]
 
 
+@dataclass
+class ExecutionProfile:
+    """How terraform runs for a layer (flags and environment).
+
+    ``parallelism`` is passed as ``-parallelism`` (None = terraform's default
+    of 10); "auto" picks it from recorded plan timings (see core/tuning.py).
+    ``refresh=False`` adds ``-refresh=false`` to PR plans and applies; drift
+    scans always refresh. ``env`` is merged into the command environment.
+    """
+
+    parallelism: int | Literal["auto"] | None = None
+    # e.g. "5m"; how long to wait for the state lock (None = fail at once)
+    lock_timeout: str | None = None
+    refresh: bool = True
+    env: dict[str, str] = field(default_factory=dict)
+
+
 @dataclass
 class Layer:
     """Infrastructure layer configuration."""
@@ -13,8 +36,10 @@ class Layer:
     name: str
     path: str
     engine: Engine
-    order: int
+    depends_on: tuple[str, ...] = ()
+    # Object key in the state bucket (mirrors local.state_key in terragrunt.hcl)
     state_key: str | None = None
+    profile: ExecutionProfile = field(default_factory=ExecutionProfile)
 
 
 LAYERS: dict[str, Layer] = {
@@ -22,45 +47,287 @@ LAYERS: dict[str, Layer] = {
         name="bootstrap",
         path="bootstrap",
         engine="terraform",
-        order=1,
         state_key="k3s/terraform.tfstate",
     ),
     "platform": Layer(
         name="platform",
         path="platform",
         engine="terragrunt",
-        order=2,
+        depends_on=("bootstrap",),
+        state_key="k3s/platform.tfstate",
     ),
     "data-staging": Layer(
         name="data-staging",
         path="envs/staging/data",
         engine="terragrunt",
-        order=3,
+        depends_on=("platform",),
+        state_key="k3s/data-staging.tfstate",
+        # Helm/Vault/Kubernetes refreshes are API-latency bound, not CPU bound
+        profile=ExecutionProfile(parallelism="auto", lock_timeout="5m"),
     ),
     "data-prod": Layer(
         name="data-prod",
         path="envs/prod/data",
         engine="terragrunt",
-        order=4,
+        depends_on=("platform",),
+        state_key="k3s/data-prod.tfstate",
+        profile=ExecutionProfile(parallelism="auto", lock_timeout="5m"),
     ),
 }
 
 
+def get_cache_dir(*parts: str) -> str:
+    """Get (and create) a directory under the CI cache root.
+
+    The root is ``CI_CACHE_DIR`` if set, otherwise ``~/.cache/infra-ci``.
+    """
+    root = os.environ.get("CI_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "infra-ci"
+    )
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_job_temp_dir(*parts: str) -> str:
+    """Get (and create) an owner-only directory that lives for the current CI job.
+
+    Use it for files that must not outlive the job: binary plans, rendered
+    terragrunt configs and raw logs hold input values (including secrets)
+    in plaintext, so they never go under get_cache_dir(), which persists
+    across runs. The root is ``RUNNER_TEMP`` (emptied after every job),
+    otherwise the system temp dir.
+    """
+    root = os.path.join(os.environ.get("RUNNER_TEMP") or tempfile.gettempdir(), "infra-ci")
+    os.makedirs(root, mode=0o700, exist_ok=True)
+    os.chmod(root, 0o700)
+    path = os.path.join(root, *parts)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def env_int(name: str, default: int) -> int:
+    """Integer from env var ``name`` (``default`` if unset or malformed)."""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Float from env var ``name`` (``default`` if unset or malformed)."""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def write_json(path: str, data, **kwargs) -> None:
+    """Write ``data`` as JSON atomically (temp file + rename); kwargs go to json.dump."""
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, "w") as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp, path)
+
+
 def get_layer(name: str) -> Layer | None:
     """Get layer by name."""
     return LAYERS.get(name)
 
 
+def hcl_blocks(text: str, block_type: str) -> list[str]:
+    """Return the bodies of top-level ``block_type`` blocks (brace-matched)."""
+    bodies = []
+    for match in re.finditer(rf'^\s*{block_type}\b[^{{\n]*\{{', text, re.MULTILINE):
+        depth, start = 1, match.end()
+        for i in range(start, len(text)):
+            if text[i] == "{":
+                depth += 1
+            elif text[i] == "}":
+                depth -= 1
+                if depth == 0:
+                    bodies.append(text[start:i])
+                    break
+    return bodies
+
+
+def derive_dependencies(layer: Layer, repo_root: str) -> tuple[str, ...]:
+    """Derive upstream layers from terragrunt ``dependency``/``dependencies`` blocks."""
+    layer_dir = os.path.join(repo_root, layer.path)
+    hcl_path = os.path.join(layer_dir, "terragrunt.hcl")
+    if not os.path.isfile(hcl_path):
+        return ()
+    with open(hcl_path) as f:
+        text = f.read()
+
+    config_paths = []
+    for body in hcl_blocks(text, "dependency"):
+        config_paths += re.findall(r'config_path\s*=\s*"([^"]+)"', body)
+    for body in hcl_blocks(text, "dependencies"):
+        config_paths += re.findall(r'"([^"]+)"', body)
+
+    by_path = {os.path.normpath(l.path): l.name for l in LAYERS.values()}
+    upstream = []
+    for config_path in config_paths:
+        target = os.path.relpath(
+            os.path.normpath(os.path.join(layer_dir, config_path)), repo_root
+        )
+        name = by_path.get(target)
+        if name and name != layer.name and name not in upstream:
+            upstream.append(name)
+    return tuple(upstream)
+
+
+def get_dependency_graph(repo_root: str | None = None) -> dict[str, tuple[str, ...]]:
+    """Map each layer to its upstream layers.
+
+    Explicit ``Layer.depends_on`` is always used; when ``repo_root`` is given,
+    dependencies declared in terragrunt.hcl are merged in as well.
+    """
+    graph = {}
+    for layer in LAYERS.values():
+        deps = list(layer.depends_on)
+        if repo_root:
+            deps += [d for d in derive_dependencies(layer, repo_root) if d not in deps]
+        graph[layer.name] = tuple(deps)
+    return graph
+
+
+def _ancestors(name: str, graph: dict[str, tuple[str, ...]]) -> set[str]:
+    """Every layer ``name`` depends on, transitively (includes ``name`` on a cycle)."""
+    ancestors: set[str] = set()
+    frontier = list(graph.get(name, ()))
+    while frontier:
+        current = frontier.pop()
+        if current not in ancestors:
+            ancestors.add(current)
+            frontier.extend(graph.get(current, ()))
+    return ancestors
+
+
+def get_layer_waves(
+    layers: list[Layer] | None = None, repo_root: str | None = None
+) -> list[list[Layer]]:
+    """Group layers into topological waves.
+
+    Layers in the same wave have no dependency on each other and can run in
+    parallel. Layers outside ``layers`` are not run, but ordering through
+    them is kept: a selected layer waits for every selected layer it depends
+    on, directly or transitively. Within a wave, LAYERS declaration order is
+    kept.
+
+    Raises:
+        ValueError: If the dependency graph has a cycle.
+    """
+    chosen = {l.name for l in (layers if layers is not None else LAYERS.values())}
+    selected = [name for name in LAYERS if name in chosen]
+    graph = get_dependency_graph(repo_root)
+    pending = {name: _ancestors(name, graph) & chosen for name in selected}
+
+    waves = []
+    while pending:
+        ready = [name for name in selected if name in pending and not pending[name]]
+        if not ready:
+            raise ValueError(f"Dependency cycle between layers: {sorted(pending)}")
+        waves.append([LAYERS[name] for name in ready])
+        for name in ready:
+            del pending[name]
+        for deps in pending.values():
+            deps.difference_update(ready)
+    return waves
+
+
 def get_layers_by_order() -> list[Layer]:
-    """Get all layers sorted by deployment order."""
-    return sorted(LAYERS.values(), key=lambda l: l.order)
+    """Get all layers in dependency (topological) order."""
+    return [layer for wave in get_layer_waves() for layer in wave]
+
+
+def get_downstream(name: str, repo_root: str | None = None) -> set[str]:
+    """Get every layer that transitively depends on ``name``."""
+    graph = get_dependency_graph(repo_root)
+    downstream: set[str] = set()
+    frontier = [name]
+    while frontier:
+        current = frontier.pop()
+        for layer_name, deps in graph.items():
+            if current in deps and layer_name not in downstream:
+                downstream.add(layer_name)
+                frontier.append(layer_name)
+    return downstream
+
+
+class _PathIndex:
+    """Prefix trie over path components mapping repo paths to layers.
+
+    Matching is per path component, so ``platform`` matches
+    ``platform/main.tf`` but not ``platformx/main.tf``.
+    """
+
+    def __init__(self):
+        self.root: dict = {}
+
+    def add(self, prefix: str, layers: tuple[str, ...]) -> None:
+        node = self.root
+        for part in _split_path(prefix):
+            node = node.setdefault(part, {})
+        node.setdefault(None, set()).update(layers)
+
+    def lookup(self, path: str) -> set[str]:
+        """Return every layer registered on a prefix of ``path``."""
+        found: set[str] = set()
+        node = self.root
+        for part in _split_path(path):
+            node = node.get(part)
+            if node is None:
+                break
+            found |= node.get(None, set())
+        return found
+
+
+def _split_path(path: str) -> list[str]:
+    return [p for p in path.replace("\\", "/").split("/") if p and p != "."]
+
+
+# Paths outside a layer directory that still affect layers
+LAYER_TRIGGERS: dict[str, tuple[str, ...]] = {
+    # Shared data-layer code (symlinked into envs/{staging,prod}/data)
+    "envs/data-shared": ("data-staging", "data-prod"),
+    "envs/data.terragrunt.hcl": ("data-staging", "data-prod"),
+    # Root terragrunt config generates backend/providers for every layer
+    "terragrunt.hcl": ("bootstrap", "platform", "data-staging", "data-prod"),
+}
+
+
+def build_path_index() -> _PathIndex:
+    """Build the path index from LAYERS and LAYER_TRIGGERS."""
+    index = _PathIndex()
+    for layer in LAYERS.values():
+        index.add(layer.path, (layer.name,))
+    for prefix, layers in LAYER_TRIGGERS.items():
+        index.add(prefix, tuple(name for name in layers if name in LAYERS))
+    return index
+
+
+@functools.cache
+def _path_index() -> _PathIndex:
+    return build_path_index()
+
+
+def reset_path_index() -> None:
+    """Drop the cached path index (after changing LAYERS or LAYER_TRIGGERS)."""
+    _path_index.cache_clear()
 
 
 def detect_layers_from_paths(changed_paths: list[str]) -> list[Layer]:
-    """Detect which layers are affected by changed file paths."""
-    affected = set()
+    """Detect which layers are affected by changed file paths.
+
+    Uses the path index built once from LAYERS and LAYER_TRIGGERS (see
+    reset_path_index). Returns layers in deployment (topological) order.
+    """
+    index = _path_index()
+    affected: set[str] = set()
     for path in changed_paths:
-        for layer in LAYERS.values():
-            if path.startswith(layer.path):
-                affected.add(layer.name)
-    return [LAYERS[name] for name in affected]
+        affected |= index.lookup(path)
+        if len(affected) == len(LAYERS):
+            break
+    return [layer for layer in get_layers_by_order() if layer.name in affected]
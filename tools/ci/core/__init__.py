@@ -1,7 +1,18 @@
 """Core modules for CI pipeline."""
 
-from .terraform import TerraformRunner
-from .github import GitHubClient
-from .dashboard import Dashboard
+import importlib
 
 __all__ = ["TerraformRunner", "GitHubClient", "Dashboard"]
+
+_EXPORTS = {
+    "TerraformRunner": ".terraform",
+    "GitHubClient": ".github",
+    "Dashboard": ".dashboard",
+}
+
+
+def __getattr__(name: str):
+    # Resolved on first use, so importing one core module does not load them all
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
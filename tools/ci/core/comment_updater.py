@@ -0,0 +1,146 @@
+"""Debounced, coalescing PR comment updates for live CI progress.
+
+Progress updates only replace a buffered body; it is PATCHed at most once
+per interval (``CI_COMMENT_INTERVAL`` seconds, default 10). An update that
+arrives inside the interval is written by a trailing timer, so the last
+progress state always lands. PATCHes whose body is byte-identical to what
+was last written are skipped, and close() always writes the final state.
+
+Example:
+    comment_id, url = gh.create_running_comment(pr, "Plan")
+    with CommentUpdater(gh, comment_id) as updater:
+        for line in progress:
+            updater.update(render(line))
+        updater.close(gh.render_result_comment(pr, "Plan", log, success))
+"""
+
+import hashlib
+import threading
+import time
+from typing import Callable
+
+from ..config import env_float
+from .github import GitHubClient
+
+DEFAULT_INTERVAL = 10.0
+FINAL_ATTEMPTS = 3
+
+
+def _digest(body: str) -> str:
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class CommentUpdater:
+    """Coalesces updates to one comment into rate-limited PATCHes."""
+
+    def __init__(
+        self,
+        gh: GitHubClient,
+        comment_id: int,
+        interval: float | None = None,
+        initial_body: str | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.gh = gh
+        self.comment_id = comment_id
+        if interval is None:
+            interval = env_float("CI_COMMENT_INTERVAL", DEFAULT_INTERVAL)
+        self.interval = interval
+        self.clock = clock
+        self.patches = 0
+        self.skipped = 0  # flushes with an unchanged body
+        self.coalesced = 0  # updates superseded before being written
+        self._pending: str | None = None
+        self._written = _digest(initial_body) if initial_body is not None else None
+        self._last_flush = float("-inf")
+        self._timer: threading.Timer | None = None
+        self._closed = False
+        self._lock = threading.Lock()
+        # Serializes PATCHes so an older body can never land after a newer one
+        self._write_lock = threading.Lock()
+
+    def update(self, body: str) -> None:
+        """Buffer ``body``; write now if the interval has passed, else later.
+
+        Never raises on API errors (see close() for the final write).
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("CommentUpdater is closed")
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = body
+            wait = self._last_flush + self.interval - self.clock()
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self._flush_from_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self._flush_quietly()
+
+    def _flush_from_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        self._flush_quietly()
+
+    def _flush_quietly(self) -> None:
+        # Progress updates must never fail the run: the body stays pending
+        # and the next update or close() retries it
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"  ⚠️ Comment update failed: {e}")
+
+    def flush(self) -> bool:
+        """Write the buffered body now. Returns True if a PATCH was sent."""
+        with self._write_lock:
+            with self._lock:
+                body, self._pending = self._pending, None
+                self._last_flush = self.clock()
+            if body is None:
+                return False
+            digest = _digest(body)
+            if digest == self._written:
+                self.skipped += 1
+                return False
+            try:
+                self.gh.update_comment(self.comment_id, body)
+            except Exception:
+                with self._lock:
+                    if self._pending is None:
+                        self._pending = body
+                raise
+            self._written = digest
+            self.patches += 1
+            return True
+
+    def close(self, body: str | None = None) -> None:
+        """Write the final state (``body`` or the last update), retrying on failure."""
+        with self._lock:
+            self._closed = True
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if body is not None:
+                if self._pending is not None:
+                    self.coalesced += 1
+                self._pending = body
+        for attempt in range(FINAL_ATTEMPTS):
+            try:
+                self.flush()
+                return
+            except Exception:
+                if attempt == FINAL_ATTEMPTS - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def stats(self) -> dict[str, int]:
+        return {"patches": self.patches, "skipped": self.skipped, "coalesced": self.coalesced}
+
+    def __enter__(self) -> "CommentUpdater":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if not self._closed:
+            self.close()
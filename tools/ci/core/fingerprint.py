@@ -0,0 +1,137 @@
+"""Content fingerprints for deciding when terraform work can be skipped."""
+
+import glob
+import hashlib
+import os
+import re
+
+from ..config import Layer, hcl_blocks
+
+# Env vars that change the resolved backend configuration
+BACKEND_ENV_VARS = ("R2_BUCKET", "R2_ACCOUNT_ID", "TF_CLI_ARGS", "TF_CLI_ARGS_init")
+
+INIT_FINGERPRINT_FILE = "ci-init.fingerprint"
+
+# Generated or working files that never affect what a plan will do
+TREE_IGNORE = {".terraform", ".terragrunt-cache", "tfplan", "backend.tf", "__pycache__"}
+
+
+def _update_file(digest, path: str) -> None:
+    """Feed a file's (symlink-resolved) content into ``digest``."""
+    digest.update(f"\0file:{os.path.basename(path)}\0".encode())
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        digest.update(b"<missing>")
+
+
+def module_sources(work_dir: str) -> list[str]:
+    """Collect ``source``/``version`` of every module block in the layer."""
+    sources = []
+    for tf_file in sorted(glob.glob(os.path.join(work_dir, "*.tf"))):
+        with open(tf_file, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        for body in hcl_blocks(text, "module"):
+            for key in ("source", "version"):
+                match = re.search(rf'^\s*{key}\s*=\s*"([^"]*)"', body, re.MULTILINE)
+                if match:
+                    sources.append(f"{key}={match.group(1)}")
+    return sources
+
+
+def init_fingerprint(layer: Layer, work_dir: str, repo_root: str) -> str:
+    """Hash everything that ``init`` depends on.
+
+    Covers the engine, the provider lock file, backend configuration
+    (terragrunt.hcl files or backend.tf, plus backend env vars) and
+    module sources. Resource code is deliberately excluded: editing a
+    resource never requires a re-init.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"engine:{layer.engine}".encode())
+
+    _update_file(digest, os.path.join(work_dir, ".terraform.lock.hcl"))
+    _update_file(digest, os.path.join(work_dir, "terragrunt.hcl"))
+    if layer.engine == "terragrunt":
+        # backend.tf is generated from the root remote_state block on every run
+        _update_file(digest, os.path.join(repo_root, "terragrunt.hcl"))
+    else:
+        _update_file(digest, os.path.join(work_dir, "backend.tf"))
+
+    for name in BACKEND_ENV_VARS:
+        digest.update(f"\0env:{name}={os.environ.get(name, '')}".encode())
+    for source in module_sources(work_dir):
+        digest.update(f"\0module:{source}".encode())
+
+    return digest.hexdigest()
+
+
+def read_init_fingerprint(work_dir: str) -> str | None:
+    """Return the fingerprint recorded by the last successful init, if any."""
+    path = os.path.join(work_dir, ".terraform", INIT_FINGERPRINT_FILE)
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def write_init_fingerprint(work_dir: str, fingerprint: str) -> None:
+    """Record a successful init inside the layer's .terraform directory."""
+    terraform_dir = os.path.join(work_dir, ".terraform")
+    os.makedirs(terraform_dir, exist_ok=True)
+    with open(os.path.join(terraform_dir, INIT_FINGERPRINT_FILE), "w") as f:
+        f.write(fingerprint)
+
+
+def tree_fingerprint(work_dir: str) -> str:
+    """Hash every file under a layer directory (symlinks resolved).
+
+    Generated/working files (see TREE_IGNORE) and dotfiles other than the
+    provider lock file are skipped.
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(work_dir, followlinks=True):
+        dirs[:] = sorted(d for d in dirs if d not in TREE_IGNORE and not d.startswith("."))
+        for name in sorted(files):
+            if name in TREE_IGNORE or (name.startswith(".") and name != ".terraform.lock.hcl"):
+                continue
+            path = os.path.join(root, name)
+            digest.update(f"\0path:{os.path.relpath(path, work_dir)}".encode())
+            _update_file(digest, path)
+    return digest.hexdigest()
+
+
+def plan_fingerprint(
+    layer: Layer,
+    work_dir: str,
+    repo_root: str,
+    state_serial: int,
+    state_lineage: str,
+    config_key: str,
+    extra: str = "",
+) -> str:
+    """Hash all inputs of a plan: code tree, tfvars, lockfile and state serial.
+
+    ``config_key`` is ``RunnerSession.config_key()``: the terragrunt HCL files
+    and the values of the env vars they read with ``get_env()``, which
+    become inputs without ever being ``TF_VAR_*`` in this process.
+    ``extra`` distinguishes plan variants (flags, targets) for the same inputs.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"engine:{layer.engine}\0extra:{extra}".encode())
+    digest.update(f"\0config:{config_key}".encode())
+    digest.update(f"\0tree:{tree_fingerprint(work_dir)}".encode())
+    _update_file(digest, os.path.join(work_dir, ".terraform.lock.hcl"))
+    if layer.engine == "terragrunt":
+        _update_file(digest, os.path.join(repo_root, "terragrunt.hcl"))
+    # tfvars may also arrive via env; hash values without storing them
+    for name in sorted(k for k in os.environ if k.startswith("TF_VAR_")):
+        digest.update(f"\0var:{name}=".encode())
+        digest.update(hashlib.sha256(os.environ[name].encode()).digest())
+    for name in BACKEND_ENV_VARS:
+        digest.update(f"\0env:{name}={os.environ.get(name, '')}".encode())
+    digest.update(f"\0state:{state_lineage}:{state_serial}".encode())
+    return digest.hexdigest()
@@ -1,11 +1,65 @@
 """GitHub API client for CI operations."""
 
+import hashlib
 import os
 import json
-from dataclasses import dataclass
-from typing import Any
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator
 import subprocess
 
+from ..config import get_cache_dir, write_json
+from ..log_compact import compact_log
+from .http_cache import ResponseCache
+from .ratelimit import RateLimiter
+from .rest import HttpError, HttpTransport
+
+DEFAULT_API_URL = "https://api.github.com"
+PER_PAGE = 100
+# Log characters per result comment (GitHub caps comment bodies at 65536)
+MAX_COMMENT_LOG = 60000
+# GitHub's REST (and GraphQL) file listing stops at this many files
+MAX_PR_FILES = 3000
+
+# Body size per shard comment (leaves room for the shard header)
+MAX_SHARD_BODY = 60000
+
+# HTML comment markers used to find our comments again, e.g. <!-- infra-dashboard:abc1234 -->
+MARKER_RE = re.compile(r"<!--\s*[\w.:/@-]+\s*-->")
+# Marker of the i-th shard comment of a sharded post, e.g. <!-- infra-shard:plan:2 -->
+SHARD_MARKER = "<!-- infra-shard:{key}:{index} -->"
+_SHARD_RE = re.compile(r"<!-- infra-shard:([\w.:/@-]+):(\d+) -->")
+_SHARD_KEY_RE = re.compile(r"^[\w./@-]+$")
+
+# One round trip for everything a command handler needs about a PR. Files and
+# comments are paged independently; a connection that is already exhausted is
+# dropped from follow-up queries with @include.
+PR_CONTEXT_QUERY = """
+query($owner: String!, $name: String!, $number: Int!,
+      $withFiles: Boolean!, $filesCursor: String,
+      $withComments: Boolean!, $commentsCursor: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      number
+      title
+      headRefOid
+      headRefName
+      baseRefName
+      baseRefOid
+      files(first: 100, after: $filesCursor) @include(if: $withFiles) {
+        nodes { path }
+        pageInfo { hasNextPage endCursor }
+      }
+      comments(first: 100, after: $commentsCursor) @include(if: $withComments) {
+        nodes { databaseId body }
+        pageInfo { hasNextPage endCursor }
+      }
+    }
+  }
+}
+"""
+
 
 @dataclass
 class PRInfo:
@@ -16,123 +70,536 @@ class PRInfo:
     head_ref: str
     base_ref: str
     title: str
+    base_sha: str = ""
+
+
+@dataclass
+class PRContext:
+    """Snapshot of a PR shared by command handlers (see get_pr_context)."""
+
+    pr: PRInfo
+    files: list[str]
+    # First comment carrying each marker, as {"id", "body"}
+    comments: dict[str, dict] = field(default_factory=dict)
+
+    def find_comment(self, marker: str) -> dict | None:
+        return self.comments.get(marker)
+
+
+def split_shards(sections: list[tuple[str, str]], limit: int = MAX_SHARD_BODY) -> list[tuple[str, str]]:
+    """Split ``(title, body)`` sections into ordered shards of at most ``limit`` chars.
+
+    Each section starts a new shard; a body over the limit is cut at line
+    boundaries, closing and re-opening any ``` code fence at the cut.
+    """
+    shards: list[tuple[str, str]] = []
+    for title, body in sections:
+        chunks: list[str] = []
+        current: list[str] = []
+        size = 0
+        fence: str | None = None  # opening fence line while inside a code block
+
+        for line in body.splitlines():
+            # Lines longer than a whole shard are hard-wrapped
+            pieces = [line[i : i + limit // 2] for i in range(0, len(line), limit // 2)] or [""]
+            for piece in pieces:
+                reserve = len(fence) + 5 if fence else 0
+                if current and size + len(piece) + 1 + reserve > limit:
+                    if fence:
+                        current.append("```")
+                    chunks.append("\n".join(current))
+                    current = [fence] if fence else []
+                    size = len(fence) + 1 if fence else 0
+                current.append(piece)
+                size += len(piece) + 1
+            if line.lstrip().startswith("```"):
+                fence = None if fence else line.strip()
+        chunks.append("\n".join(current))
+
+        for i, chunk in enumerate(chunks):
+            part = f"{title} ({i + 1}/{len(chunks)})" if len(chunks) > 1 else title
+            shards.append((part, chunk))
+    return shards
+
+
+def _gh_rate_limit_status(stderr: str) -> tuple[int, dict[str, str]]:
+    """Map a gh CLI error to (HTTP status, headers) for RateLimiter.retry_delay."""
+    status = 429 if "HTTP 429" in stderr else 403 if "HTTP 403" in stderr else 0
+    headers = {}
+    if "API rate limit exceeded" in stderr:
+        headers["x-ratelimit-remaining"] = "0"
+    return status, headers
+
+
+_GH_BODY_FLAGS = ("-f", "-F", "--field", "--raw-field", "--input")
+
+
+def _gh_method(args: list[str]) -> str:
+    """HTTP method a ``gh api`` invocation uses (POST if it sends fields/input)."""
+    for i, arg in enumerate(args):
+        if arg in ("-X", "--method") and i + 1 < len(args):
+            return args[i + 1].upper()
+        if arg.startswith("--method="):
+            return arg.split("=", 1)[1].upper()
+    if any(arg.split("=", 1)[0] in _GH_BODY_FLAGS for arg in args):
+        return "POST"
+    return "GET"
+
+
+def _iter_git_diff(base_sha: str, head_sha: str) -> Iterator[str]:
+    """Stream ``git diff --name-only base...head`` from the workspace checkout."""
+    cwd = os.environ.get("GITHUB_WORKSPACE") or None
+    proc = subprocess.Popen(
+        ["git", "diff", "--name-only", "--no-renames", f"{base_sha}...{head_sha}"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=cwd,
+    )
+    try:
+        for line in proc.stdout:
+            if line.strip():
+                yield line.rstrip("\n")
+        if proc.wait() != 0:
+            raise RuntimeError(
+                f"git diff {base_sha}...{head_sha} failed (PR exceeds {MAX_PR_FILES} files "
+                f"and needs both commits fetched): {proc.stderr.read()}"
+            )
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+class MarkerIndex:
+    """Persistent ``(pr, marker) -> comment id`` index.
+
+    Stored as JSON under the CI cache dir (or ``CI_MARKER_INDEX``) so later
+    CI steps on the same runner can jump straight to a comment instead of
+    paging through every comment on the PR. Entries are only hints: callers
+    must re-validate the comment before trusting them.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, repo: str, path: str | None = None):
+        slug = repo.replace("/", "_") or "default"
+        self.path = path or os.environ.get("CI_MARKER_INDEX") or os.path.join(
+            get_cache_dir("github"), f"markers-{slug}.json"
+        )
+
+    def _load(self) -> dict[str, int]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self, data: dict[str, int]) -> None:
+        write_json(self.path, data)
+
+    @staticmethod
+    def _key(pr_number: int, marker: str) -> str:
+        return f"{pr_number}:{marker}"
+
+    def get(self, pr_number: int, marker: str) -> int | None:
+        return self._load().get(self._key(pr_number, marker))
+
+    def put(self, pr_number: int, markers: list[str], comment_id: int) -> None:
+        with self._lock:
+            data = self._load()
+            for marker in markers:
+                data[self._key(pr_number, marker)] = comment_id
+            self._save(data)
+
+    def drop(self, pr_number: int, marker: str) -> None:
+        with self._lock:
+            data = self._load()
+            if data.pop(self._key(pr_number, marker), None) is not None:
+                self._save(data)
 
 
 class GitHubClient:
-    """GitHub API client using gh CLI."""
+    """GitHub API client.
+
+    Two backends speak the same REST endpoints:
+
+    - ``http``: native HTTPS client with a keep-alive connection pool
+      (default whenever a token is available)
+    - ``gh``: forks the ``gh`` CLI per call (fallback for local use)
 
-    def __init__(self, token: str | None = None):
+    Select explicitly with ``backend=`` or ``CI_GITHUB_BACKEND``.
+    """
+
+    def __init__(self, token: str | None = None, backend: str | None = None):
         self.token = token or os.environ.get("GITHUB_TOKEN", "")
         self.repo = os.environ.get("GITHUB_REPOSITORY", "")
+        self.api_url = os.environ.get("GITHUB_API_URL", DEFAULT_API_URL)
+        self.backend = (
+            backend
+            or os.environ.get("CI_GITHUB_BACKEND")
+            or ("http" if self.token else "gh")
+        )
+        self.limiter = RateLimiter()
+        self._http = None
+        if self.backend == "http":
+            headers = {
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+                "User-Agent": "infra-ci",
+            }
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+            cache = None
+            if os.environ.get("CI_GITHUB_CACHE", "1") != "0":
+                cache = ResponseCache(
+                    get_cache_dir("github", "responses"),
+                    namespace=hashlib.sha256(self.token.encode()).hexdigest(),
+                )
+            self._http = HttpTransport(
+                self.api_url, headers=headers, cache=cache, limiter=self.limiter
+            )
+        self.markers = MarkerIndex(self.repo)
+        self._contexts: dict[int, PRContext] = {}
+
+    @property
+    def remaining_budget(self) -> int | None:
+        """Requests left for this job before the rate-limit reserve (None if unknown)."""
+        return self.limiter.remaining_budget
 
-    def _run_gh(self, args: list[str]) -> dict[str, Any] | list[Any] | str:
+    @property
+    def cache_stats(self) -> dict[str, float]:
+        """ETag cache counters (empty for the gh backend or with CI_GITHUB_CACHE=0)."""
+        if self._http and self._http.cache:
+            return self._http.cache.stats()
+        return {}
+
+    def _run_gh(
+        self, args: list[str], input: str | None = None
+    ) -> dict[str, Any] | list[Any] | str:
         """Run gh CLI command and return JSON result."""
         env = os.environ.copy()
         if self.token:
             env["GH_TOKEN"] = self.token
 
         cmd = ["gh"] + args
-        result = subprocess.run(cmd, capture_output=True, text=True, env=env)
-
-        if result.returncode != 0:
-            raise RuntimeError(f"gh failed: {result.stderr}")
+        method = _gh_method(args)
+        attempt = 0
+        while True:
+            self.limiter.before_request(method)
+            result = subprocess.run(
+                cmd, capture_output=True, text=True, env=env, input=input
+            )
+            if result.returncode == 0:
+                break
+            delay = self.limiter.retry_delay(
+                *_gh_rate_limit_status(result.stderr), attempt, result.stderr
+            )
+            if delay is None:
+                raise RuntimeError(f"gh failed: {result.stderr}")
+            print(f"  ⏳ GitHub rate limited, retrying in {delay:.1f}s")
+            self.limiter.backoff(delay)
+            attempt += 1
 
         try:
             return json.loads(result.stdout)
         except json.JSONDecodeError:
             return result.stdout.strip()
 
+    def _api(self, method: str, path: str, body: dict | None = None) -> Any:
+        """Call a REST endpoint (path relative to the API root) on the active backend."""
+        if self._http:
+            return self._http.request(method, path, body=body).json()
+
+        args = ["api", path, "-X", method]
+        if body is not None:
+            args.extend(["--input", "-"])
+        return self._run_gh(args, input=json.dumps(body) if body is not None else None)
+
+    def _iter_gh_lines(self, args: list[str]) -> Iterator[str]:
+        """Stream stdout lines of a gh CLI command (killed if the caller stops early)."""
+        env = os.environ.copy()
+        if self.token:
+            env["GH_TOKEN"] = self.token
+        self.limiter.before_request(_gh_method(args))
+        proc = subprocess.Popen(
+            ["gh"] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env
+        )
+        try:
+            for line in proc.stdout:
+                if line.strip():
+                    yield line
+            if proc.wait() != 0:
+                raise RuntimeError(f"gh failed: {proc.stderr.read()}")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+            proc.stderr.close()
+
+    def _iter_pages(self, path: str) -> Iterator[Any]:
+        """Yield the items of a list endpoint, fetching pages lazily.
+
+        Only one page is held at a time, and closing the iterator stops
+        fetching (no further requests are made).
+        """
+        if not self._http:
+            sep = "&" if "?" in path else "?"
+            # --paginate concatenates page arrays; emit one item per line instead
+            for line in self._iter_gh_lines(
+                ["api", f"{path}{sep}per_page={PER_PAGE}", "--paginate", "--jq", ".[]"]
+            ):
+                yield json.loads(line)
+            return
+
+        url: str | None = path
+        params: dict | None = {"per_page": PER_PAGE}
+        while url:
+            response = self._http.request("GET", url, params=params)
+            yield from response.json() or []
+            url, params = response.links.get("next"), None
+
+    def _api_paginated(self, path: str) -> list[Any]:
+        """GET every page of a list endpoint."""
+        return list(self._iter_pages(path))
+
+    @property
+    def graphql_url(self) -> str:
+        """GraphQL endpoint (GHES serves it at /api/graphql, beside /api/v3)."""
+        base = self.api_url.rstrip("/")
+        if base.endswith("/v3"):
+            base = base[: -len("/v3")]
+        return f"{base}/graphql"
+
+    def _graphql(self, query: str, variables: dict) -> dict:
+        """Run a GraphQL query and return its ``data``."""
+        body = {"query": query, "variables": variables}
+        if self._http:
+            result = self._http.request("POST", self.graphql_url, body=body).json()
+        else:
+            result = self._run_gh(["api", "graphql", "--input", "-"], input=json.dumps(body))
+        if result.get("errors"):
+            messages = "; ".join(e.get("message", "") for e in result["errors"])
+            raise RuntimeError(f"GraphQL query failed: {messages}")
+        return result["data"]
+
+    def get_pr_context(self, pr_number: int, refresh: bool = False) -> PRContext:
+        """Fetch PR refs, changed files and marker comments in batched GraphQL queries.
+
+        Replaces separate get_pr / get_changed_files / comment-listing calls:
+        PRs with up to 100 files and 100 comments take a single round trip.
+        The result is memoized per client; pass ``refresh=True`` to re-query.
+        Marker comments found are recorded in the marker index.
+        """
+        if not refresh and pr_number in self._contexts:
+            return self._contexts[pr_number]
+
+        owner, _, name = self.repo.partition("/")
+        variables = {
+            "owner": owner,
+            "name": name,
+            "number": pr_number,
+            "withFiles": True,
+            "filesCursor": None,
+            "withComments": True,
+            "commentsCursor": None,
+        }
+        pr: PRInfo | None = None
+        files: list[str] = []
+        comments: dict[str, dict] = {}
+        while variables["withFiles"] or variables["withComments"]:
+            data = (self._graphql(PR_CONTEXT_QUERY, variables)["repository"] or {}).get(
+                "pullRequest"
+            )
+            if not data:
+                raise RuntimeError(f"PR #{pr_number} not found in {self.repo}")
+            if pr is None:
+                pr = PRInfo(
+                    number=data["number"],
+                    head_sha=data["headRefOid"],
+                    head_ref=data["headRefName"],
+                    base_ref=data["baseRefName"],
+                    title=data["title"],
+                    base_sha=data["baseRefOid"],
+                )
+            for kind in ("files", "comments"):
+                connection = data.get(kind)
+                if connection is None:
+                    continue
+                for node in connection["nodes"]:
+                    if kind == "files":
+                        files.append(node["path"])
+                        continue
+                    for marker in MARKER_RE.findall(node["body"] or ""):
+                        comments.setdefault(marker, {"id": node["databaseId"], "body": node["body"]})
+                page = connection["pageInfo"]
+                variables[f"{kind}Cursor"] = page["endCursor"]
+                variables[f"with{kind.capitalize()}"] = page["hasNextPage"]
+
+        if len(files) >= MAX_PR_FILES:
+            listed = set(files)
+            files.extend(p for p in _iter_git_diff(pr.base_sha, pr.head_sha) if p not in listed)
+
+        by_id: dict[int, list[str]] = {}
+        for marker, comment in comments.items():
+            by_id.setdefault(comment["id"], []).append(marker)
+        for comment_id, markers in by_id.items():
+            self.markers.put(pr_number, markers, comment_id)
+        context = PRContext(pr=pr, files=files, comments=comments)
+        self._contexts[pr_number] = context
+        return context
+
     def get_pr(self, pr_number: int) -> PRInfo:
         """Get PR information."""
-        data = self._run_gh(
-            [
-                "pr",
-                "view",
-                str(pr_number),
-                "--json",
-                "number,headRefOid,headRefName,baseRefName,title",
-            ]
-        )
+        data = self._api("GET", f"/repos/{self.repo}/pulls/{pr_number}")
         return PRInfo(
             number=data["number"],
-            head_sha=data["headRefOid"],  # Full SHA for commit status API
-            head_ref=data["headRefName"],
-            base_ref=data["baseRefName"],
+            head_sha=data["head"]["sha"],  # Full SHA for commit status API
+            head_ref=data["head"]["ref"],
+            base_ref=data["base"]["ref"],
             title=data["title"],
+            base_sha=data["base"].get("sha", ""),
         )
 
+    def iter_changed_files(self, pr_number: int) -> Iterator[str]:
+        """Yield the paths changed in a PR, one API page at a time.
+
+        The files endpoint stops at MAX_PR_FILES; for larger PRs the rest is
+        streamed from ``git diff --name-only base...head`` in the local
+        checkout (both commits must be fetched), so nothing is silently
+        dropped.
+        """
+        seen: set[str] = set()
+        for f in self._iter_pages(f"/repos/{self.repo}/pulls/{pr_number}/files"):
+            seen.add(f["filename"])
+            yield f["filename"]
+        if len(seen) < MAX_PR_FILES:
+            return
+
+        pr = self.get_pr(pr_number)
+        for path in _iter_git_diff(pr.base_sha, pr.head_sha):
+            if path not in seen:
+                yield path
+
     def get_changed_files(self, pr_number: int) -> list[str]:
         """Get list of changed files in PR."""
-        data = self._run_gh(
-            ["pr", "view", str(pr_number), "--json", "files"]
-        )
-        return [f["path"] for f in data.get("files", [])]
+        return list(self.iter_changed_files(pr_number))
+
+    def iter_comments(self, pr_number: int) -> Iterator[dict]:
+        """Yield a PR's issue comments, oldest first, one API page at a time."""
+        return self._iter_pages(f"/repos/{self.repo}/issues/{pr_number}/comments")
 
     def create_comment(self, pr_number: int, body: str) -> int:
-        """Create a comment on PR, return comment ID."""
-        result = self._run_gh(
-            [
-                "pr",
-                "comment",
-                str(pr_number),
-                "--body",
-                body,
-            ]
+        """Create a comment on PR, return comment ID.
+
+        Any ``<!-- marker -->`` in the body is recorded in the marker index.
+        """
+        data = self._api(
+            "POST", f"/repos/{self.repo}/issues/{pr_number}/comments", {"body": body}
         )
-        # gh pr comment doesn't return ID directly, need to fetch
-        return self._find_latest_comment_id(pr_number)
+        markers = MARKER_RE.findall(body)
+        if markers:
+            self.markers.put(pr_number, markers, data["id"])
+        return data["id"]
+
+    def get_comment(self, comment_id: int) -> dict | None:
+        """Get a single issue comment (None if it no longer exists)."""
+        try:
+            return self._api("GET", f"/repos/{self.repo}/issues/comments/{comment_id}")
+        except HttpError as e:
+            if e.response.status == 404:
+                return None
+            raise
+        except RuntimeError as e:
+            # The gh backend reports API errors as "gh: Not Found (HTTP 404)"
+            if not self._http and "(HTTP 404)" in str(e):
+                return None
+            raise
 
     def update_comment(self, comment_id: int, body: str) -> None:
         """Update an existing comment."""
-        self._run_gh(
-            [
-                "api",
-                f"/repos/{self.repo}/issues/comments/{comment_id}",
-                "-X",
-                "PATCH",
-                "-f",
-                f"body={body}",
-            ]
+        self._api(
+            "PATCH", f"/repos/{self.repo}/issues/comments/{comment_id}", {"body": body}
         )
 
     def find_comment_by_marker(self, pr_number: int, marker: str) -> dict | None:
-        """Find a comment containing a specific marker."""
-        comments = self._run_gh(
-            [
-                "api",
-                f"/repos/{self.repo}/issues/{pr_number}/comments",
-                "--paginate",
-            ]
-        )
-        for comment in comments:
-            if marker in comment.get("body", ""):
+        """Find a comment containing a specific marker.
+
+        Tries the marker index first (one GET); falls back to scanning all
+        comments when the indexed comment is gone or no longer has the marker.
+        """
+        comment_id = self.markers.get(pr_number, marker)
+        if comment_id:
+            comment = self.get_comment(comment_id)
+            if comment and marker in (comment.get("body") or ""):
+                return comment
+            self.markers.drop(pr_number, marker)
+
+        # Stops fetching pages as soon as the marker is found
+        for comment in self.iter_comments(pr_number):
+            if marker in (comment.get("body") or ""):
+                self.markers.put(pr_number, [marker], comment["id"])
                 return comment
         return None
 
-    def _find_latest_comment_id(self, pr_number: int) -> int:
-        """Find the latest comment ID on a PR."""
-        comments = self._run_gh(
-            [
-                "api",
-                f"/repos/{self.repo}/issues/{pr_number}/comments",
-                "--paginate",
-            ]
-        )
-        if comments:
-            return comments[-1]["id"]
-        return 0
+    def delete_comment(self, comment_id: int) -> None:
+        """Delete a comment."""
+        self._api("DELETE", f"/repos/{self.repo}/issues/comments/{comment_id}")
+
+    def post_sharded_comments(
+        self,
+        pr_number: int,
+        key: str,
+        sections: list[tuple[str, str]],
+        limit: int = MAX_SHARD_BODY,
+    ) -> list[int]:
+        """Post ``(title, markdown)`` sections as ordered, marker-tagged shard comments.
+
+        Sections (e.g. one per layer) are split with split_shards(). On
+        re-runs each shard is updated in place (skipped when unchanged) and
+        shards left over from a longer previous run are deleted, so the PR
+        keeps exactly one comment per shard.
+
+        Returns:
+            Comment IDs in shard order.
+        """
+        if not _SHARD_KEY_RE.match(key):
+            raise ValueError(f"Invalid shard key: {key!r}")
+
+        existing: dict[int, dict] = {}
+        for comment in self.iter_comments(pr_number):
+            match = _SHARD_RE.search(comment.get("body") or "")
+            if match and match.group(1) == key:
+                existing.setdefault(int(match.group(2)), comment)
+
+        shards = split_shards(sections, limit)
+        ids: list[int] = []
+        for index, (title, chunk) in enumerate(shards):
+            marker = SHARD_MARKER.format(key=key, index=index)
+            body = f"{marker}\n### {title}\n\n{chunk}\n"
+            previous = existing.pop(index, None)
+            if previous is None:
+                ids.append(self.create_comment(pr_number, body))
+                continue
+            if previous.get("body") != body:
+                self.update_comment(previous["id"], body)
+            self.markers.put(pr_number, [marker], previous["id"])
+            ids.append(previous["id"])
+
+        for index, stale in sorted(existing.items()):
+            self.delete_comment(stale["id"])
+            self.markers.drop(pr_number, SHARD_MARKER.format(key=key, index=index))
+        return ids
 
     def add_reaction(self, comment_id: int, reaction: str = "eyes") -> None:
         """Add reaction to a comment."""
-        self._run_gh(
-            [
-                "api",
-                f"/repos/{self.repo}/issues/comments/{comment_id}/reactions",
-                "-X",
-                "POST",
-                "-f",
-                f"content={reaction}",
-            ]
+        self._api(
+            "POST",
+            f"/repos/{self.repo}/issues/comments/{comment_id}/reactions",
+            {"content": reaction},
         )
 
     def react_to_comment(self, comment_id: int, reaction: str = "eyes") -> None:
@@ -155,26 +622,47 @@ class GitHubClient:
         url = f"https://github.com/{repo}/pull/{pr_number}#issuecomment-{comment_id}"
         return comment_id, url
 
-    def update_result_comment(self, comment_id: int, pr_number: int, title: str, content: str, success: bool) -> None:
-        """Update a previously created 'Running' comment with actual results."""
-        # Truncate content if too long for GitHub comments (~65k limit)
-        if len(content) > 60000:
-            content = content[:60000] + "\n...(truncated)"
+    def render_result_comment(
+        self, pr_number: int, title: str, content: str | Iterable[str], success: bool
+    ) -> str:
+        """Render the body of a finished 'Running' comment.
+
+        ``content`` (a string or any line iterator, e.g. LogHandle.iter_lines())
+        is compacted to fit a comment: diagnostics first, then head and tail.
+        """
+        lines = content.splitlines() if isinstance(content, str) else content
+        log = compact_log(lines, limit=MAX_COMMENT_LOG)
 
         icon = "✅" if success else "❌"
         repo = self.repo
-        body = f"""### {icon} {title}
+        note = ""
+        if log.artifact:
+            note = (
+                f"\n> 📎 {log.omitted_lines} of {log.total_lines} log lines omitted; "
+                f"full log saved as `{os.path.basename(log.artifact)}`"
+            )
+            run_id = os.environ.get("GITHUB_RUN_ID")
+            if run_id:
+                server = os.environ.get("GITHUB_SERVER_URL", "https://github.com")
+                note += f" ([workflow run]({server}/{repo}/actions/runs/{run_id}))"
+            note += "\n"
+        return f"""### {icon} {title}
 <details open>
 <summary>Logs</summary>
 
 ```text
-{content}
+{log.text}
 ```
 </details>
-
+{note}
 [⬅️ Back to Dashboard](https://github.com/{repo}/pull/{pr_number})
 """
-        self.update_comment(comment_id, body)
+
+    def update_result_comment(self, comment_id: int, pr_number: int, title: str, content: str | Iterable[str], success: bool) -> None:
+        """Update a previously created 'Running' comment with actual results."""
+        self.update_comment(
+            comment_id, self.render_result_comment(pr_number, title, content, success)
+        )
 
     def create_commit_status(
         self,
@@ -193,20 +681,11 @@ class GitHubClient:
             description: Short description
             target_url: URL to link to
         """
-        args = [
-            "api",
-            f"/repos/{self.repo}/statuses/{sha}",
-            "-X",
-            "POST",
-            "-f",
-            f"state={state}",
-            "-f",
-            f"context={context}",
-        ]
+        body = {"state": state, "context": context}
         if description:
-            args.extend(["-f", f"description={description}"])
+            body["description"] = description
         if target_url:
-            args.extend(["-f", f"target_url={target_url}"])
-        
-        self._run_gh(args)
+            body["target_url"] = target_url
+
+        self._api("POST", f"/repos/{self.repo}/statuses/{sha}", body)
 
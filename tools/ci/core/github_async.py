@@ -0,0 +1,119 @@
+"""asyncio front-end for GitHubClient.
+
+Same method names as GitHubClient, as coroutines. Calls run on worker
+threads against one shared client, so they share its keep-alive connection
+pool, ETag cache and rate limiter; a semaphore caps how many requests are in
+flight at once (``CI_GITHUB_CONCURRENCY``, default 4) to stay clear of
+GitHub's secondary rate limits.
+
+Example:
+    gh = AsyncGitHubClient()
+    await gh.create_commit_statuses(sha, [
+        {"state": "success", "context": "plan/platform"},
+        {"state": "failure", "context": "plan/data-prod"},
+    ])
+"""
+
+import asyncio
+from typing import Any, Callable
+
+from ..config import env_int
+from .github import MAX_SHARD_BODY, GitHubClient, PRContext, PRInfo
+
+DEFAULT_CONCURRENCY = 4
+
+
+class AsyncGitHubClient:
+    """Concurrent GitHub API client sharing one GitHubClient session."""
+
+    def __init__(
+        self,
+        token: str | None = None,
+        backend: str | None = None,
+        client: GitHubClient | None = None,
+        concurrency: int | None = None,
+    ):
+        self.client = client or GitHubClient(token=token, backend=backend)
+        if concurrency is None:
+            concurrency = env_int("CI_GITHUB_CONCURRENCY", DEFAULT_CONCURRENCY)
+        self.concurrency = max(1, concurrency)
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @property
+    def repo(self) -> str:
+        return self.client.repo
+
+    async def _call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        # Created lazily so the semaphore binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def get_pr(self, pr_number: int) -> PRInfo:
+        return await self._call(self.client.get_pr, pr_number)
+
+    async def get_pr_context(self, pr_number: int, refresh: bool = False) -> PRContext:
+        return await self._call(self.client.get_pr_context, pr_number, refresh)
+
+    async def get_changed_files(self, pr_number: int) -> list[str]:
+        return await self._call(self.client.get_changed_files, pr_number)
+
+    async def create_comment(self, pr_number: int, body: str) -> int:
+        return await self._call(self.client.create_comment, pr_number, body)
+
+    async def get_comment(self, comment_id: int) -> dict | None:
+        return await self._call(self.client.get_comment, comment_id)
+
+    async def update_comment(self, comment_id: int, body: str) -> None:
+        await self._call(self.client.update_comment, comment_id, body)
+
+    async def find_comment_by_marker(self, pr_number: int, marker: str) -> dict | None:
+        return await self._call(self.client.find_comment_by_marker, pr_number, marker)
+
+    async def delete_comment(self, comment_id: int) -> None:
+        await self._call(self.client.delete_comment, comment_id)
+
+    async def post_sharded_comments(
+        self, pr_number: int, key: str, sections: list[tuple[str, str]], limit: int = MAX_SHARD_BODY
+    ) -> list[int]:
+        return await self._call(self.client.post_sharded_comments, pr_number, key, sections, limit)
+
+    async def add_reaction(self, comment_id: int, reaction: str = "eyes") -> None:
+        await self._call(self.client.add_reaction, comment_id, reaction)
+
+    async def react_to_comment(self, comment_id: int, reaction: str = "eyes") -> None:
+        await self.add_reaction(comment_id, reaction)
+
+    async def create_running_comment(self, pr_number: int, title: str) -> tuple[int, str]:
+        return await self._call(self.client.create_running_comment, pr_number, title)
+
+    async def update_result_comment(
+        self, comment_id: int, pr_number: int, title: str, content: str, success: bool
+    ) -> None:
+        await self._call(
+            self.client.update_result_comment, comment_id, pr_number, title, content, success
+        )
+
+    async def create_commit_status(
+        self,
+        sha: str,
+        state: str,
+        context: str = "CI",
+        description: str = "",
+        target_url: str = "",
+    ) -> None:
+        await self._call(
+            self.client.create_commit_status, sha, state, context, description, target_url
+        )
+
+    async def create_commit_statuses(self, sha: str, statuses: list[dict]) -> list[BaseException | None]:
+        """Post several statuses (create_commit_status kwargs) concurrently.
+
+        Returns one entry per status: None on success, or the exception raised.
+        """
+        results = await asyncio.gather(
+            *(self.create_commit_status(sha, **status) for status in statuses),
+            return_exceptions=True,
+        )
+        return [r if isinstance(r, BaseException) else None for r in results]
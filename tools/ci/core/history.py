@@ -0,0 +1,263 @@
+"""Append-only drift scan history (SQLite).
+
+Every verify appends one row per layer: outcome, plan counts, per-phase
+durations and the drifted resource addresses. Reports (flapping resources,
+scan-time regressions) are answered from this store without re-running any
+plans. Plan timings per parallelism setting are kept as well, for the
+parallelism auto-tuner (see tuning.py).
+
+The database lives at ``CI_HISTORY_DB`` (default: ``<cache>/history/drift.sqlite``);
+persist that path between CI runs (e.g. with actions/cache) to build up history.
+"""
+
+import os
+import sqlite3
+import statistics
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from ..config import get_cache_dir
+from ..plan_report import PlanReport
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    layer TEXT NOT NULL,
+    ts REAL NOT NULL,
+    mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    add_count INTEGER NOT NULL DEFAULT 0,
+    change_count INTEGER NOT NULL DEFAULT 0,
+    destroy_count INTEGER NOT NULL DEFAULT 0,
+    init_seconds REAL,
+    plan_seconds REAL,
+    apply_seconds REAL,
+    applied INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS scans_layer_ts ON scans (layer, ts);
+CREATE TABLE IF NOT EXISTS scan_changes (
+    scan_id INTEGER NOT NULL REFERENCES scans (id),
+    address TEXT NOT NULL,
+    action TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scan_changes_scan ON scan_changes (scan_id);
+CREATE TABLE IF NOT EXISTS plan_timings (
+    layer TEXT NOT NULL,
+    ts REAL NOT NULL,
+    phase TEXT NOT NULL,
+    parallelism INTEGER NOT NULL,
+    resources INTEGER NOT NULL,
+    wall_seconds REAL NOT NULL,
+    cpu_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS plan_timings_layer_ts ON plan_timings (layer, ts);
+"""
+
+# Statuses that say nothing about drift (the layer was not planned)
+_NOT_PLANNED = ("skipped", "init_failed", "error")
+
+
+@dataclass
+class ScanRecord:
+    """One layer's result in one verify run."""
+
+    layer: str
+    status: str
+    mode: str = "full"
+    report: PlanReport | None = None
+    init_seconds: float | None = None
+    plan_seconds: float | None = None
+    apply_seconds: float | None = None
+    applied: bool = False
+    ts: float = field(default_factory=time.time)
+
+
+@dataclass
+class FlappingResource:
+    layer: str
+    address: str
+    # Times the resource went from clean to drifted or back
+    flips: int
+    drifted_scans: int
+    scans: int
+
+
+@dataclass
+class Regression:
+    layer: str
+    baseline_seconds: float
+    recent_seconds: float
+
+    @property
+    def ratio(self) -> float:
+        return self.recent_seconds / self.baseline_seconds if self.baseline_seconds else 0.0
+
+
+@dataclass
+class PlanTiming:
+    """One plan (or refresh) of a layer at a given parallelism."""
+
+    parallelism: int
+    # Resources refreshed + data sources read
+    resources: int
+    wall_seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """Resources refreshed per second."""
+        return self.resources / self.wall_seconds if self.wall_seconds else 0.0
+
+
+class DriftHistory:
+    """SQLite-backed scan history."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path or os.environ.get("CI_HISTORY_DB") or os.path.join(
+            get_cache_dir("history"), "drift.sqlite"
+        )
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "DriftHistory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- Writes ----------------------------------------------------------
+
+    def record(self, records: list[ScanRecord], run_id: str | None = None) -> str:
+        """Append one verify run's records in a single transaction; return the run id."""
+        run_id = run_id or os.environ.get("GITHUB_RUN_ID") or uuid.uuid4().hex[:12]
+        with self._conn:
+            for rec in records:
+                report = rec.report or PlanReport()
+                cur = self._conn.execute(
+                    "INSERT INTO scans (run_id, layer, ts, mode, status, add_count, change_count,"
+                    " destroy_count, init_seconds, plan_seconds, apply_seconds, applied)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id, rec.layer, rec.ts, rec.mode, rec.status,
+                        report.add, report.change, report.destroy,
+                        rec.init_seconds, rec.plan_seconds, rec.apply_seconds, int(rec.applied),
+                    ),
+                )
+                self._conn.executemany(
+                    "INSERT INTO scan_changes (scan_id, address, action) VALUES (?, ?, ?)",
+                    [(cur.lastrowid, c.address, c.action) for c in report.changes],
+                )
+        return run_id
+
+    def record_timing(
+        self,
+        layer: str,
+        phase: str,
+        parallelism: int,
+        resources: int,
+        wall_seconds: float,
+        cpu_seconds: float | None = None,
+        ts: float | None = None,
+    ) -> None:
+        """Append one plan timing sample."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO plan_timings (layer, ts, phase, parallelism, resources,"
+                " wall_seconds, cpu_seconds) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (layer, ts or time.time(), phase, parallelism, resources, wall_seconds, cpu_seconds),
+            )
+
+    # --- Queries ---------------------------------------------------------
+
+    def timings(self, layer: str, phase: str = "plan", limit: int = 50) -> list[PlanTiming]:
+        """The layer's most recent timings of one phase (newest first).
+
+        The default is full plans only: refresh-only and targeted plans
+        refresh a different set of objects and are not comparable.
+        """
+        rows = self._conn.execute(
+            "SELECT parallelism, resources, wall_seconds FROM plan_timings"
+            " WHERE layer = ? AND phase = ? ORDER BY ts DESC LIMIT ?",
+            (layer, phase, limit),
+        ).fetchall()
+        return [PlanTiming(*row) for row in rows]
+
+    def scans(self, layer: str | None = None, since: float = 0) -> list[sqlite3.Row]:
+        """Scan rows (oldest first), optionally for one layer."""
+        cur = self._conn.cursor()
+        cur.row_factory = sqlite3.Row
+        query = "SELECT * FROM scans WHERE ts >= ?"
+        params: list = [since]
+        if layer:
+            query += " AND layer = ?"
+            params.append(layer)
+        return cur.execute(query + " ORDER BY ts, id", params).fetchall()
+
+    def flapping(self, since: float = 0, min_flips: int = 2) -> list[FlappingResource]:
+        """Resources that keep drifting and getting reconciled.
+
+        For each layer, walks its planned scans in time order and counts how
+        often each address switches between drifted and clean. Targeted
+        scans are ignored: they do not look at every resource.
+        """
+        rows = self._conn.execute(
+            "SELECT s.id, s.layer, c.address FROM scans s"
+            " LEFT JOIN scan_changes c ON c.scan_id = s.id"
+            " WHERE s.ts >= ? AND s.mode != 'targeted' AND s.status NOT IN (?, ?, ?)"
+            " ORDER BY s.ts, s.id",
+            (since, *_NOT_PLANNED),
+        ).fetchall()
+
+        # layer -> ordered scan ids, and scan id -> drifted addresses
+        timeline: dict[str, list[int]] = {}
+        drifted: dict[int, set[str]] = {}
+        for scan_id, layer, address in rows:
+            scans = timeline.setdefault(layer, [])
+            if not scans or scans[-1] != scan_id:
+                scans.append(scan_id)
+            if address:
+                drifted.setdefault(scan_id, set()).add(address)
+
+        result = []
+        for layer, scan_ids in timeline.items():
+            addresses = set().union(*(drifted.get(i, set()) for i in scan_ids))
+            for address in sorted(addresses):
+                states = [address in drifted.get(i, ()) for i in scan_ids]
+                flips = sum(1 for a, b in zip(states, states[1:]) if a != b)
+                if flips >= min_flips:
+                    result.append(FlappingResource(layer, address, flips, sum(states), len(states)))
+        result.sort(key=lambda f: (-f.flips, f.layer, f.address))
+        return result
+
+    def regressions(
+        self, since: float = 0, recent: int = 5, threshold: float = 0.5, mode: str = "full"
+    ) -> list[Regression]:
+        """Layers whose recent plan time is ``threshold`` (50%) above their baseline.
+
+        Compares the median plan_seconds of each layer's last ``recent``
+        scans with the median of its earlier scans in the window (scans of
+        one ``mode`` only, as modes differ widely in cost).
+        """
+        rows = self._conn.execute(
+            "SELECT layer, plan_seconds FROM scans"
+            " WHERE ts >= ? AND mode = ? AND plan_seconds IS NOT NULL ORDER BY ts, id",
+            (since, mode),
+        ).fetchall()
+        per_layer: dict[str, list[float]] = {}
+        for layer, seconds in rows:
+            per_layer.setdefault(layer, []).append(seconds)
+
+        result = []
+        for layer, times in per_layer.items():
+            if len(times) < recent + 2:
+                continue
+            baseline = statistics.median(times[:-recent])
+            latest = statistics.median(times[-recent:])
+            if baseline and latest > baseline * (1 + threshold):
+                result.append(Regression(layer, baseline, latest))
+        result.sort(key=lambda r: -r.ratio)
+        return result
@@ -0,0 +1,140 @@
+"""On-disk HTTP response cache with ETag / Last-Modified revalidation.
+
+GET responses carrying a validator are stored on disk; the next identical
+GET is sent with ``If-None-Match`` / ``If-Modified-Since`` and a ``304 Not
+Modified`` is answered from the stored body. On GitHub, 304s do not count
+against the rate limit.
+
+Entries are namespaced per token, and GITHUB_TOKEN changes every job, so
+the cache directory is pruned when a cache is opened (once per process):
+entries unused for ``CI_HTTP_CACHE_MAX_AGE`` seconds (default 7 days) are
+removed, then the oldest ones until it is under ``MAX_BYTES``.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from ..config import env_int, get_cache_dir, write_json
+
+DEFAULT_MAX_AGE = 7 * 86400
+MAX_BYTES = 64 * 1024 * 1024
+
+
+class ResponseCache:
+    """Validator-keyed response store with hit/miss counters."""
+
+    # Cache directories already pruned by this process
+    _pruned: set[str] = set()
+    _prune_lock = threading.Lock()
+
+    def __init__(
+        self,
+        path: str | None = None,
+        namespace: str = "",
+        max_age: int | None = None,
+        max_bytes: int = MAX_BYTES,
+    ):
+        self.path = path or get_cache_dir("http")
+        # Separates entries by credentials so tokens never share payloads
+        self.namespace = namespace
+        self.hits = 0  # 304: served from cache
+        self.misses = 0  # 200: no usable cache entry or content changed
+        self.stores = 0
+        self._lock = threading.Lock()
+        if max_age is None:
+            max_age = env_int("CI_HTTP_CACHE_MAX_AGE", DEFAULT_MAX_AGE)
+        with self._prune_lock:
+            if self.path not in self._pruned:
+                self._pruned.add(self.path)
+                self.prune(max_age, max_bytes)
+
+    def prune(self, max_age: float, max_bytes: int) -> int:
+        """Remove entries unused for ``max_age`` seconds, then the oldest beyond ``max_bytes``.
+
+        Returns the number of files removed.
+        """
+        entries = []
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort(reverse=True)  # newest first
+
+        cutoff = time.time() - max_age
+        removed, total = 0, 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total + size <= max_bytes:
+                total += size
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _file(self, url: str) -> str:
+        key = hashlib.sha256(f"{self.namespace}\0{url}".encode()).hexdigest()
+        return os.path.join(self.path, f"{key}.json")
+
+    def lookup(self, url: str) -> dict | None:
+        """Return the stored entry for ``url`` (validators, headers, body)."""
+        path = self._file(url)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        try:
+            # Keep entries that are still used from being pruned
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict[str, str]:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, headers: dict[str, str], body: bytes) -> None:
+        """Store a 200 response if it carries a validator."""
+        etag, last_modified = headers.get("etag"), headers.get("last-modified")
+        if not (etag or last_modified):
+            return
+        entry = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "headers": {k: v for k, v in headers.items() if k in ("link", "content-type")},
+            "body": body.decode("utf-8", errors="replace"),
+        }
+        write_json(self._file(url), entry)
+        with self._lock:
+            self.stores += 1
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict[str, float]:
+        """Counters for tuning (hit_rate is hits / conditional-eligible GETs)."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
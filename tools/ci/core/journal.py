@@ -0,0 +1,159 @@
+"""Checkpoint journal for verify runs (``verify --resume``).
+
+Each layer's scan outcome and apply progress is written to
+``<cache>/runs/verify/journal.json`` as soon as it happens. If a run dies
+part-way through the apply phase, ``--resume`` picks the journal up: layers
+already applied or clean are left alone, layers with a saved plan apply that
+plan as-is (unless an upstream layer has been applied since it was made),
+and only layers whose scan or apply failed (or never ran) are
+planned again.
+
+Drifted layers' saved plans are copied to a job-scoped directory (see
+config.get_job_temp_dir) and the journal only records their paths. A resume
+in a later job finds them gone and applies those layers without a saved
+plan.
+Saved plans are also tied to the state they were planned against; terraform
+refuses a stale one, and the layer is re-planned on the next resume.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+
+from ..config import get_cache_dir, get_job_temp_dir, write_json
+from .scanner import LayerScan, ScanStatus
+
+_JOURNAL = "journal.json"
+
+# Apply steps that mean the layer must be planned again before applying
+_REPLAN = ("running", "failed", "skipped")
+
+
+def current_sha() -> str:
+    """Commit being verified (``GITHUB_SHA``, else ``git rev-parse HEAD``)."""
+    if os.environ.get("GITHUB_SHA"):
+        return os.environ["GITHUB_SHA"]
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ""
+    except OSError:
+        return ""
+
+
+@dataclass
+class LayerEntry:
+    """Checkpointed progress of one layer."""
+
+    # "success" | "cached" | "failed" ("" = not reached)
+    init: str = ""
+    # ScanStatus value ("" = not scanned)
+    scan: str = ""
+    # Job-scoped copy of the saved plan (drifted layers only)
+    plan_file: str | None = None
+    # "running" | "success" | "failed" | "skipped" ("" = not started)
+    apply: str = ""
+
+    @property
+    def needs_scan(self) -> bool:
+        scanned = self.scan in (ScanStatus.NO_DRIFT.value, ScanStatus.DRIFT.value)
+        return not scanned or self.apply in _REPLAN
+
+    @property
+    def pending_apply(self) -> bool:
+        return self.scan == ScanStatus.DRIFT.value and self.apply != "success"
+
+
+@dataclass
+class RunState:
+    """Journal file contents."""
+
+    run_id: str
+    mode: str
+    sha: str
+    started_at: float
+    updated_at: float = 0.0
+    complete: bool = False
+    layers: dict[str, LayerEntry] = field(default_factory=dict)
+
+
+class RunJournal:
+    """Thread-safe, atomically-written checkpoint file for one verify run."""
+
+    def __init__(self, root: str | None = None, plans_dir: str | None = None):
+        self.root = root or get_cache_dir("runs", "verify")
+        self.path = os.path.join(self.root, _JOURNAL)
+        self.plans_dir = plans_dir or os.path.join(get_job_temp_dir("runs", "verify"), "plans")
+        self.state: RunState | None = None
+        self._lock = threading.Lock()
+
+    def load(self) -> RunState | None:
+        """Read the journal left by the previous run (None if there is none)."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            layers = {name: LayerEntry(**entry) for name, entry in data.pop("layers").items()}
+            self.state = RunState(**data, layers=layers)
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            self.state = None
+        return self.state
+
+    def start(self, mode: str, sha: str | None = None) -> RunState:
+        """Begin a new run, discarding the previous journal and its plans."""
+        shutil.rmtree(self.plans_dir, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+        self.state = RunState(
+            run_id=os.environ.get("GITHUB_RUN_ID") or uuid.uuid4().hex[:12],
+            mode=mode,
+            sha=current_sha() if sha is None else sha,
+            started_at=time.time(),
+        )
+        with self._lock:
+            self._save()
+        return self.state
+
+    def entry(self, layer_name: str) -> LayerEntry:
+        return self.state.layers.get(layer_name) or LayerEntry()
+
+    def _save(self) -> None:
+        self.state.updated_at = time.time()
+        write_json(self.path, asdict(self.state), indent=2)
+
+    def record_scan(self, scan: LayerScan, keep_plan: bool = True) -> None:
+        """Checkpoint a layer's init + plan outcome (and keep its saved plan)."""
+        entry = LayerEntry(scan=scan.status.value)
+        if scan.init_result:
+            entry.init = (
+                "cached" if scan.init_result.cached
+                else "success" if scan.init_result.success
+                else "failed"
+            )
+        plan = scan.plan_result
+        has_plan = plan is not None and plan.plan_file and os.path.exists(plan.plan_file)
+        if keep_plan and scan.status == ScanStatus.DRIFT and has_plan:
+            os.makedirs(self.plans_dir, mode=0o700, exist_ok=True)
+            entry.plan_file = os.path.join(self.plans_dir, f"{scan.layer.name}.tfplan")
+            shutil.copyfile(plan.plan_file, entry.plan_file)
+            os.chmod(entry.plan_file, 0o600)
+        with self._lock:
+            self.state.layers[scan.layer.name] = entry
+            self._save()
+
+    def record_apply(self, layer_name: str, status: str) -> None:
+        """Checkpoint an apply step ("running" before it starts, then the outcome)."""
+        with self._lock:
+            entry = self.state.layers.setdefault(layer_name, LayerEntry())
+            entry.apply = status
+            self._save()
+
+    def finish(self, success: bool) -> None:
+        """Close the run; it is complete (not resumable) if nothing failed or is left to apply."""
+        with self._lock:
+            self.state.complete = success and not any(
+                entry.pending_apply for entry in self.state.layers.values()
+            )
+            self._save()
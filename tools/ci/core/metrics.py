@@ -0,0 +1,273 @@
+"""Resource metrics for terraform/terragrunt invocations.
+
+Every command run by TerraformRunner is measured: wall time, CPU time and
+peak RSS of the child process tree, and bytes of output. CPU comes from
+``os.wait4`` on the child, which includes every descendant it reaped
+(terraform, provider plugins). Peak RSS is the larger of the single biggest
+process (``ru_maxrss``) and the summed RSS of the whole tree, sampled from
+/proc while the command runs (Linux only).
+
+Measurements are attached to ``ExecutionResult.metrics`` and exported:
+
+- ``CI_METRICS_FILE``: one JSON record per command (JSON Lines).
+- ``CI_OTLP_ENDPOINT``: one span per command, POSTed in batches as OTLP/HTTP
+  JSON to ``<endpoint>/v1/traces`` (e.g. ``http://localhost:4318``). All
+  spans of a CI run share a trace id derived from ``GITHUB_RUN_ID``.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+
+from .rest import HttpTransport
+
+SAMPLE_INTERVAL = 0.5
+# Spans buffered before a POST to the collector
+OTLP_BATCH_SIZE = 32
+SERVICE_NAME = "infra-ci"
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass
+class ProcessMetrics:
+    """Resources used by one command."""
+
+    wall_seconds: float = 0.0
+    cpu_user_seconds: float = 0.0
+    cpu_system_seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    stdout_bytes: int = 0
+    stderr_bytes: int = 0
+
+    @property
+    def cpu_seconds(self) -> float:
+        return self.cpu_user_seconds + self.cpu_system_seconds
+
+
+def _tree_rss(root_pid: int) -> int:
+    """Summed RSS in bytes of ``root_pid`` and all its descendants (0 without /proc)."""
+    children: dict[int, list[int]] = {}
+    rss: dict[int, int] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue  # exited meanwhile
+        # Fields after "(comm)"; comm may contain spaces/parens
+        fields = stat[stat.rfind(b")") + 2:].split()
+        pid = int(entry)
+        children.setdefault(int(fields[1]), []).append(pid)
+        rss[pid] = int(fields[21]) * _PAGE_SIZE
+
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, ()))
+    return total
+
+
+class ProcessMonitor:
+    """Samples a child's process tree while it runs and reaps it with wait4.
+
+    Use ``wait()`` instead of ``Popen.wait()``.
+    """
+
+    def __init__(self, proc: subprocess.Popen, interval: float = SAMPLE_INTERVAL):
+        self.proc = proc
+        self.interval = interval
+        self.peak_tree_rss = 0
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._start = time.monotonic()
+        self._sampler.start()
+
+    def _sample(self) -> None:
+        while True:
+            self.peak_tree_rss = max(self.peak_tree_rss, _tree_rss(self.proc.pid))
+            if self._stop.wait(self.interval):
+                return
+
+    def wait(self) -> tuple[int, ProcessMetrics]:
+        """Reap the child; return its exit code and resource usage."""
+        _, status, usage = os.wait4(self.proc.pid, 0)
+        wall = time.monotonic() - self._start
+        self._stop.set()
+        self._sampler.join()
+        self.proc.returncode = os.waitstatus_to_exitcode(status)
+        return self.proc.returncode, ProcessMetrics(
+            wall_seconds=wall,
+            cpu_user_seconds=usage.ru_utime,
+            cpu_system_seconds=usage.ru_stime,
+            # ru_maxrss is in KiB on Linux
+            peak_rss_bytes=max(usage.ru_maxrss * 1024, self.peak_tree_rss),
+        )
+
+
+def _trace_id() -> str:
+    run_id = os.environ.get("GITHUB_RUN_ID")
+    if run_id:
+        seed = f"{run_id}:{os.environ.get('GITHUB_RUN_ATTEMPT', '1')}"
+        return hashlib.sha256(seed.encode()).hexdigest()[:32]
+    return uuid.uuid4().hex
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        # OTLP/JSON encodes 64-bit ints as strings
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def phase_name(cmd: list[str]) -> str:
+    """Phase of a terraform/terragrunt command line (init, plan, refresh, apply, ...)."""
+    if len(cmd) < 2:
+        return cmd[0] if cmd else ""
+    if cmd[1] == "plan" and "-refresh-only" in cmd:
+        return "refresh"
+    return cmd[1]
+
+
+class MetricsRecorder:
+    """Writes per-command metrics to a JSON Lines file and/or an OTLP collector."""
+
+    def __init__(
+        self,
+        path: str | None = None,
+        otlp_endpoint: str | None = None,
+        batch_size: int = OTLP_BATCH_SIZE,
+    ):
+        self.path = path
+        self.otlp_endpoint = otlp_endpoint.rstrip("/") if otlp_endpoint else None
+        self.batch_size = batch_size
+        self.trace_id = _trace_id()
+        self._spans: list[dict] = []
+        self._lock = threading.Lock()
+        self._http: HttpTransport | None = None
+        self._export_failed = False
+
+    @classmethod
+    def from_env(cls) -> "MetricsRecorder":
+        return cls(
+            path=os.environ.get("CI_METRICS_FILE") or None,
+            otlp_endpoint=os.environ.get("CI_OTLP_ENDPOINT") or None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path or self.otlp_endpoint)
+
+    def record(
+        self,
+        layer: str,
+        cmd: list[str],
+        exit_code: int,
+        metrics: ProcessMetrics,
+        started_at: float,
+    ) -> None:
+        """Export one command's metrics (``started_at`` is a Unix timestamp)."""
+        if not self.enabled:
+            return
+        phase = phase_name(cmd)
+        record = {
+            "layer": layer,
+            "phase": phase,
+            "command": " ".join(cmd),
+            "exit_code": exit_code,
+            "started_at": started_at,
+            **asdict(metrics),
+        }
+        with self._lock:
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+            if self.otlp_endpoint:
+                self._spans.append(self._span(record))
+                if len(self._spans) >= self.batch_size:
+                    self._flush_locked()
+
+    def _span(self, record: dict) -> dict:
+        start_ns = int(record["started_at"] * 1e9)
+        end_ns = start_ns + int(record["wall_seconds"] * 1e9)
+        attributes = {
+            "ci.layer": record["layer"],
+            "ci.phase": record["phase"],
+            "process.command_line": record["command"],
+            "process.exit_code": record["exit_code"],
+            "process.cpu.user_seconds": record["cpu_user_seconds"],
+            "process.cpu.system_seconds": record["cpu_system_seconds"],
+            "process.memory.peak_rss_bytes": record["peak_rss_bytes"],
+            "process.stdout_bytes": record["stdout_bytes"],
+            "process.stderr_bytes": record["stderr_bytes"],
+        }
+        return {
+            "traceId": self.trace_id,
+            "spanId": uuid.uuid4().hex[:16],
+            "name": f"{record['phase']} {record['layer']}",
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [_attribute(k, v) for k, v in attributes.items()],
+            # STATUS_CODE_OK / STATUS_CODE_ERROR (plan exit code 2 = changes, not an error)
+            "status": {"code": 1 if record["exit_code"] in (0, 2) else 2},
+        }
+
+    def flush(self) -> None:
+        """POST buffered spans to the collector."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        spans, self._spans = self._spans, []
+        if not spans or not self.otlp_endpoint:
+            return
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _attribute("service.name", SERVICE_NAME),
+                    _attribute("ci.run_id", os.environ.get("GITHUB_RUN_ID", "")),
+                ]},
+                "scopeSpans": [{"scope": {"name": "ci.terraform"}, "spans": spans}],
+            }]
+        }
+        try:
+            if self._http is None:
+                self._http = HttpTransport(self.otlp_endpoint, pool_size=1, timeout=10)
+            self._http.request("POST", "/v1/traces", body=payload)
+        except Exception as e:
+            # Telemetry must never fail a CI run; warn once
+            if not self._export_failed:
+                print(f"  ⚠️ OTLP export to {self.otlp_endpoint} failed: {e}")
+                self._export_failed = True
+
+
+_recorder: MetricsRecorder | None = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder() -> MetricsRecorder:
+    """Process-wide recorder configured from the environment (flushed at exit)."""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = MetricsRecorder.from_env()
+            atexit.register(_recorder.flush)
+        return _recorder
@@ -0,0 +1,122 @@
+"""Content-addressed cache of plan results.
+
+Entries are keyed by plan_fingerprint() (layer code tree, tfvars, terragrunt
+config and the env vars it reads, provider lockfile and remote state
+serial), so a hit means terraform would be
+planning exactly the same inputs against exactly the same state. Changes
+made outside terraform (drift) do not bump the serial, so entries also
+expire after ``CI_PLAN_CACHE_TTL`` seconds; drift scans should not use the
+cache at all.
+
+Only the result, report and log go to the persistent CI cache; the binary
+plan is kept for the rest of the job (see config.get_job_temp_dir). A
+lookup that needs a plan file (``get(key, plan_file)``) is a miss in a
+later job.
+"""
+
+import json
+import os
+import shutil
+import time
+
+from ..config import env_int, get_cache_dir, get_job_temp_dir
+from ..plan_report import PlanReport
+from .terraform import ExecutionResult, LogHandle, PlanResult
+
+DEFAULT_TTL = 3600
+# Entries kept per layer; older ones are pruned on put()
+MAX_ENTRIES = 5
+
+_META = "result.json"
+_LOG = "plan.log"
+
+
+class PlanCache:
+    """On-disk plan cache for a single layer."""
+
+    def __init__(self, layer_name: str, ttl: int | None = None):
+        self.root = get_cache_dir("plans", layer_name)
+        self.plans_dir = get_job_temp_dir("plans", layer_name)
+        self.ttl = env_int("CI_PLAN_CACHE_TTL", DEFAULT_TTL) if ttl is None else ttl
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _plan(self, key: str) -> str:
+        return os.path.join(self.plans_dir, f"{key}.tfplan")
+
+    def get(self, key: str, plan_file: str | None = None) -> ExecutionResult | None:
+        """Return the cached result for ``key``, or None on miss/expiry.
+
+        With ``plan_file`` the saved plan is copied back there so it can be
+        applied; without a saved plan from this job that is a miss.
+        """
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, _META)) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if time.time() - meta["created_at"] > self.ttl:
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        if plan_file and meta.get("has_plan") and not os.path.exists(self._plan(key)):
+            return None
+
+        result = ExecutionResult(
+            success=meta["success"],
+            exit_code=meta["exit_code"],
+            stdout=meta["stdout"],
+            stderr=meta["stderr"],
+            plan_result=PlanResult[meta["plan_result"]] if meta["plan_result"] else None,
+            cached=True,
+            report=PlanReport.from_dict(meta["report"]) if meta["report"] else None,
+        )
+        if os.path.exists(os.path.join(entry, _LOG)):
+            result.log = LogHandle(os.path.join(entry, _LOG))
+        if plan_file and meta.get("has_plan"):
+            shutil.copyfile(self._plan(key), plan_file)
+            result.plan_file = plan_file
+        return result
+
+    def put(self, key: str, result: ExecutionResult) -> None:
+        """Store a successful plan result (and its plan file / log)."""
+        if not result.success:
+            return
+        entry = self._entry(key)
+        tmp = f"{entry}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        has_plan = bool(result.plan_file and os.path.exists(result.plan_file))
+        if has_plan:
+            shutil.copyfile(result.plan_file, self._plan(key))
+            os.chmod(self._plan(key), 0o600)
+        if result.log:
+            shutil.copyfile(result.log.path, os.path.join(tmp, _LOG))
+        meta = {
+            "created_at": time.time(),
+            "success": result.success,
+            "exit_code": result.exit_code,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "plan_result": result.plan_result.name if result.plan_result else None,
+            "report": result.report.to_dict() if result.report else None,
+            "has_plan": has_plan,
+        }
+        with open(os.path.join(tmp, _META), "w") as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        self._prune()
+
+    def _prune(self) -> None:
+        entries = [
+            os.path.join(self.root, name)
+            for name in os.listdir(self.root)
+            if ".tmp-" not in name
+        ]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for stale in entries[MAX_ENTRIES:]:
+            shutil.rmtree(stale, ignore_errors=True)
@@ -0,0 +1,179 @@
+"""GitHub rate-limit tracking, pacing and retry/backoff.
+
+Tracks the ``X-RateLimit-*`` headers of every response and:
+
+- paces requests when the remaining budget gets low, spreading what is
+  left over the time until reset (divided across ``CI_RATE_JOBS``
+  concurrent jobs sharing the token)
+- backs off with full jitter on 403/429 rate-limit responses, honouring
+  ``Retry-After`` and ``X-RateLimit-Reset``
+- after a secondary rate limit, spaces out mutating requests as GitHub
+  recommends (at least one second apart)
+
+The last observed budget is shared with other CI processes on the same
+runner through a small state file.
+"""
+
+import fcntl
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable
+
+from ..config import env_int, get_cache_dir
+
+DEFAULT_RESERVE = 50
+DEFAULT_MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+# Start pacing once less than this fraction of the limit is left
+PACING_THRESHOLD = 0.2
+SECONDARY_WRITE_INTERVAL = 1.0
+
+MUTATING_METHODS = ("POST", "PATCH", "PUT", "DELETE")
+
+
+class RateLimitExceeded(RuntimeError):
+    """Retries exhausted while rate limited."""
+
+
+class RateLimiter:
+    """Shared request budget for one GitHub token."""
+
+    def __init__(
+        self,
+        state_path: str | None = None,
+        reserve: int = DEFAULT_RESERVE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.state_path = state_path or os.path.join(get_cache_dir("github"), "ratelimit.json")
+        self.reserve = reserve
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.clock = clock
+        self.jobs = max(1, env_int("CI_RATE_JOBS", 1))
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset: float | None = None
+        self.write_interval = 0.0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        self._load_shared()
+
+    # --- Shared state ----------------------------------------------------
+
+    def _load_shared(self) -> None:
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if state.get("reset", 0) > self.clock():
+            self.limit, self.remaining, self.reset = state["limit"], state["remaining"], state["reset"]
+
+    def _save_shared(self) -> None:
+        try:
+            with open(self.state_path, "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                f.truncate()
+                json.dump({"limit": self.limit, "remaining": self.remaining, "reset": self.reset}, f)
+        except OSError:
+            pass
+
+    # --- Budget ----------------------------------------------------------
+
+    @property
+    def remaining_budget(self) -> int | None:
+        """Requests this job can still make before hitting the reserve."""
+        if self.remaining is None:
+            return None
+        return max(0, (self.remaining - self.reserve) // self.jobs)
+
+    def update(self, headers: dict[str, str]) -> None:
+        """Record ``X-RateLimit-*`` headers from a response."""
+        # GraphQL and search have their own buckets; only track the REST one
+        if headers.get("x-ratelimit-resource", "core") != "core":
+            return
+        try:
+            remaining = int(headers["x-ratelimit-remaining"])
+            limit = int(headers.get("x-ratelimit-limit", remaining))
+            reset = float(headers.get("x-ratelimit-reset", self.clock() + 3600))
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            self.limit, self.remaining, self.reset = limit, remaining, reset
+        self._save_shared()
+
+    def _wait(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.throttled_seconds += seconds
+        self.sleep(seconds)
+
+    def before_request(self, method: str) -> None:
+        """Block as needed so this request stays within budget."""
+        now = self.clock()
+        if method in MUTATING_METHODS and self.write_interval:
+            # Reserve the next write slot so concurrent callers queue up
+            with self._lock:
+                slot = max(now, self._last_write + self.write_interval)
+                self._last_write = slot
+            self._wait(slot - now)
+
+        if self.remaining is None or self.reset is None or self.reset <= now:
+            return
+        if self.remaining <= self.reserve:
+            # Out of budget: wait for the window to reset
+            self._wait(min(self.reset - now, MAX_DELAY * 10))
+        elif self.limit and self.remaining < self.limit * PACING_THRESHOLD:
+            share = max(1, (self.remaining - self.reserve) // self.jobs)
+            self._wait(min((self.reset - now) / share, MAX_DELAY))
+
+    def retry_delay(
+        self, status: int, headers: dict[str, str], attempt: int, body: str = ""
+    ) -> float | None:
+        """Seconds to wait before retrying, or None if not a rate-limit response.
+
+        Raises:
+            RateLimitExceeded: If the response is a rate limit and retries are exhausted.
+        """
+        is_primary = headers.get("x-ratelimit-remaining") == "0"
+        is_secondary = "secondary rate limit" in body.lower()
+        if not (status == 429 or (status == 403 and (is_primary or is_secondary or "retry-after" in headers))):
+            return None
+        if attempt >= self.max_retries:
+            raise RateLimitExceeded(f"GitHub rate limit: gave up after {attempt} retries")
+
+        if is_secondary or status == 429:
+            self.write_interval = max(self.write_interval, SECONDARY_WRITE_INTERVAL)
+
+        self.retries += 1
+        if "retry-after" in headers:
+            try:
+                return float(headers["retry-after"])
+            except ValueError:
+                pass
+        if is_primary and "x-ratelimit-reset" in headers:
+            return max(0.0, float(headers["x-ratelimit-reset"]) - self.clock()) + 1
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+
+    def backoff(self, delay: float) -> None:
+        self._wait(delay)
+
+    def stats(self) -> dict[str, float | int | None]:
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "remaining_budget": self.remaining_budget,
+            "retries": self.retries,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
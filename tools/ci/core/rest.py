@@ -0,0 +1,213 @@
+"""Minimal pooled HTTP/1.1 JSON client (stdlib only).
+
+Keeps idle keep-alive connections in a pool so consecutive API calls reuse
+the same TCP/TLS session instead of paying a handshake each time. Safe to
+share between threads: each request checks a connection out of the pool.
+"""
+
+import http.client
+import json
+import queue
+import re
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlencode, urlsplit
+
+from .http_cache import ResponseCache
+from .ratelimit import RateLimiter
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT = 30
+# Methods that may be sent twice without repeating a side effect
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE"})
+
+_LINK_RE = re.compile(r'<([^>]+)>;\s*rel="([^"]+)"')
+
+
+@dataclass
+class HttpResponse:
+    """A fully-read HTTP response."""
+
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    url: str = ""
+    links: dict[str, str] = field(default_factory=dict)
+
+    def json(self) -> Any:
+        if not self.body:
+            return None
+        return json.loads(self.body)
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+class HttpError(RuntimeError):
+    """Non-2xx response."""
+
+    def __init__(self, method: str, url: str, response: HttpResponse):
+        self.response = response
+        try:
+            detail = (response.json() or {}).get("message", "")
+        except (ValueError, AttributeError):
+            detail = response.body[:200].decode(errors="replace")
+        super().__init__(f"{method} {url} failed: HTTP {response.status} {detail}")
+
+
+class HttpTransport:
+    """Pooled keep-alive HTTP client bound to one base URL."""
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict[str, str] | None = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        cache: ResponseCache | None = None,
+        limiter: RateLimiter | None = None,
+    ):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.netloc = parts.netloc
+        self.base_path = parts.path.rstrip("/")
+        self.base_url = base_url.rstrip("/")
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.cache = cache
+        self.limiter = limiter
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+        self.connections_opened = 0
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        self.connections_opened += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _checkout(self) -> http.client.HTTPConnection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._new_connection()
+
+    def _checkin(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self) -> None:
+        """Close all idle pooled connections."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _target(self, path: str, params: dict | None) -> str:
+        """Request target for ``path`` (absolute URLs from Link headers are allowed)."""
+        if path.startswith("http://") or path.startswith("https://"):
+            parts = urlsplit(path)
+            target = parts.path + (f"?{parts.query}" if parts.query else "")
+        else:
+            target = self.base_path + path
+        if params:
+            target += ("&" if "?" in target else "?") + urlencode(params)
+        return target
+
+    def _send(
+        self, method: str, target: str, payload: bytes | None, headers: dict[str, str]
+    ) -> tuple[int, dict[str, str], bytes]:
+        """Send one request on a pooled connection; return (status, headers, body)."""
+        # A pooled connection may have been closed by the server while idle;
+        # retry once on a fresh connection in that case. Once the request is
+        # written the server may have acted on it, so only idempotent
+        # methods are resent after that point.
+        for attempt in range(2):
+            conn = self._checkout() if attempt == 0 else self._new_connection()
+            sent = False
+            try:
+                conn.request(method, target, body=payload, headers=headers)
+                sent = True
+                raw = conn.getresponse()
+                data = raw.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if attempt == 1 or (sent and method.upper() not in IDEMPOTENT_METHODS):
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+
+            if raw.will_close:
+                conn.close()
+            else:
+                self._checkin(conn)
+            return raw.status, {k.lower(): v for k, v in raw.getheaders()}, data
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        params: dict | None = None,
+        headers: dict[str, str] | None = None,
+        raise_for_status: bool = True,
+    ) -> HttpResponse:
+        """Send a request with an optional JSON body and read the response.
+
+        GETs are revalidated against the response cache (if configured); a
+        304 is returned to the caller as the cached 200 response.
+        """
+        target = self._target(path, params)
+        payload = json.dumps(body).encode() if body is not None else None
+        req_headers = {**self.headers, **(headers or {})}
+        if payload is not None:
+            req_headers["Content-Type"] = "application/json"
+
+        cached = None
+        if self.cache and method == "GET":
+            cached = self.cache.lookup(target)
+            if cached:
+                req_headers.update(ResponseCache.conditional_headers(cached))
+
+        attempt = 0
+        while True:
+            if self.limiter:
+                self.limiter.before_request(method)
+            status, resp_headers, data = self._send(method, target, payload, req_headers)
+            if not self.limiter:
+                break
+            self.limiter.update(resp_headers)
+            delay = self.limiter.retry_delay(
+                status, resp_headers, attempt, data[:500].decode(errors="replace")
+            )
+            if delay is None:
+                break
+            self.limiter.backoff(delay)
+            attempt += 1
+
+        if self.cache and method == "GET":
+            if status == 304 and cached:
+                self.cache.record(hit=True)
+                status, data = 200, cached["body"].encode()
+                resp_headers = {**cached["headers"], **resp_headers}
+            elif status == 200:
+                self.cache.record(hit=False)
+                self.cache.store(target, resp_headers, data)
+
+        response = HttpResponse(
+            status=status,
+            headers=resp_headers,
+            body=data,
+            url=f"{self.scheme}://{self.netloc}{target}",
+            links={rel: url for url, rel in _LINK_RE.findall(resp_headers.get("link", ""))},
+        )
+        if raise_for_status and not (response.ok or response.status == 304):
+            raise HttpError(method, target, response)
+        return response
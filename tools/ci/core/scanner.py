@@ -0,0 +1,159 @@
+"""Concurrent drift scan engine.
+
+Layers are scanned independently (init + plan only, no state is written),
+so they can run side by side in a bounded worker pool. Results are returned
+in the same order as the input layers so callers can render stable tables.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable
+
+from ..config import Layer, env_int
+from .terraform import ExecutionResult, PlanResult, TerraformRunner
+
+DEFAULT_SCAN_WORKERS = 4
+
+# How a layer is checked for drift:
+#   full         - plan (refreshes every resource, also catches unapplied code)
+#   refresh-only - plan -refresh-only (out-of-band changes only, no config diff)
+#   targeted     - plan limited to resources changed by the last apply
+SCAN_MODES = ("full", "refresh-only", "targeted")
+
+
+class ScanStatus(Enum):
+    """Outcome of scanning a single layer."""
+
+    NO_DRIFT = "no_drift"
+    DRIFT = "drift"
+    INIT_FAILED = "init_failed"
+    ERROR = "error"
+
+
+@dataclass
+class LayerScan:
+    """Result of scanning a single layer."""
+
+    layer: Layer
+    status: ScanStatus
+    init_result: ExecutionResult | None = None
+    plan_result: ExecutionResult | None = None
+    duration: float = 0.0
+
+    @property
+    def failed(self) -> bool:
+        return self.status in (ScanStatus.INIT_FAILED, ScanStatus.ERROR)
+
+
+ProgressCallback = Callable[[Layer, str], None]
+
+_print_lock = threading.Lock()
+
+_STATUS_MESSAGES = {
+    ScanStatus.NO_DRIFT: "✅ No drift",
+    ScanStatus.DRIFT: "⚠️ Drift detected",
+    ScanStatus.INIT_FAILED: "❌ Init failed",
+    ScanStatus.ERROR: "❌ Error",
+}
+
+
+def print_progress(layer: Layer, message: str) -> None:
+    """Default progress sink: one line per event, prefixed with the layer."""
+    with _print_lock:
+        print(f"  [{layer.name}] {message}", flush=True)
+
+
+def _default_workers() -> int:
+    return max(1, env_int("CI_SCAN_WORKERS", DEFAULT_SCAN_WORKERS))
+
+
+def _plan(runner: TerraformRunner, mode: str, on_progress: ProgressCallback) -> ExecutionResult:
+    layer = runner.layer
+    if mode == "refresh-only":
+        on_progress(layer, "Refreshing (refresh-only plan)...")
+        return runner.refresh_only()
+    if mode == "targeted":
+        targets = runner.last_applied()
+        if targets:
+            on_progress(layer, f"Planning {len(targets)} targets from last apply...")
+            return runner.plan(detailed_exitcode=True, targets=targets, refresh=True)
+        on_progress(layer, "No recorded apply to target, planning in full...")
+    else:
+        on_progress(layer, "Planning...")
+    return runner.plan(detailed_exitcode=True, refresh=True)
+
+
+def scan_layer(
+    layer: Layer, on_progress: ProgressCallback = print_progress, mode: str = "full"
+) -> LayerScan:
+    """Run init + plan for one layer and classify the outcome (see SCAN_MODES)."""
+    if mode not in SCAN_MODES:
+        raise ValueError(f"Unknown scan mode: {mode}")
+    start = time.monotonic()
+    runner = TerraformRunner(layer)
+
+    on_progress(layer, "Initializing...")
+    init_result = runner.init()
+    if not init_result.success:
+        scan = LayerScan(layer, ScanStatus.INIT_FAILED, init_result=init_result)
+    else:
+        plan_result = _plan(runner, mode, on_progress)
+        if plan_result.plan_result == PlanResult.NO_CHANGES:
+            status = ScanStatus.NO_DRIFT
+        elif plan_result.plan_result == PlanResult.HAS_CHANGES:
+            status = ScanStatus.DRIFT
+        else:
+            status = ScanStatus.ERROR
+        scan = LayerScan(layer, status, init_result=init_result, plan_result=plan_result)
+
+    scan.duration = time.monotonic() - start
+    message = _STATUS_MESSAGES[scan.status]
+    report = scan.plan_result.report if scan.plan_result else None
+    if report and report.has_changes:
+        message += f" (+{report.add} ~{report.change} -{report.destroy})"
+    on_progress(layer, f"{message} ({scan.duration:.1f}s)")
+    return scan
+
+
+def scan_layers(
+    layers: list[Layer],
+    max_workers: int | None = None,
+    on_progress: ProgressCallback = print_progress,
+    mode: str = "full",
+    on_scan: Callable[[LayerScan], None] | None = None,
+) -> list[LayerScan]:
+    """Scan layers concurrently with at most ``max_workers`` in flight.
+
+    Args:
+        layers: Layers to scan.
+        max_workers: Pool size (default: ``CI_SCAN_WORKERS`` env or 4).
+        on_progress: Called with (layer, message) as each layer progresses.
+        mode: One of SCAN_MODES.
+        on_scan: Called with each LayerScan as soon as that layer finishes
+            (from a worker thread), e.g. to checkpoint it.
+
+    Returns:
+        One LayerScan per input layer, in input order.
+    """
+    if mode not in SCAN_MODES:
+        raise ValueError(f"Unknown scan mode: {mode}")
+    if not layers:
+        return []
+
+    workers = min(len(layers), max_workers or _default_workers())
+
+    def _scan(layer: Layer) -> LayerScan:
+        try:
+            scan = scan_layer(layer, on_progress, mode)
+        except Exception as e:
+            on_progress(layer, f"❌ Exception: {e}")
+            scan = LayerScan(layer, ScanStatus.ERROR)
+        if on_scan:
+            on_scan(scan)
+        return scan
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+        return list(pool.map(_scan, layers))
@@ -0,0 +1,83 @@
+"""Dependency-aware layer scheduler.
+
+Runs an action (usually apply) over layers wave by wave: every layer in a
+topological wave runs in parallel, and a layer is skipped when any of its
+(transitive) upstream layers failed.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Callable, Iterable
+
+from ..config import Layer, get_downstream, get_layer_waves
+from .scanner import ProgressCallback, print_progress
+
+
+class LayerOutcome(Enum):
+    """Outcome of running an action on one layer."""
+
+    SUCCESS = "success"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+
+def run_waves(
+    layers: list[Layer],
+    action: Callable[[Layer], bool],
+    max_workers: int | None = None,
+    repo_root: str | None = None,
+    failed: Iterable[str] = (),
+    on_progress: ProgressCallback = print_progress,
+) -> dict[str, LayerOutcome]:
+    """Run ``action`` over ``layers`` in dependency order.
+
+    Args:
+        layers: Layers to run (dependencies outside this set are ignored).
+        action: Returns True on success; exceptions count as failure.
+        max_workers: Max layers in flight per wave (default: wave size).
+        repo_root: If set, terragrunt-declared dependencies are honoured too.
+        failed: Layers that already failed earlier (e.g. during scan); their
+            downstream layers are skipped.
+        on_progress: Called with (layer, message) as layers progress.
+
+    Returns:
+        Outcome per layer name, in wave order.
+    """
+    outcomes: dict[str, LayerOutcome] = {}
+    # Layer name -> failed upstream layer that blocks it (transitively)
+    blocked: dict[str, str] = {}
+
+    def _block_downstream(name: str) -> None:
+        for downstream in get_downstream(name, repo_root):
+            blocked.setdefault(downstream, name)
+
+    for name in failed:
+        _block_downstream(name)
+
+    def _run(layer: Layer) -> LayerOutcome:
+        try:
+            ok = action(layer)
+        except Exception as e:
+            on_progress(layer, f"❌ Exception: {e}")
+            ok = False
+        return LayerOutcome.SUCCESS if ok else LayerOutcome.FAILED
+
+    for wave in get_layer_waves(layers, repo_root):
+        runnable = []
+        for layer in wave:
+            if layer.name in blocked:
+                on_progress(layer, f"⏭️ Skipped (upstream failed: {blocked[layer.name]})")
+                outcomes[layer.name] = LayerOutcome.SKIPPED
+            else:
+                runnable.append(layer)
+
+        if not runnable:
+            continue
+        workers = min(len(runnable), max_workers or len(runnable))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wave") as pool:
+            for layer, outcome in zip(runnable, pool.map(_run, runnable)):
+                outcomes[layer.name] = outcome
+                if outcome == LayerOutcome.FAILED:
+                    _block_downstream(layer.name)
+
+    return outcomes
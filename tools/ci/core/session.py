@@ -0,0 +1,196 @@
+"""Per-layer runner sessions shared by every TerraformRunner of a layer.
+
+A CI job runs many short terraform/terragrunt commands per layer (init,
+state pull, plan, show, apply) and each used to start cold: re-resolve the
+git root, rebuild the environment and let terragrunt re-parse every HCL
+file. A RunnerSession keeps that work for the life of the process:
+
+- the repo root and the base command environment (snapshotted once);
+- whether the layer's ``.terraform`` directory is initialized (set by init,
+  which itself is skipped while the init fingerprint is unchanged);
+- the rendered terragrunt config (``terragrunt render-json``).
+
+With the rendered config, commands after init run ``terraform`` directly
+in the layer directory: terragrunt only turns ``inputs`` into ``TF_VAR_*``
+and writes the ``generate`` files, which init has already done. Layers
+whose config needs terragrunt at run time (hooks, extra_arguments, a
+module ``source``) keep using terragrunt. Set ``CI_TERRAGRUNT_DIRECT=false``
+to always use terragrunt.
+
+The rendered config is cached for later commands of the same CI job only
+(see config.get_job_temp_dir), never in the persistent CI cache. Its key hashes the HCL files
+and the values of the env vars they read, so edits invalidate it.
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+from typing import Callable
+
+from ..config import Layer, get_job_temp_dir
+
+_GET_ENV_RE = re.compile(r'get_env\(\s*"([^"]+)"')
+# terraform block settings that only terragrunt can apply
+_RUNTIME_ONLY = ("source", "extra_arguments", "before_hook", "after_hook", "error_hook")
+
+_repo_roots: dict[tuple[str, str], str] = {}
+
+
+def find_repo_root() -> str:
+    """Repo root: GITHUB_WORKSPACE > git root > cwd (resolved once per cwd)."""
+    if os.environ.get("GITHUB_WORKSPACE"):
+        return os.environ["GITHUB_WORKSPACE"]
+    cwd = os.getcwd()
+    key = ("git", cwd)
+    if key not in _repo_roots:
+        try:
+            result = subprocess.run(
+                ["git", "rev-parse", "--show-toplevel"], capture_output=True, text=True
+            )
+            _repo_roots[key] = result.stdout.strip() if result.returncode == 0 else cwd
+        except Exception:
+            _repo_roots[key] = cwd
+    return _repo_roots[key]
+
+
+def _direct_enabled() -> bool:
+    return os.environ.get("CI_TERRAGRUNT_DIRECT", "true").lower() not in ("0", "false", "no")
+
+
+def tf_var_env(inputs: dict) -> dict[str, str]:
+    """``TF_VAR_*`` variables for terragrunt ``inputs`` (as terragrunt encodes them)."""
+    return {
+        f"TF_VAR_{name}": value if isinstance(value, str) else json.dumps(value)
+        for name, value in inputs.items()
+    }
+
+
+class RunnerSession:
+    """Cached per-layer execution state (see module docstring)."""
+
+    def __init__(self, layer: Layer, repo_root: str, env: dict[str, str]):
+        self.layer = layer
+        self.repo_root = repo_root
+        self.work_dir = os.path.join(repo_root, layer.path)
+        # Base environment for every command (do not mutate)
+        self.env = env
+        self.initialized = False
+        self._direct_env: dict[str, str] | None = None
+        self._direct_key: str | None = None
+        self._lock = threading.Lock()
+
+    def _config_files(self) -> list[str]:
+        """HCL files terragrunt reads for this layer (layer dir and parents up to the root)."""
+        files = []
+        directory = os.path.abspath(self.work_dir)
+        root = os.path.abspath(self.repo_root)
+        while True:
+            try:
+                names = sorted(os.listdir(directory))
+            except OSError:
+                names = []
+            files += [os.path.join(directory, n) for n in names if n.endswith(".hcl")]
+            if directory == root or os.path.dirname(directory) == directory:
+                return files
+            directory = os.path.dirname(directory)
+
+    def config_key(self) -> str:
+        """Hash of the HCL files and the env var values they read."""
+        digest = hashlib.sha256(self.layer.name.encode())
+        env_names: set[str] = set()
+        for path in self._config_files():
+            with open(path, "rb") as f:
+                data = f.read()
+            # Relative, so the key is the same for every checkout location
+            digest.update(f"\0{os.path.relpath(path, self.repo_root)}\0".encode())
+            digest.update(data)
+            env_names.update(_GET_ENV_RE.findall(data.decode(errors="replace")))
+        for name in sorted(env_names):
+            digest.update(f"\0env:{name}=".encode())
+            digest.update(hashlib.sha256(self.env.get(name, "").encode()).digest())
+        return digest.hexdigest()
+
+    def _render(self, key: str) -> dict | None:
+        """Rendered terragrunt config, from the job cache or ``terragrunt render-json``."""
+        path = os.path.join(get_job_temp_dir("sessions"), f"{self.layer.name}-{key[:24]}.json")
+        if not os.path.exists(path):
+            tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            try:
+                result = subprocess.run(
+                    ["terragrunt", "render-json", "--terragrunt-json-out", tmp],
+                    cwd=self.work_dir,
+                    env=self.env,
+                    capture_output=True,
+                    text=True,
+                )
+                ok = result.returncode == 0 and os.path.exists(tmp)
+            except OSError:
+                ok = False
+            if not ok:
+                print(f"  ⚠️ [{self.layer.name}] terragrunt render-json failed, using terragrunt for every command")
+                return None
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, path)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _runnable_directly(self, config: dict) -> bool:
+        terraform = config.get("terraform") or {}
+        if any(terraform.get(setting) for setting in _RUNTIME_ONLY):
+            return False
+        # generate blocks must already have been written (by init)
+        generated = (config.get("generate") or {}).values()
+        return all(os.path.exists(os.path.join(self.work_dir, g.get("path", ""))) for g in generated)
+
+    def direct_env(self) -> dict[str, str] | None:
+        """Environment to run ``terraform`` directly, or None to go through terragrunt."""
+        if self.layer.engine != "terragrunt" or not self.initialized or not _direct_enabled():
+            return None
+        with self._lock:
+            try:
+                key = self.config_key()
+            except OSError:
+                return None
+            if key != self._direct_key:
+                config = self._render(key)
+                self._direct_key = key
+                self._direct_env = None
+                if config is not None and self._runnable_directly(config):
+                    env = dict(self.env)
+                    # terragrunt never overrides TF_VAR_* already set by the caller
+                    for name, value in tf_var_env(config.get("inputs") or {}).items():
+                        env.setdefault(name, value)
+                    self._direct_env = env
+            return self._direct_env
+
+
+_sessions: dict[tuple[str, str], RunnerSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(
+    layer: Layer, repo_root: str, make_env: Callable[[], dict[str, str]]
+) -> RunnerSession:
+    """The process-wide session for ``layer`` in ``repo_root``.
+
+    ``make_env`` builds the base environment when the session is created.
+    """
+    key = (layer.name, os.path.abspath(repo_root))
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None or session.layer != layer:
+            session = _sessions[key] = RunnerSession(layer, repo_root, make_env())
+        return session
+
+
+def reset_sessions() -> None:
+    """Drop all sessions (e.g. after changing the environment)."""
+    with _sessions_lock:
+        _sessions.clear()
+    _repo_roots.clear()
@@ -0,0 +1,136 @@
+"""Last-verified snapshots for fast drift pre-checks.
+
+After a layer verifies clean, its state identity (serial + lineage) and a
+fingerprint of its inputs (code tree, lockfile, tfvars, backend, and the
+env vars terragrunt reads with ``get_env()``) are recorded. The next verify reads just the state header (see state_reader)
+and skips the full plan when both are unchanged.
+
+A matching snapshot cannot see changes made outside terraform (console
+edits, operators): those never bump the serial. Snapshots therefore expire
+after ``CI_VERIFY_MAX_AGE`` seconds (default 12h), so repeated post-merge
+verifies skip untouched layers while a nightly scan still refreshes
+everything.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from ..config import Layer, env_float, get_cache_dir, write_json
+from .fingerprint import plan_fingerprint
+from .state_reader import StateHeader, StateReader
+from .terraform import TerraformRunner
+
+DEFAULT_MAX_AGE = 12 * 3600
+
+
+@dataclass
+class Snapshot:
+    """A layer's state and inputs at its last clean verify."""
+
+    serial: int
+    lineage: str
+    inputs: str
+    verified_at: float
+
+
+class SnapshotStore:
+    """JSON file of ``layer name -> Snapshot``."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, path: str | None = None, max_age: float | None = None):
+        self.path = path or os.path.join(get_cache_dir("verify"), "snapshots.json")
+        self.max_age = env_float("CI_VERIFY_MAX_AGE", DEFAULT_MAX_AGE) if max_age is None else max_age
+
+    def _load(self) -> dict[str, dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, layer_name: str) -> Snapshot | None:
+        data = self._load().get(layer_name)
+        return Snapshot(**data) if data else None
+
+    def put(self, layer_name: str, snapshot: Snapshot) -> None:
+        with self._lock:
+            data = self._load()
+            data[layer_name] = asdict(snapshot)
+            write_json(self.path, data, indent=2)
+
+    def drop(self, layer_name: str) -> None:
+        with self._lock:
+            data = self._load()
+            if data.pop(layer_name, None) is not None:
+                write_json(self.path, data, indent=2)
+
+
+@dataclass
+class PreCheck:
+    """Pre-check outcome for one layer."""
+
+    layer: Layer
+    # Current state identity and inputs (None if the state could not be read)
+    header: StateHeader | None
+    inputs: str | None
+    # Why a full plan is still needed ("" when it can be skipped)
+    reason: str
+
+    @property
+    def unchanged(self) -> bool:
+        return not self.reason
+
+    def snapshot(self) -> Snapshot | None:
+        """Snapshot to record if the full plan for this layer comes back clean."""
+        if self.header is None or self.inputs is None:
+            return None
+        return Snapshot(self.header.serial, self.header.lineage, self.inputs, time.time())
+
+
+def read_state_header(layer: Layer, runner: TerraformRunner, reader: StateReader) -> StateHeader | None:
+    """State header via a ranged backend read, else ``state pull`` (needs init)."""
+    if layer.state_key and reader.available:
+        header = reader.read_header(layer.state_key)
+        if header is not None:
+            return header
+    if not runner.init().success:
+        return None
+    state = runner.state_pull()
+    if state is None:
+        return None
+    return StateHeader(state.get("serial") or 0, state.get("lineage") or "")
+
+
+def precheck_layer(
+    layer: Layer,
+    store: SnapshotStore,
+    reader: StateReader | None = None,
+    runner: TerraformRunner | None = None,
+) -> PreCheck:
+    """Compare a layer's current state and inputs with its last clean verify."""
+    runner = runner or TerraformRunner(layer)
+    header = read_state_header(layer, runner, reader or StateReader())
+    if header is None:
+        return PreCheck(layer, None, None, "state unreadable")
+    # State is compared separately, so fingerprint the inputs alone
+    # (the session config key covers get_env()-driven inputs such as BASE_DOMAIN)
+    inputs = plan_fingerprint(
+        layer, runner.work_dir, runner.repo_root, 0, "", runner.session.config_key(), extra="verify"
+    )
+
+    snapshot = store.get(layer.name)
+    if snapshot is None:
+        reason = "no previous clean verify"
+    elif time.time() - snapshot.verified_at > store.max_age:
+        reason = "last clean verify too old"
+    elif (snapshot.serial, snapshot.lineage) != (header.serial, header.lineage):
+        reason = f"state changed (serial {snapshot.serial} → {header.serial})"
+    elif snapshot.inputs != inputs:
+        reason = "code changed"
+    else:
+        reason = ""
+    return PreCheck(layer, header, inputs, reason)
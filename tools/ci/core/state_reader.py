@@ -0,0 +1,138 @@
+"""Read terraform state headers straight from the S3-compatible backend.
+
+All layers keep state in Cloudflare R2 (see the root terragrunt.hcl). A
+drift pre-check only needs ``serial`` and ``lineage``, which terraform
+writes at the top of the state file, so this fetches the first few KB of
+the object with a SigV4-signed ranged GET: no init, no provider download,
+no full state transfer.
+
+Credentials and location come from the same env vars as the backend:
+``R2_BUCKET``, ``R2_ACCOUNT_ID``, ``AWS_ACCESS_KEY_ID``,
+``AWS_SECRET_ACCESS_KEY`` (``CI_STATE_ENDPOINT`` overrides the endpoint).
+"""
+
+import datetime
+import hashlib
+import hmac
+import os
+import re
+from dataclasses import dataclass
+from urllib.parse import quote, urlsplit
+
+from .rest import HttpTransport
+
+HEADER_BYTES = 4096
+REGION = "auto"
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+_SERIAL_RE = re.compile(rb'"serial"\s*:\s*(\d+)')
+_LINEAGE_RE = re.compile(rb'"lineage"\s*:\s*"([^"]*)"')
+
+
+@dataclass(frozen=True)
+class StateHeader:
+    """Identity of one state version."""
+
+    serial: int
+    lineage: str
+
+
+def sign_v4(
+    method: str,
+    url: str,
+    headers: dict[str, str],
+    access_key: str,
+    secret_key: str,
+    region: str = REGION,
+    service: str = "s3",
+    now: datetime.datetime | None = None,
+) -> dict[str, str]:
+    """Return ``headers`` plus AWS Signature V4 auth headers for an unsigned-body request."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    date = amz_date[:8]
+    parts = urlsplit(url)
+
+    signed = {k.lower(): v.strip() for k, v in headers.items()}
+    signed["host"] = parts.netloc
+    signed["x-amz-date"] = amz_date
+    signed.setdefault("x-amz-content-sha256", EMPTY_SHA256)
+    names = sorted(signed)
+
+    canonical_request = "\n".join([
+        method,
+        quote(parts.path or "/", safe="/~"),
+        "&".join(sorted(parts.query.split("&"))) if parts.query else "",
+        "".join(f"{name}:{signed[name]}\n" for name in names),
+        ";".join(names),
+        signed["x-amz-content-sha256"],
+    ])
+    scope = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+
+    key = f"AWS4{secret_key}".encode()
+    for part in (date, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    signed["authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={';'.join(names)}, Signature={signature}"
+    )
+    del signed["host"]  # set by the HTTP client
+    return signed
+
+
+class StateReader:
+    """Ranged reads of state objects from the R2 state bucket."""
+
+    def __init__(self):
+        account = os.environ.get("R2_ACCOUNT_ID", "")
+        self.bucket = os.environ.get("R2_BUCKET", "")
+        self.endpoint = os.environ.get("CI_STATE_ENDPOINT") or (
+            f"https://{account}.r2.cloudflarestorage.com" if account else ""
+        )
+        self.access_key = os.environ.get("AWS_ACCESS_KEY_ID", "")
+        self.secret_key = os.environ.get("AWS_SECRET_ACCESS_KEY", "")
+        self._http: HttpTransport | None = None
+
+    @property
+    def available(self) -> bool:
+        return all((self.bucket, self.endpoint, self.access_key, self.secret_key))
+
+    def read_header(self, state_key: str) -> StateHeader | None:
+        """Serial and lineage of the state at ``state_key``.
+
+        Returns ``StateHeader(0, "")`` if the object does not exist yet, and
+        None if it cannot be read (no credentials, network/auth error).
+        """
+        if not self.available:
+            return None
+        if self._http is None:
+            self._http = HttpTransport(self.endpoint, pool_size=4)
+        path = f"/{self.bucket}/{state_key}"
+        headers = sign_v4(
+            "GET",
+            f"{self.endpoint.rstrip('/')}{path}",
+            {"range": f"bytes=0-{HEADER_BYTES - 1}"},
+            self.access_key,
+            self.secret_key,
+        )
+        try:
+            response = self._http.request("GET", path, headers=headers, raise_for_status=False)
+        except OSError:
+            return None
+        if response.status == 404:
+            return StateHeader(0, "")
+        if response.status not in (200, 206):
+            return None
+        serial = _SERIAL_RE.search(response.body)
+        lineage = _LINEAGE_RE.search(response.body)
+        if not (serial and lineage):
+            return None
+        return StateHeader(int(serial.group(1)), lineage.group(1).decode())
@@ -1,12 +1,37 @@
 """Terraform/Terragrunt execution wrapper."""
 
+import fcntl
+import json
 import os
 import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass
 from enum import Enum
-from typing import Literal
+from functools import cached_property
+from typing import IO, Callable, Iterator, Literal
 
-from ..config import Layer
+from ..config import Layer, env_int, get_cache_dir, get_job_temp_dir, write_json
+from ..plan_report import ApplySummarizer, PlanReport, PlanSummarizer
+from .fingerprint import (
+    init_fingerprint,
+    plan_fingerprint,
+    read_init_fingerprint,
+    write_init_fingerprint,
+)
+from .history import DriftHistory
+from .metrics import ProcessMetrics, ProcessMonitor, get_recorder, phase_name
+from .session import find_repo_root, get_session
+from .state_reader import StateHeader, StateReader
+from .tuning import resolve_parallelism
+
+# Lines of stdout/stderr kept in memory per stream when streaming
+DEFAULT_TAIL_LINES = 200
+
+# Binary plan file written by plan() (relative to the layer's job plan dir)
+PLAN_FILE = "tfplan"
 
 
 class PlanResult(Enum):
@@ -17,6 +42,39 @@ class PlanResult(Enum):
     HAS_CHANGES = 2
 
 
+class LogHandle:
+    """Lazily-read handle on the full output of a streamed command.
+
+    The complete interleaved stdout/stderr lives in a spool file on disk;
+    nothing is loaded into memory until read() or iter_lines() is called.
+    Callers call cleanup() once they are done with the log.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def iter_lines(self) -> Iterator[str]:
+        """Yield the log line by line (including newlines)."""
+        with open(self.path, encoding="utf-8", errors="replace") as f:
+            yield from f
+
+    def read(self) -> str:
+        """Read the whole log into memory."""
+        with open(self.path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def size(self) -> int:
+        """Size of the spooled log in bytes."""
+        return os.path.getsize(self.path)
+
+    def cleanup(self) -> None:
+        """Delete the spool file."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
 @dataclass
 class ExecutionResult:
     """Result of terraform/terragrunt execution."""
@@ -26,83 +84,127 @@ class ExecutionResult:
     stdout: str
     stderr: str
     plan_result: PlanResult | None = None
+    log: LogHandle | None = None
+    cached: bool = False
+    plan_file: str | None = None
+    report: PlanReport | None = None
+    # Wall-clock seconds the command ran (0 for cached results)
+    duration: float = 0.0
+    # CPU / peak RSS / output size of the command (None if it never started)
+    metrics: ProcessMetrics | None = None
+
+
+# Terraform's plugin cache is not safe for concurrent init; serialize inits
+# across threads (and processes, via a lock file in the cache dir).
+_init_lock = threading.Lock()
+
+
+def plugin_cache_dir() -> str:
+    """Shared provider plugin cache (``TF_PLUGIN_CACHE_DIR`` or CI cache)."""
+    path = os.environ.get("TF_PLUGIN_CACHE_DIR") or get_cache_dir("plugins")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
 
 
 class TerraformRunner:
     """Wrapper for terraform/terragrunt commands."""
 
-    def __init__(self, layer: Layer, repo_root: str | None = None):
+    def __init__(
+        self,
+        layer: Layer,
+        repo_root: str | None = None,
+        stream: bool | None = None,
+    ):
         self.layer = layer
+        # Stream output live (tee to console + spool file) instead of capturing
+        self.stream = _env_flag("CI_STREAM_OUTPUT") if stream is None else stream
+        self.tail_lines = env_int("CI_LOG_TAIL_LINES", DEFAULT_TAIL_LINES)
         # Determine repo root: GITHUB_WORKSPACE > git root > cwd
-        if repo_root:
-            self.repo_root = repo_root
-        elif os.environ.get("GITHUB_WORKSPACE"):
-            self.repo_root = os.environ["GITHUB_WORKSPACE"]
-        else:
-            # Try to find git root
-            try:
-                import subprocess
-                result = subprocess.run(
-                    ["git", "rev-parse", "--show-toplevel"],
-                    capture_output=True, text=True
-                )
-                self.repo_root = result.stdout.strip() if result.returncode == 0 else os.getcwd()
-            except Exception:
-                self.repo_root = os.getcwd()
+        self.repo_root = repo_root or find_repo_root()
         self.work_dir = os.path.join(self.repo_root, layer.path)
+        # Shared with every other runner of this layer in the process
+        self.session = get_session(layer, self.repo_root, self._base_env)
 
     def _run(
         self,
         cmd: list[str],
         capture: bool = True,
         detailed_exitcode: bool = False,
+        stream: bool | None = None,
+        on_line: Callable[[str], None] | None = None,
     ) -> ExecutionResult:
-        """Run a command and return result."""
-        env = os.environ.copy()
-        env["TF_IN_AUTOMATION"] = "true"
-        env["TF_INPUT"] = "false"
-        # Terragrunt non-interactive mode via env var (not CLI flag)
-        env["TERRAGRUNT_NON_INTERACTIVE"] = "true"
+        """Run a command and return result.
+
+        In capture mode stdout/stderr are returned in full. In streaming mode
+        each line is echoed live (prefixed with the layer name) and appended
+        to a spool file exposed as ``ExecutionResult.log``; ``stdout`` and
+        ``stderr`` then only hold the last ``tail_lines`` lines of each.
+
+        ``on_line`` is called with every stdout line (live when streaming).
+
+        Resource usage is attached as ``ExecutionResult.metrics`` and
+        exported via metrics.get_recorder().
+        """
+        stream = self.stream if stream is None else stream
+        env = self.session.env
+        if cmd[0] == "terragrunt" and cmd[1:2] != ["init"]:
+            # Initialized layer with a rendered config: skip terragrunt's HCL parse
+            direct_env = self.session.direct_env()
+            if direct_env is not None:
+                cmd, env = ["terraform", *cmd[1:]], direct_env
 
         # Print command being run
-        print(f"  🔧 Running: {' '.join(cmd)}")
+        print(f"  🔧 [{self.layer.name}] Running: {' '.join(cmd)}")
 
+        log = None
+        start = time.monotonic()
+        started_at = time.time()
         try:
-            result = subprocess.run(
-                cmd,
-                cwd=self.work_dir,
-                capture_output=capture,
-                text=True,
-                env=env,
-            )
+            if stream:
+                log, stdout, stderr, returncode, metrics = self._exec_streaming(cmd, env, on_line)
+            else:
+                stdout, stderr, returncode, metrics = self._exec_captured(cmd, env, capture)
+                if on_line:
+                    for line in stdout.splitlines(keepends=True):
+                        on_line(line)
+            get_recorder().record(self.layer.name, cmd, returncode, metrics, started_at)
 
             plan_result = None
             if detailed_exitcode:
-                if result.returncode == 0:
+                if returncode == 0:
                     plan_result = PlanResult.NO_CHANGES
-                elif result.returncode == 2:
+                elif returncode == 2:
                     plan_result = PlanResult.HAS_CHANGES
                 else:
                     plan_result = PlanResult.ERROR
 
-            success = result.returncode == 0 or (
-                detailed_exitcode and result.returncode == 2
-            )
+            success = returncode == 0 or (detailed_exitcode and returncode == 2)
 
             # On error (not exit code 2 for plan changes), print full output
-            if result.returncode != 0 and result.returncode != 2:
-                print(f"\n❌ Command failed with exit code {result.returncode}")
-                if result.stdout:
-                    print(f"\n=== STDOUT ===\n{result.stdout}")
-                if result.stderr:
-                    print(f"\n=== STDERR ===\n{result.stderr}")
+            if returncode != 0 and returncode != 2:
+                print(f"\n❌ Command failed with exit code {returncode}")
+                if log:
+                    # Output was already streamed live
+                    print(f"  Full log: {log.path}")
+                else:
+                    if stdout:
+                        print(f"\n=== STDOUT ===\n{stdout}")
+                    if stderr:
+                        print(f"\n=== STDERR ===\n{stderr}")
 
             return ExecutionResult(
                 success=success,
-                exit_code=result.returncode,
-                stdout=result.stdout or "",
-                stderr=result.stderr or "",
+                exit_code=returncode,
+                stdout=stdout,
+                stderr=stderr,
                 plan_result=plan_result,
+                log=log,
+                duration=metrics.wall_seconds,
+                metrics=metrics,
             )
         except Exception as e:
             print(f"\n❌ Exception running command: {e}")
@@ -112,30 +214,385 @@ class TerraformRunner:
                 stdout="",
                 stderr=str(e),
                 plan_result=PlanResult.ERROR,
+                log=log,
+                duration=time.monotonic() - start,
             )
 
+    def _exec_captured(
+        self, cmd: list[str], env: dict[str, str], capture: bool = True
+    ) -> tuple[str, str, int, ProcessMetrics]:
+        """Run cmd and return its full stdout/stderr."""
+        pipe = subprocess.PIPE if capture else None
+        proc = subprocess.Popen(cmd, cwd=self.work_dir, stdout=pipe, stderr=pipe, text=True, env=env)
+        monitor = ProcessMonitor(proc)
+        # Not communicate(): it reaps the child, and the monitor needs wait4
+        stderr_chunks: list[str] = []
+        reader = None
+        if proc.stderr:
+            reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+            reader.start()
+        stdout = proc.stdout.read() if proc.stdout else ""
+        if reader:
+            reader.join()
+        for stream in (proc.stdout, proc.stderr):
+            if stream:
+                stream.close()
+        stderr = "".join(stderr_chunks)
+        returncode, metrics = monitor.wait()
+        metrics.stdout_bytes = len(stdout.encode())
+        metrics.stderr_bytes = len(stderr.encode())
+        return stdout, stderr, returncode, metrics
+
+    def _exec_streaming(
+        self,
+        cmd: list[str],
+        env: dict[str, str],
+        on_line: Callable[[str], None] | None = None,
+    ) -> tuple[LogHandle, str, str, int, ProcessMetrics]:
+        """Run cmd, teeing each line to the console, a spool file and ring buffers."""
+        spool = tempfile.NamedTemporaryFile(
+            mode="w",
+            encoding="utf-8",
+            prefix=f"ci-{self.layer.name}-{cmd[1] if len(cmd) > 1 else 'cmd'}-",
+            suffix=".log",
+            # Full, unredacted output: job-scoped unless CI_LOG_DIR says otherwise
+            dir=os.environ.get("CI_LOG_DIR") or get_job_temp_dir("logs"),
+            delete=False,
+        )
+        log = LogHandle(spool.name)
+        tails = {"stdout": deque(maxlen=self.tail_lines), "stderr": deque(maxlen=self.tail_lines)}
+        sizes = {"stdout": 0, "stderr": 0}
+        lock = threading.Lock()
+        prefix = f"  [{self.layer.name}] "
+
+        def pump(pipe: IO[str], name: str) -> None:
+            for line in pipe:
+                with lock:
+                    spool.write(line)
+                    tails[name].append(line)
+                    sizes[name] += len(line.encode())
+                    print(prefix + line, end="" if line.endswith("\n") else "\n", flush=True)
+                if on_line and name == "stdout":
+                    on_line(line)
+            pipe.close()
+
+        with spool:
+            proc = subprocess.Popen(
+                cmd,
+                cwd=self.work_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                errors="replace",
+                bufsize=1,
+                env=env,
+            )
+            readers = [
+                threading.Thread(target=pump, args=(proc.stdout, "stdout"), daemon=True),
+                threading.Thread(target=pump, args=(proc.stderr, "stderr"), daemon=True),
+            ]
+            monitor = ProcessMonitor(proc)
+            for reader in readers:
+                reader.start()
+            for reader in readers:
+                reader.join()
+            returncode, metrics = monitor.wait()
+
+        metrics.stdout_bytes, metrics.stderr_bytes = sizes["stdout"], sizes["stderr"]
+        return log, "".join(tails["stdout"]), "".join(tails["stderr"]), returncode, metrics
+
+    def _base_env(self) -> dict[str, str]:
+        """Environment for every command of this layer (built once per session)."""
+        env = os.environ.copy()
+        env["TF_IN_AUTOMATION"] = "true"
+        env["TF_INPUT"] = "false"
+        # Terragrunt non-interactive mode via env var (not CLI flag)
+        env["TERRAGRUNT_NON_INTERACTIVE"] = "true"
+        # Share downloaded providers across layers and runs
+        env["TF_PLUGIN_CACHE_DIR"] = plugin_cache_dir()
+        env.update(self.layer.profile.env)
+        return env
+
     def _get_base_cmd(self) -> str:
         """Get base command (terraform or terragrunt)."""
         return self.layer.engine
 
-    def init(self) -> ExecutionResult:
-        """Run init."""
+    def init(self, force: bool = False) -> ExecutionResult:
+        """Run init, skipping it when the init fingerprint is unchanged.
+
+        Args:
+            force: Always run init, ignoring the recorded fingerprint.
+        """
+        fingerprint = init_fingerprint(self.layer, self.work_dir, self.repo_root)
+        if not force and read_init_fingerprint(self.work_dir) == fingerprint:
+            print(f"  ⏭️ [{self.layer.name}] Init skipped (fingerprint unchanged)")
+            self.session.initialized = True
+            return ExecutionResult(
+                success=True, exit_code=0, stdout="", stderr="", cached=True
+            )
+
         cmd = [self._get_base_cmd(), "init", "-no-color"]
-        return self._run(cmd)
+        lock_path = os.path.join(plugin_cache_dir(), ".init.lock")
+        with _init_lock, open(lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            result = self._run(cmd)
+
+        if result.success:
+            write_init_fingerprint(self.work_dir, fingerprint)
+            self.session.initialized = True
+        return result
+
+    @cached_property
+    def parallelism(self) -> int | None:
+        """``-parallelism`` from the layer profile (None = terraform default)."""
+        # Resolved once per runner: "auto" reads the timing history
+        return resolve_parallelism(self.layer)
 
-    def plan(self, detailed_exitcode: bool = True) -> ExecutionResult:
-        """Run plan with optional detailed exit code."""
+    def _execution_args(self) -> list[str]:
+        """Profile flags that change how, not what, terraform plans/applies."""
+        args = []
+        if self.parallelism:
+            args.append(f"-parallelism={self.parallelism}")
+        if self.layer.profile.lock_timeout:
+            args.append(f"-lock-timeout={self.layer.profile.lock_timeout}")
+        return args
+
+    def _record_timing(self, cmd: list[str], result: ExecutionResult, summarizer: PlanSummarizer) -> None:
+        """Feed an auto-tuned layer's plan timing to the parallelism tuner."""
+        if self.layer.profile.parallelism != "auto" or not result.success:
+            return
+        if not (result.metrics and summarizer.refreshed and self.parallelism):
+            return
+        phase = phase_name(cmd)
+        if any(arg.startswith("-target=") for arg in cmd):
+            phase += "-targeted"
+        try:
+            with DriftHistory() as history:
+                history.record_timing(
+                    self.layer.name,
+                    phase,
+                    self.parallelism,
+                    summarizer.refreshed,
+                    result.metrics.wall_seconds,
+                    result.metrics.cpu_seconds,
+                )
+        except Exception as e:
+            print(f"  ⚠️ [{self.layer.name}] Failed to record plan timing: {e}")
+
+    def plan(
+        self,
+        detailed_exitcode: bool = True,
+        out: str | None = PLAN_FILE,
+        use_cache: bool = False,
+        targets: list[str] | None = None,
+        refresh: bool | None = None,
+        show: bool = False,
+    ) -> ExecutionResult:
+        """Run plan with optional detailed exit code.
+
+        When ``out`` is set the binary plan is saved there; relative names
+        resolve in the layer's job plan dir (see ``plan_path``), never in the
+        checked-out layer directory. The report comes from a single-pass
+        summary of the plan output stream; with ``show`` (callers that render
+        every change) it is loaded from ``show -json`` instead, falling back
+        to the summary if that fails.
+
+        With ``use_cache`` the result is looked up in the PlanCache first and
+        stored there afterwards. Not for drift scans: out-of-band changes
+        don't bump the state serial the cache is keyed on.
+
+        ``targets`` limits the plan (and its refresh) to those resource
+        addresses and their dependencies.
+
+        ``refresh`` overrides the layer profile's refresh policy; drift scans
+        pass True.
+        """
         cmd = [self._get_base_cmd(), "plan", "-no-color"]
         if detailed_exitcode:
             cmd.append("-detailed-exitcode")
-        return self._run(cmd, detailed_exitcode=detailed_exitcode)
+        cmd.extend(f"-target={address}" for address in targets or ())
+        if not (self.layer.profile.refresh if refresh is None else refresh):
+            cmd.append("-refresh=false")
+        # Parallelism / lock timeout / plan path don't change the plan: keep them out of the key
+        variant = " ".join(
+            cmd[1:]
+            + ([f"-out={out}"] if out else [])
+            + (["show"] if show else [])
+            + sorted(f"{k}={v}" for k, v in self.layer.profile.env.items())
+        )
+        plan_file = self.plan_path(out) if out else None
+        if plan_file:
+            cmd.append(f"-out={plan_file}")
+        cmd.extend(self._execution_args())
+
+        cache, cache_key = None, None
+        if use_cache:
+            from .plan_cache import PlanCache
+
+            cache_key = self._plan_cache_key(variant)
+            if cache_key:
+                cache = PlanCache(self.layer.name)
+                cached = cache.get(cache_key, plan_file)
+                if cached:
+                    print(f"  ⏭️ [{self.layer.name}] Plan served from cache ({cache_key[:12]})")
+                    return cached
+
+        summarizer = PlanSummarizer()
+        result = self._run(cmd, detailed_exitcode=detailed_exitcode, on_line=summarizer.feed)
+        self._record_timing(cmd, result, summarizer)
+
+        if plan_file and result.success:
+            result.plan_file = plan_file
+            if show:
+                result.report = self.show_json(plan_file)
+        if result.success and result.report is None:
+            result.report = summarizer.report()
+        if cache:
+            cache.put(cache_key, result)
+        return result
+
+    def refresh_only(
+        self, detailed_exitcode: bool = True, out: str | None = PLAN_FILE, show: bool = False
+    ) -> ExecutionResult:
+        """Run a refresh-only plan: detect changes made outside terraform.
+
+        Only reads remote objects and compares them with state (no config
+        diff, nothing written). Exit code 2 / HAS_CHANGES means drift; the
+        report lists the drifted resources. ``out`` and ``show`` are as for
+        plan().
+        """
+        cmd = [self._get_base_cmd(), "plan", "-refresh-only", "-no-color"]
+        if detailed_exitcode:
+            cmd.append("-detailed-exitcode")
+        plan_file = self.plan_path(out) if out else None
+        if plan_file:
+            cmd.append(f"-out={plan_file}")
+        cmd.extend(self._execution_args())
+
+        summarizer = PlanSummarizer(drift=True)
+        result = self._run(cmd, detailed_exitcode=detailed_exitcode, on_line=summarizer.feed)
+        self._record_timing(cmd, result, summarizer)
+        if plan_file and result.success:
+            result.plan_file = plan_file
+            if show:
+                result.report = self.show_json(plan_file, drift=True)
+        if result.success and result.report is None:
+            result.report = summarizer.report()
+        return result
+
+    def plan_path(self, out: str) -> str:
+        """Where a saved plan named ``out`` is written.
 
-    def apply(self, auto_approve: bool = True) -> ExecutionResult:
-        """Run apply."""
+        Plans embed variable values and state in plaintext, so relative names
+        go to the layer's job-scoped dir (``config.get_job_temp_dir``) rather
+        than the checkout, where they would outlive the job.
+        """
+        if os.path.isabs(out):
+            return out
+        return os.path.join(get_job_temp_dir("plans", self.layer.name), out)
+
+    def _plan_cache_key(self, variant: str) -> str | None:
+        """Plan fingerprint including the remote state serial (None if unknown)."""
+        header = self.state_header()
+        if header is None:
+            return None
+        try:
+            config_key = self.session.config_key()
+        except OSError:
+            return None
+        return plan_fingerprint(
+            self.layer,
+            self.work_dir,
+            self.repo_root,
+            state_serial=header.serial,
+            state_lineage=header.lineage,
+            config_key=config_key,
+            extra=variant,
+        )
+
+    def state_header(self, reader: StateReader | None = None) -> StateHeader | None:
+        """State serial and lineage: ranged backend read, else ``state pull``."""
+        if self.layer.state_key:
+            reader = reader or StateReader()
+            if reader.available:
+                header = reader.read_header(self.layer.state_key)
+                if header is not None:
+                    return header
+        state = self.state_pull()
+        if state is None:
+            return None
+        return StateHeader(state.get("serial") or 0, state.get("lineage") or "")
+
+    def state_pull(self) -> dict | None:
+        """Pull remote state and return its header (serial, lineage, version).
+
+        Resources are dropped so large states are not kept in memory.
+        """
+        cmd = [self._get_base_cmd(), "state", "pull"]
+        result = self._run(cmd, stream=False)
+        if not result.success:
+            return None
+        if not result.stdout.strip():
+            # No state yet (first deployment)
+            return {"serial": 0, "lineage": ""}
+        try:
+            state = json.loads(result.stdout)
+        except json.JSONDecodeError:
+            return None
+        return {k: state.get(k) for k in ("version", "serial", "lineage", "terraform_version")}
+
+    def show_json(self, plan_file: str, drift: bool = False) -> PlanReport | None:
+        """Load a saved plan as a PlanReport via ``show -json``."""
+        cmd = [self._get_base_cmd(), "show", "-json", "-no-color", plan_file]
+        result = self._run(cmd, stream=False)
+        if not result.success:
+            return None
+        try:
+            return PlanReport.from_json(result.stdout, drift=drift)
+        except (ValueError, KeyError) as e:
+            print(f"  ⚠️ [{self.layer.name}] Could not parse plan JSON: {e}")
+            return None
+
+    def apply(
+        self, auto_approve: bool = True, plan_file: str | None = None, refresh: bool | None = None
+    ) -> ExecutionResult:
+        """Run apply, or apply a saved plan when ``plan_file`` is given.
+
+        A saved plan is applied exactly as planned (no re-plan, no approval
+        prompt); terraform refuses it if the state changed since. Otherwise
+        ``refresh`` overrides the layer profile's refresh policy.
+
+        Addresses of the resources it created or updated are recorded (see
+        last_applied()) so later drift checks can target them.
+        """
         cmd = [self._get_base_cmd(), "apply", "-no-color"]
-        if auto_approve:
-            cmd.append("-auto-approve")
-        return self._run(cmd)
+        cmd.extend(self._execution_args())
+        if plan_file:
+            cmd.append(plan_file)
+        else:
+            if auto_approve:
+                cmd.append("-auto-approve")
+            if not (self.layer.profile.refresh if refresh is None else refresh):
+                cmd.append("-refresh=false")
+        summarizer = ApplySummarizer()
+        result = self._run(cmd, on_line=summarizer.feed)
+        if result.success and summarizer.addresses:
+            self._record_apply(summarizer.addresses)
+        return result
+
+    def _applied_file(self) -> str:
+        return os.path.join(get_cache_dir("applies"), f"{self.layer.name}.json")
+
+    def _record_apply(self, addresses: list[str]) -> None:
+        write_json(self._applied_file(), {"applied_at": time.time(), "addresses": addresses})
+
+    def last_applied(self) -> list[str]:
+        """Resources created/updated by the most recent apply of this layer that changed any."""
+        try:
+            with open(self._applied_file()) as f:
+                return json.load(f)["addresses"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return []
 
     def validate(self) -> ExecutionResult:
         """Run validate."""
@@ -0,0 +1,75 @@
+"""Parallelism auto-tuner for ``ExecutionProfile(parallelism="auto")``.
+
+Plans of auto-tuned layers record their wall time, parallelism and the
+number of resources refreshed in the drift history (plan_timings). Refresh
+time is dominated by provider API round-trips, so throughput (resources per
+second) is compared across the parallelism settings tried so far:
+
+- while the highest setting tried is clearly the fastest, try double;
+- if more concurrency made things slower (API server / provider
+  contention), try half of the lowest setting;
+- otherwise keep the fastest setting.
+
+A setting is only judged after MIN_SAMPLES plans, so one slow run does not
+move it.
+"""
+
+import sqlite3
+import statistics
+
+from ..config import Layer
+from .history import DriftHistory, PlanTiming
+
+# terraform's own default
+DEFAULT_PARALLELISM = 10
+MIN_PARALLELISM = 2
+MAX_PARALLELISM = 32
+MIN_SAMPLES = 2
+# Throughput difference that counts as better / worse
+MIN_GAIN = 0.1
+
+
+def choose_parallelism(samples: list[PlanTiming], start: int = DEFAULT_PARALLELISM) -> int:
+    """Pick the next ``-parallelism`` from plan timings (newest first)."""
+    if not samples:
+        return start
+    current = samples[0].parallelism
+    by_setting: dict[int, list[PlanTiming]] = {}
+    for sample in samples:
+        by_setting.setdefault(sample.parallelism, []).append(sample)
+    if len(by_setting[current]) < MIN_SAMPLES:
+        return current
+
+    throughput = {
+        setting: statistics.median(s.throughput for s in runs)
+        for setting, runs in by_setting.items()
+        if len(runs) >= MIN_SAMPLES
+    }
+    tried = sorted(throughput)
+    best = max(tried, key=lambda setting: throughput[setting])
+    # More calls in flight than resources cannot help
+    ceiling = min(MAX_PARALLELISM, max(s.resources for s in samples))
+
+    if best == tried[-1] and best < ceiling:
+        lower = tried[-2] if len(tried) > 1 else None
+        if lower is None or throughput[best] > throughput[lower] * (1 + MIN_GAIN):
+            return min(best * 2, ceiling)
+    if best == tried[0] and best > MIN_PARALLELISM and len(tried) > 1:
+        if throughput[tried[1]] < throughput[best] * (1 - MIN_GAIN):
+            return max(best // 2, MIN_PARALLELISM)
+    return best
+
+
+def resolve_parallelism(layer: Layer, history: DriftHistory | None = None) -> int | None:
+    """``-parallelism`` for a layer's profile (None = terraform default)."""
+    setting = layer.profile.parallelism
+    if setting != "auto":
+        return setting
+    try:
+        if history is not None:
+            return choose_parallelism(history.timings(layer.name))
+        with DriftHistory() as history:
+            return choose_parallelism(history.timings(layer.name))
+    except sqlite3.Error as e:
+        print(f"  ⚠️ [{layer.name}] No plan timing history ({e}), using parallelism {DEFAULT_PARALLELISM}")
+        return DEFAULT_PARALLELISM
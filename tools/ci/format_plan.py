@@ -1,36 +1,40 @@
 #!/usr/bin/env python3
+import itertools
 import sys
-import re
-
-def format_plan(plan_text):
-    """Parse terraform plan output and return a markdown summary."""
-    # Look for "Plan: X to add, Y to change, Z to destroy"
-    summary_match = re.search(r"Plan: (\d+) to add, (\d+) to change, (\d+) to destroy", plan_text)
-    
-    if not summary_match:
-        # Check for "No changes"
-        if "No changes. Infrastructure is up-to-date." in plan_text:
-            return "✅ **No changes.** Infrastructure is up-to-date."
+
+try:
+    from .plan_report import PlanReport, CREATE, UPDATE, DELETE, REPLACE, summarize_lines
+except ImportError:  # executed as a script
+    from plan_report import PlanReport, CREATE, UPDATE, DELETE, REPLACE, summarize_lines
+
+
+def parse_plan(plan_text):
+    """Build a PlanReport from `terraform show -json` output or human plan text."""
+    if plan_text.lstrip().startswith("{"):
+        return PlanReport.from_json(plan_text)
+    return PlanReport.from_text(plan_text)
+
+
+def format_plan(plan):
+    """Render a PlanReport (or raw plan output) as a markdown summary."""
+    report = plan if isinstance(plan, PlanReport) or plan is None else parse_plan(plan)
+
+    if report is None:
         return "⚠️ Could not parse plan summary. Check logs for details."
+    if not report.has_changes:
+        return "✅ **No changes.** Infrastructure is up-to-date."
 
-    add, change, destroy = summary_match.groups()
-    
-    # Extract specific changes if possible (resource addresses)
-    # Pattern: "# resource_type.name will be created"
-    # Pattern: "# resource_type.name will be updated"
-    # Pattern: "# resource_type.name will be destroyed"
-    
-    created = re.findall(r"# ([\w\.-]+) will be created", plan_text)
-    updated = re.findall(r"# ([\w\.-]+) will be updated in-place", plan_text)
-    destroyed = re.findall(r"# ([\w\.-]+) will be destroyed", plan_text)
-    replaced = re.findall(r"# ([\w\.-]+) must be replaced", plan_text)
+    created = report.addresses(CREATE)
+    updated = report.addresses(UPDATE)
+    destroyed = report.addresses(DELETE)
+    replaced = report.addresses(REPLACE)
 
     summary = f"### 📊 Terraform Plan Summary\n\n"
     summary += f"| Action | Count |\n"
     summary += f"| :--- | :--- |\n"
-    summary += f"| 🟢 **Add** | {add} |\n"
-    summary += f"| 🟡 **Change** | {change} |\n"
-    summary += f"| 🔴 **Destroy** | {destroy} |\n\n"
+    summary += f"| 🟢 **Add** | {report.add} |\n"
+    summary += f"| 🟡 **Change** | {report.change} |\n"
+    summary += f"| 🔴 **Destroy** | {report.destroy} |\n\n"
 
     if created or updated or destroyed or replaced:
         summary += "#### 📄 Change Details\n"
@@ -42,12 +46,32 @@ def format_plan(plan_text):
             summary += "**Replaced:**\n" + "\n".join([f"- `+/-` {r}" for r in replaced]) + "\n"
         if destroyed:
             summary += "**Destroyed:**\n" + "\n".join([f"- `-` {d}" for d in destroyed]) + "\n"
-            
+        if report.omitted:
+            summary += f"\n*...and {report.omitted} more changes (see full plan log)*\n"
+
     return summary
 
+
+def format_plan_lines(lines):
+    """Render plan output from a line iterator (file, stdin) with bounded memory.
+
+    Human plan text is summarized in a single streaming pass; JSON plans
+    (first non-blank character is "{") must be loaded whole.
+    """
+    lines = iter(lines)
+    head = []
+    for line in lines:
+        head.append(line)
+        if line.strip():
+            break
+    rest = itertools.chain(head, lines)
+    if head and head[-1].lstrip().startswith("{"):
+        return format_plan(PlanReport.from_json("".join(rest)))
+    return format_plan(summarize_lines(rest))
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         with open(sys.argv[1], 'r') as f:
-            print(format_plan(f.read()))
+            print(format_plan_lines(f))
     else:
-        print(format_plan(sys.stdin.read()))
+        print(format_plan_lines(sys.stdin))
@@ -0,0 +1,264 @@
+"""Single-pass compaction of terraform logs for PR comments.
+
+A comment holds ~65k characters, and the part of a long terraform log that
+matters (the error) is usually at the end. LogCompactor consumes the log one
+line at a time and, within a character budget, keeps:
+
+1. ``Error:`` / ``Warning:`` diagnostics (boxed or plain), rendered first
+2. the head of the log
+3. the tail of the log
+
+Runs of "Refreshing state..." / "Reading..." lines collapse to a one-line
+count. The raw log is spooled to disk as it streams; when it does not fit
+and ``CI_ARTIFACT_DIR`` is set, that file is kept there as an artifact (for
+an upload step to pick up) so nothing is lost. Otherwise the spool is job-scoped
+(see config.get_job_temp_dir) and deleted once the log is compacted.
+"""
+
+import os
+import re
+import tempfile
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from .config import get_job_temp_dir
+
+DEFAULT_LIMIT = 60000
+DEFAULT_HEAD_LINES = 40
+DEFAULT_TAIL_LINES = 300
+MAX_DIAGNOSTICS = 20
+MAX_DIAGNOSTIC_LINES = 40
+
+# Per-resource progress noise, e.g. "aws_s3_bucket.logs: Refreshing state... [id=logs]"
+_REFRESH_RE = re.compile(
+    r": (Refreshing state\.\.\.|Reading\.\.\.|Read complete after \S+)( \[id=.*\])?$"
+)
+_DIAG_RE = re.compile(r"^(Error|Warning): ")
+_BOX_OPEN = "╷"
+_BOX_CLOSE = "╵"
+_BOX_PREFIX = "│"
+
+
+@dataclass
+class CompactLog:
+    """Result of compacting one log."""
+
+    text: str
+    total_lines: int = 0
+    # Lines dropped from the middle (after refresh collapsing)
+    omitted_lines: int = 0
+    diagnostics: list[str] = field(default_factory=list)
+    # Full log on disk when the compacted text is not the whole log
+    artifact: str | None = None
+
+    @property
+    def truncated(self) -> bool:
+        return self.omitted_lines > 0
+
+
+class LogCompactor:
+    """Streaming head/tail/diagnostics log compactor with bounded memory.
+
+    Feed lines with feed(); call result() once at the end. Until the log
+    outgrows ``limit`` every line is kept; after that only the head, a
+    bounded tail and the diagnostics are.
+    """
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_LIMIT,
+        head_lines: int = DEFAULT_HEAD_LINES,
+        tail_lines: int = DEFAULT_TAIL_LINES,
+        artifact_dir: str | None = None,
+        artifact_name: str = "terraform.log",
+    ):
+        self.limit = limit
+        self.head_lines = head_lines
+        self.total_lines = 0
+        self.diagnostics: list[str] = []
+        self._kept: list[str] = []  # every line, until the budget is exceeded
+        self._kept_size = 0
+        self._overflowed = False
+        self._tail: deque[str] = deque(maxlen=tail_lines)
+        self._emitted = 0  # lines after refresh collapsing
+        self._refresh_run = 0
+        self._box: list[str] | None = None
+        self._plain: list[str] | None = None
+        self._artifact_dir = artifact_dir or os.environ.get("CI_ARTIFACT_DIR") or None
+        self._artifact_name = artifact_name
+        self._spool = None
+
+    # --- Input -----------------------------------------------------------
+
+    def feed(self, line: str) -> None:
+        """Consume one log line (trailing newline optional)."""
+        line = line.rstrip("\n")
+        self.total_lines += 1
+        if self._spool is None:
+            self._open_spool()
+        self._spool.write(line + "\n")
+        self._scan_diagnostic(line)
+
+        if _REFRESH_RE.search(line):
+            self._refresh_run += 1
+            return
+        self._end_refresh_run()
+        self._emit(line)
+
+    def _end_refresh_run(self) -> None:
+        if self._refresh_run:
+            count, self._refresh_run = self._refresh_run, 0
+            noun = "resource" if count == 1 else "resources"
+            self._emit(f"... ({count} {noun} refreshed)")
+
+    def _emit(self, line: str) -> None:
+        self._emitted += 1
+        self._tail.append(line)
+        if self._overflowed:
+            if len(self._kept) < self.head_lines:
+                self._kept.append(line)
+            return
+        self._kept.append(line)
+        self._kept_size += len(line) + 1
+        if self._kept_size > self.limit:
+            self._overflow()
+
+    def _overflow(self) -> None:
+        """Switch to head/tail mode; from here on the middle is only on disk."""
+        self._overflowed = True
+        del self._kept[self.head_lines :]
+
+    # --- Diagnostics -----------------------------------------------------
+
+    def _scan_diagnostic(self, line: str) -> None:
+        stripped = line.strip()
+        if self._box is not None:
+            if stripped.startswith(_BOX_CLOSE):
+                self._add_diagnostic(self._box)
+                self._box = None
+            elif len(self._box) < MAX_DIAGNOSTIC_LINES:
+                self._box.append(stripped.removeprefix(_BOX_PREFIX).rstrip()[1:])
+            return
+        if stripped.startswith(_BOX_OPEN):
+            self._box = []
+            return
+
+        if self._plain is not None:
+            # -no-color diagnostics have no box: header, blank, source
+            # location, blank, detail. End at the blank line after the
+            # detail, at the next diagnostic, or at the size cap.
+            blanks = sum(1 for l in self._plain if not l)
+            if _DIAG_RE.match(stripped) or (not stripped and blanks >= 2):
+                self._add_diagnostic(self._plain)
+                self._plain = None
+            else:
+                self._plain.append(line.rstrip() if stripped else "")
+                if len(self._plain) >= MAX_DIAGNOSTIC_LINES:
+                    self._add_diagnostic(self._plain)
+                    self._plain = None
+                return
+        if _DIAG_RE.match(stripped):
+            self._plain = [stripped]
+
+    def _add_diagnostic(self, lines: list[str]) -> None:
+        while lines and not lines[-1].strip():
+            lines.pop()
+        if not lines or not _DIAG_RE.match(lines[0].strip()):
+            return
+        block = "\n".join(lines)
+        if block not in self.diagnostics and len(self.diagnostics) < MAX_DIAGNOSTICS:
+            self.diagnostics.append(block)
+
+    # --- Artifact --------------------------------------------------------
+
+    def _open_spool(self) -> None:
+        if self._artifact_dir:
+            directory = self._artifact_dir
+            os.makedirs(directory, exist_ok=True)
+        else:
+            directory = get_job_temp_dir("logs")
+        self._spool = tempfile.NamedTemporaryFile(
+            "w",
+            prefix=f"{os.path.splitext(self._artifact_name)[0]}-",
+            suffix=".log",
+            dir=directory,
+            delete=False,
+        )
+
+    # --- Output ----------------------------------------------------------
+
+    def result(self) -> CompactLog:
+        """Finish the pass and render the compacted log."""
+        self._end_refresh_run()
+        for pending in (self._box, self._plain):
+            if pending:
+                self._add_diagnostic(pending)
+        self._box = self._plain = None
+
+        artifact = None
+        if self._spool:
+            self._spool.close()
+            # Only an overflowing log kept for upload outlives the pass
+            if self._overflowed and self._artifact_dir:
+                artifact = self._spool.name
+            else:
+                os.unlink(self._spool.name)
+        if not self._overflowed:
+            return CompactLog(
+                text="\n".join(self._kept),
+                total_lines=self.total_lines,
+                diagnostics=list(self.diagnostics),
+            )
+
+        parts: list[str] = []
+        budget = self.limit
+        if self.diagnostics:
+            # Diagnostics get at most half the budget
+            diag = _fit("\n\n".join(self.diagnostics), budget // 2)
+            parts += ["=== Errors and warnings ===", diag, "", "=== Log ==="]
+            budget -= len(diag) + 50
+
+        head = _fit_lines(self._kept, budget // 4)
+        # Tail lines that are not also part of the head
+        tail_source = list(self._tail)[max(0, len(head) + len(self._tail) - self._emitted) :]
+        tail = _fit_lines(tail_source, budget - sum(len(l) + 1 for l in head) - 100, from_end=True)
+        omitted = self._emitted - len(head) - len(tail)
+        parts += head
+        if omitted > 0:
+            where = f", full log: {os.path.basename(artifact)}" if artifact else ""
+            parts.append(f"... ({omitted} lines omitted{where}) ...")
+        parts += tail
+        return CompactLog(
+            text="\n".join(parts),
+            total_lines=self.total_lines,
+            omitted_lines=max(0, omitted),
+            diagnostics=list(self.diagnostics),
+            artifact=artifact,
+        )
+
+
+def _fit(text: str, budget: int) -> str:
+    if len(text) <= budget:
+        return text
+    return text[: max(0, budget - 20)] + "\n...(truncated)"
+
+
+def _fit_lines(lines: list[str], budget: int, from_end: bool = False) -> list[str]:
+    """Longest prefix (or suffix) of ``lines`` within ``budget`` characters."""
+    picked: list[str] = []
+    size = 0
+    for line in reversed(lines) if from_end else lines:
+        size += len(line) + 1
+        if size > budget:
+            break
+        picked.append(line)
+    return picked[::-1] if from_end else picked
+
+
+def compact_log(lines: Iterable[str], limit: int = DEFAULT_LIMIT, **kwargs) -> CompactLog:
+    """Compact any line iterator (string lines, a file, LogHandle.iter_lines())."""
+    compactor = LogCompactor(limit=limit, **kwargs)
+    for line in lines:
+        compactor.feed(line)
+    return compactor.result()
@@ -0,0 +1,233 @@
+"""Structured terraform plan model.
+
+Built from ``terraform show -json`` when a saved plan is available, or from
+human plan output via the streaming PlanSummarizer.
+"""
+
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Iterable
+
+# Resource actions as rendered in plan summaries
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+REPLACE = "replace"
+READ = "read"
+NO_OP = "no-op"
+
+# Human plan text markers (fallback when no JSON plan is available)
+_TEXT_ACTIONS = {
+    "will be created": CREATE,
+    "will be updated in-place": UPDATE,
+    "will be destroyed": DELETE,
+    "must be replaced": REPLACE,
+    "will be read during apply": READ,
+}
+_TEXT_CHANGE_RE = re.compile(
+    r"^\s*# (.+?) (" + "|".join(re.escape(k) for k in _TEXT_ACTIONS) + r")\b"
+)
+# Refresh-only plans list out-of-band changes instead of planned actions
+_TEXT_DRIFT = {
+    "has changed": UPDATE,
+    "has been deleted": DELETE,
+}
+_TEXT_DRIFT_RE = re.compile(
+    r"^\s*# (.+?) (" + "|".join(re.escape(k) for k in _TEXT_DRIFT) + r")$"
+)
+# Per-resource refresh progress (managed resources / data sources)
+_TEXT_REFRESHED = (": Refreshing state...", ": Read complete after ")
+# Apply progress, e.g. "aws_s3_bucket.logs: Creation complete after 2s [id=logs]"
+_APPLY_DONE_RE = re.compile(r"^(.+?): (Creation|Modifications) complete after ")
+_TEXT_SUMMARY_RE = re.compile(r"Plan: (\d+) to add, (\d+) to change, (\d+) to destroy")
+_TEXT_NO_CHANGES = "No changes."
+
+# Max resource addresses a streaming summary keeps; the rest are only counted
+DEFAULT_MAX_ADDRESSES = 1000
+
+
+def _classify(actions: list[str]) -> str:
+    """Map a JSON ``change.actions`` list to a single action."""
+    if sorted(actions) == ["create", "delete"]:
+        return REPLACE
+    if actions == ["create"]:
+        return CREATE
+    if actions == ["update"]:
+        return UPDATE
+    if actions == ["delete"]:
+        return DELETE
+    if actions == ["read"]:
+        return READ
+    return NO_OP
+
+
+@dataclass
+class ResourceChange:
+    """A single planned resource change."""
+
+    address: str
+    action: str
+
+
+@dataclass
+class PlanReport:
+    """Planned changes for one layer.
+
+    Counts follow terraform's own "Plan: X to add, Y to change, Z to destroy"
+    semantics: a replacement counts as one add and one destroy.
+    """
+
+    add: int = 0
+    change: int = 0
+    destroy: int = 0
+    changes: list[ResourceChange] = field(default_factory=list)
+    # Changes left out of ``changes`` to bound memory on huge plans
+    omitted: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.add or self.change or self.destroy)
+
+    def addresses(self, action: str) -> list[str]:
+        """Addresses of all resources with the given action."""
+        return [c.address for c in self.changes if c.action == action]
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlanReport":
+        data = dict(data)
+        data["changes"] = [ResourceChange(**c) for c in data.get("changes", [])]
+        return cls(**data)
+
+    @classmethod
+    def from_changes(cls, changes: list[ResourceChange]) -> "PlanReport":
+        """Build a report (with counts) from a list of resource changes."""
+        report = cls(changes=changes)
+        for c in changes:
+            if c.action in (CREATE, REPLACE):
+                report.add += 1
+            if c.action == UPDATE:
+                report.change += 1
+            if c.action in (DELETE, REPLACE):
+                report.destroy += 1
+        return report
+
+    @classmethod
+    def from_json(cls, data: dict | str, drift: bool = False) -> "PlanReport":
+        """Build a report from ``terraform show -json <planfile>`` output.
+
+        With ``drift`` the out-of-band changes (``resource_drift``) are
+        reported instead of planned actions, as for refresh-only plans.
+        """
+        if isinstance(data, str):
+            data = json.loads(data)
+        changes = []
+        for rc in data.get("resource_drift" if drift else "resource_changes") or []:
+            action = _classify(rc.get("change", {}).get("actions", []))
+            if action != NO_OP:
+                changes.append(ResourceChange(address=rc["address"], action=action))
+        return cls.from_changes(changes)
+
+    @classmethod
+    def from_text(cls, text: str) -> "PlanReport | None":
+        """Build a report from human-readable plan output.
+
+        Returns None when the text contains neither a plan summary nor a
+        "No changes." notice (e.g. the plan errored).
+        """
+        return summarize_lines(text.splitlines())
+
+
+class PlanSummarizer:
+    """Single-pass, bounded-memory summarizer for human plan output.
+
+    Feed lines one at a time (e.g. from a file or a live subprocess pipe);
+    only the counts and the first ``max_addresses`` resource addresses are
+    kept, so memory does not grow with plan size.
+    """
+
+    def __init__(self, max_addresses: int = DEFAULT_MAX_ADDRESSES, drift: bool = False):
+        self.max_addresses = max_addresses
+        # Refresh-only output: collect "has changed" / "has been deleted"
+        self.drift = drift
+        self.changes: list[ResourceChange] = []
+        self.omitted = 0
+        self.summary: tuple[int, int, int] | None = None
+        self.no_changes = False
+        # Resources refreshed / data sources read (plan timing samples)
+        self.refreshed = 0
+
+    def feed(self, line: str) -> None:
+        """Consume one line of plan output."""
+        stripped = line.lstrip()
+        if stripped.startswith("# "):
+            if self.drift:
+                match = _TEXT_DRIFT_RE.match(stripped.rstrip())
+                action = _TEXT_DRIFT[match.group(2)] if match else None
+            else:
+                match = _TEXT_CHANGE_RE.match(stripped)
+                action = _TEXT_ACTIONS[match.group(2)] if match else None
+            if match:
+                if len(self.changes) < self.max_addresses:
+                    self.changes.append(ResourceChange(match.group(1), action))
+                else:
+                    self.omitted += 1
+        elif stripped.startswith("Plan: "):
+            match = _TEXT_SUMMARY_RE.match(stripped)
+            if match:
+                self.summary = tuple(int(n) for n in match.groups())
+        elif stripped.startswith(_TEXT_NO_CHANGES):
+            self.no_changes = True
+        elif any(marker in stripped for marker in _TEXT_REFRESHED):
+            self.refreshed += 1
+
+    def report(self) -> PlanReport | None:
+        """Return the report so far (None if no summary line was seen)."""
+        if self.summary is None:
+            if self.drift and self.changes:
+                # Refresh-only plans print no "Plan:" summary line
+                report = PlanReport.from_changes(list(self.changes))
+                report.omitted = self.omitted
+                return report
+            return PlanReport() if self.no_changes else None
+        add, change, destroy = self.summary
+        return PlanReport(
+            add=add, change=change, destroy=destroy,
+            changes=list(self.changes), omitted=self.omitted,
+        )
+
+
+def summarize_lines(
+    lines: Iterable[str], max_addresses: int = DEFAULT_MAX_ADDRESSES
+) -> PlanReport | None:
+    """Summarize human plan output from any line iterator in one pass."""
+    summarizer = PlanSummarizer(max_addresses)
+    for line in lines:
+        summarizer.feed(line)
+    return summarizer.report()
+
+
+class ApplySummarizer:
+    """Collects addresses of resources created or updated by an apply.
+
+    Fed line by line like PlanSummarizer; destroyed resources are not
+    collected (there is nothing left to target).
+    """
+
+    def __init__(self, max_addresses: int = DEFAULT_MAX_ADDRESSES):
+        self.max_addresses = max_addresses
+        self.addresses: list[str] = []
+        self.omitted = 0
+
+    def feed(self, line: str) -> None:
+        match = _APPLY_DONE_RE.match(line.strip())
+        if not match:
+            return
+        if len(self.addresses) < self.max_addresses:
+            if match.group(1) not in self.addresses:
+                self.addresses.append(match.group(1))
+        else:
+            self.omitted += 1